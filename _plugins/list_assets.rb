@@ -7,6 +7,7 @@ module Jekyll
         asset_dir = File.join(site.source, 'assets')
         asset_files = Dir.glob(File.join(asset_dir, '**', '*'))
                          .select { |file| File.file?(file) }
+                         .reject { |file| file.include?('/assets/images/responsive/') } # generated derivatives
                          .map { |file| file.sub(site.source, '') }
   
         # Create the media sitemap content
@@ -0,0 +1,83 @@
+# frozen_string_literal: true
+
+require "nokogiri"
+
+module Jekyll
+  # Post-render pass that serves responsive derivatives for post images.
+  #
+  # scripts/generate_image_derivatives.py writes AVIF/WebP variants at several
+  # widths and records them in _data/responsive_images.json, keyed by the
+  # original image URL. Every <img> inside post content whose src appears in
+  # that manifest is wrapped in a <picture> with one <source> per format, and
+  # gets intrinsic width/height so the browser can reserve layout space.
+  #
+  # The original src stays on the <img> as the fallback (and is what the
+  # lightbox opens), so pages render unchanged when the manifest is missing.
+  module ResponsiveImages
+    SIZES = "(max-width: 800px) 100vw, 800px"
+
+    class << self
+      def process(html, manifest, baseurl)
+        doc = Nokogiri::HTML5(html)
+        changed = false
+
+        doc.css(".post-content img[src]").each do |image|
+          next if image.parent&.name == "picture"
+
+          entry = manifest[manifest_key(image["src"], baseurl)]
+          next unless entry
+
+          wrap_in_picture(image, entry, baseurl)
+          changed = true
+        end
+
+        changed ? doc.to_html : html
+      end
+
+      private
+
+      def manifest_key(src, baseurl)
+        path = src.to_s.strip.split(/[?#]/, 2).first.to_s
+        path = path.delete_prefix(baseurl) unless baseurl.empty?
+        path
+      end
+
+      def wrap_in_picture(image, entry, baseurl)
+        picture = image.document.create_element("picture")
+        Array(entry["sources"]).each do |source|
+          picture.add_child(
+            image.document.create_element(
+              "source",
+              "type" => source["type"],
+              "srcset" => prefix_srcset(source["srcset"], baseurl),
+              "sizes" => SIZES
+            )
+          )
+        end
+
+        image["width"] ||= entry["width"].to_s
+        image["height"] ||= entry["height"].to_s
+        image["decoding"] ||= "async"
+
+        image.replace(picture)
+        picture.add_child(image)
+      end
+
+      def prefix_srcset(srcset, baseurl)
+        return srcset if baseurl.empty?
+
+        srcset.split(",").map { |candidate| "#{baseurl}#{candidate.strip}" }.join(", ")
+      end
+    end
+  end
+end
+
+Jekyll::Hooks.register :documents, :post_render do |item|
+  next unless item.output_ext == ".html"
+  next if item.output.to_s.empty?
+
+  manifest = item.site.data["responsive_images"]
+  next unless manifest.is_a?(Hash) && !manifest.empty?
+
+  item.output = Jekyll::ResponsiveImages.process(item.output, manifest, item.site.config["baseurl"].to_s)
+end
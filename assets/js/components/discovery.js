@@ -2,10 +2,31 @@
   "use strict";
 
   var indexPromise = null;
+  var shardPromises = {};
+
+  // Must match the tokenizer in scripts/build_search_index.py.
+  var CJK_CHARS = "\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\u1100-\u11ff\u3130-\u318f\uac00-\ud7af";
+  var WORD_PATTERN = /[\p{L}\p{N}_\u0300-\u036f\u0900-\u097f]+/gu;
+  var CJK_SPLIT_PATTERN = new RegExp("[" + CJK_CHARS + "]+|[^" + CJK_CHARS + "]+", "g");
+  var CJK_PATTERN = new RegExp("^[" + CJK_CHARS + "]");
+  var STOPWORDS = ("a an and are as at be but by for from has have in is it its of on or that the " +
+    "this to was were will with").split(" ");
+
+  // Score multipliers for query terms that only match as a prefix or substring.
+  var PREFIX_MATCH_FACTOR = 0.7;
+  var SUBSTRING_MATCH_FACTOR = 0.4;
+  var MAX_TERM_EXPANSIONS = 64;
+
+  function getBaseUrl() {
+    return document.documentElement.dataset.baseurl || "";
+  }
 
   function getIndexUrl() {
-    var baseUrl = document.documentElement.dataset.baseurl || "";
-    return baseUrl + "/search.json";
+    return getBaseUrl() + "/search.json";
+  }
+
+  function getShardUrl(lang) {
+    return getBaseUrl() + "/assets/search/" + lang + ".json";
   }
 
   function normalizeText(value) {
@@ -182,6 +203,186 @@
     ].join("");
   }
 
+  function tokenize(text) {
+    var tokens = [];
+    var words = String(text || "").normalize("NFKC").toLowerCase().match(WORD_PATTERN) || [];
+
+    words.forEach(function(word) {
+      (word.match(CJK_SPLIT_PATTERN) || []).forEach(function(segment) {
+        if (CJK_PATTERN.test(segment)) {
+          if (segment.length === 1) {
+            tokens.push(segment);
+          }
+          for (var i = 0; i < segment.length - 1; i++) {
+            tokens.push(segment.slice(i, i + 2));
+          }
+        } else if (segment.length > 1 && STOPWORDS.indexOf(segment) === -1) {
+          tokens.push(segment);
+        }
+      });
+    });
+
+    return tokens;
+  }
+
+  function lowerBound(terms, token) {
+    var low = 0;
+    var high = terms.length;
+    while (low < high) {
+      var mid = (low + high) >>> 1;
+      if (terms[mid] < token) {
+        low = mid + 1;
+      } else {
+        high = mid;
+      }
+    }
+    return low;
+  }
+
+  function intersectSorted(left, right) {
+    var result = [];
+    var i = 0;
+    var j = 0;
+    while (i < left.length && j < right.length) {
+      if (left[i] === right[j]) {
+        result.push(left[i]);
+        i++;
+        j++;
+      } else if (left[i] < right[j]) {
+        i++;
+      } else {
+        j++;
+      }
+    }
+    return result;
+  }
+
+  // Map a query token to [termId, factor] pairs: exact and prefix matches via
+  // binary search on the sorted vocabulary, substring matches via trigrams.
+  function expandToken(shard, token) {
+    var matches = [];
+    var seen = {};
+    var terms = shard.terms;
+
+    for (var id = lowerBound(terms, token); id < terms.length && matches.length < MAX_TERM_EXPANSIONS; id++) {
+      if (terms[id].lastIndexOf(token, 0) !== 0) break;
+      matches.push([id, terms[id] === token ? 1 : PREFIX_MATCH_FACTOR]);
+      seen[id] = true;
+    }
+
+    if (token.length >= 3 && !CJK_PATTERN.test(token)) {
+      var candidates = null;
+      for (var i = 0; i <= token.length - 3; i++) {
+        var list = shard.trigrams[token.slice(i, i + 3)];
+        if (!list) {
+          candidates = [];
+          break;
+        }
+        candidates = candidates === null ? list : intersectSorted(candidates, list);
+      }
+
+      (candidates || []).forEach(function(termId) {
+        if (!seen[termId] && matches.length < MAX_TERM_EXPANSIONS && terms[termId].indexOf(token) !== -1) {
+          matches.push([termId, SUBSTRING_MATCH_FACTOR]);
+        }
+      });
+    }
+
+    return matches;
+  }
+
+  function searchShard(shard, query, kind) {
+    var tokens = tokenize(query).filter(function(token, index, all) {
+      return all.indexOf(token) === index;
+    });
+    if (tokens.length === 0) {
+      return [];
+    }
+
+    var scores = null;
+
+    for (var t = 0; t < tokens.length; t++) {
+      var tokenScores = {};
+
+      expandToken(shard, tokens[t]).forEach(function(match) {
+        var postings = shard.postings[match[0]];
+        for (var p = 0; p < postings.length; p += 2) {
+          var score = postings[p + 1] * match[1];
+          if (!(postings[p] in tokenScores) || tokenScores[postings[p]] < score) {
+            tokenScores[postings[p]] = score;
+          }
+        }
+      });
+
+      // Every query token must match, as with the linear search.
+      if (scores === null) {
+        scores = tokenScores;
+      } else {
+        var merged = {};
+        Object.keys(scores).forEach(function(docId) {
+          if (docId in tokenScores) {
+            merged[docId] = scores[docId] + tokenScores[docId];
+          }
+        });
+        scores = merged;
+      }
+
+      if (Object.keys(scores).length === 0) {
+        return [];
+      }
+    }
+
+    return Object.keys(scores)
+      .map(function(docId) {
+        return { item: shard.docs[docId], score: scores[docId] };
+      })
+      .filter(function(result) {
+        return !kind || result.item.kind === kind;
+      })
+      .sort(function(left, right) {
+        if (right.score !== left.score) {
+          return right.score - left.score;
+        }
+
+        return String(right.item.date_iso || "").localeCompare(String(left.item.date_iso || ""));
+      })
+      .map(function(result) { return result.item; });
+  }
+
+  function loadShard(lang) {
+    if (!shardPromises[lang]) {
+      shardPromises[lang] = fetch(getShardUrl(lang)).then(function(response) {
+        if (!response.ok) {
+          throw new Error("Failed to load search shard " + lang + " (" + response.status + ")");
+        }
+
+        return response.json();
+      });
+    }
+
+    return shardPromises[lang];
+  }
+
+  // Prefer the prebuilt shard for the language; fall back to the flat
+  // search.json index (e.g. local builds that skipped the index script).
+  function loadSearchSource(lang) {
+    return loadShard(lang || "en")
+      .then(function(shard) {
+        return {
+          items: shard.docs,
+          search: function(query, kind) { return searchShard(shard, query, kind); }
+        };
+      })
+      .catch(function() {
+        return loadIndex().then(function(items) {
+          return {
+            items: items,
+            search: function(query, kind) { return searchItems(items, query, kind); }
+          };
+        });
+      });
+  }
+
   function loadIndex() {
     if (!indexPromise) {
       indexPromise = fetch(getIndexUrl()).then(function(response) {
@@ -198,7 +399,11 @@
 
   window.ContentDiscovery = {
     loadIndex: loadIndex,
+    loadShard: loadShard,
+    loadSearchSource: loadSearchSource,
     searchItems: searchItems,
+    searchShard: searchShard,
+    tokenize: tokenize,
     getRecentItems: getRecentItems,
     renderResults: renderResults,
     renderEmptyState: renderEmptyState
@@ -308,7 +308,13 @@
           return null;
         }
 
-        const data = await response.json();
+        let data = await response.json();
+
+        // Code blocks and figures may live once per post in a shared sidecar
+        if (data.shared) {
+          data = await this.resolveSharedBlocks(slug, data);
+          if (!data) return null;
+        }
         
         // Cache the result
         translationCache.set(cacheKey, {
@@ -323,6 +329,35 @@
       }
     },
 
+    /**
+     * Replace <!--shared:KEY--> markers with blocks from the post's sidecar
+     * @param {string} slug - Post slug
+     * @param {Object} data - Translation object with markers
+     * @returns {Promise<Object|null>} Resolved translation or null
+     */
+    async resolveSharedBlocks(slug, data) {
+      const cacheKey = `shared:${slug}`;
+      let blocks = translationCache.get(cacheKey)?.data;
+
+      if (!blocks) {
+        const response = await fetch(`${CONFIG.translationsPath}/shared/${slug}.json`);
+        if (!response.ok) {
+          console.warn(`[i18n] Failed to fetch shared blocks for "${slug}": ${response.status}`);
+          return null;
+        }
+        blocks = (await response.json()).blocks || {};
+        translationCache.set(cacheKey, { data: blocks, timestamp: Date.now() });
+      }
+
+      return {
+        ...data,
+        content_html: (data.content_html || '').replace(
+          /<!--shared:([0-9a-f]+)-->/g,
+          (marker, key) => blocks[key] ?? marker
+        )
+      };
+    },
+
     /**
      * Preload translations for a given post
      * @param {string} slug - Post slug
@@ -72,10 +72,11 @@
       }
 
       try {
-        var items = await window.ContentDiscovery.loadIndex();
+        var lang = window.SiteLanguage ? window.SiteLanguage.getCurrentLanguage() : null;
+        var source = await window.ContentDiscovery.loadSearchSource(lang);
         var matches = state.query
-          ? window.ContentDiscovery.searchItems(items, state.query, state.kind)
-          : window.ContentDiscovery.getRecentItems(items, state.kind, 8);
+          ? source.search(state.query, state.kind)
+          : window.ContentDiscovery.getRecentItems(source.items, state.kind, 8);
 
         if (state.query) {
           if (matches.length > 0) {
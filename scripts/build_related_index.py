@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""
+Precompute related posts and related loops into `_data/related.json`.
+
+Every post (and every loop) becomes a TF-IDF vector over the same terms the
+search index uses: title, tags, excerpt and body, weighted per field, plus one
+feature per tag (and per loop category). Rows are L2-normalized, so one matrix
+product gives the cosine similarity of every pair, and the top RELATED_COUNT
+of each row are kept. Posts are only related to posts, loops to loops.
+
+Output layout, keyed by page URL so templates do a single lookup:
+
+    {"posts": {"/2026/08/17/slug/": [{"url", "title", "date", "excerpt", "tags"}, ...]},
+     "loops": {"/awesome-loops/name/": [{"url", "title", "excerpt"}, ...]}}
+
+Term features are cached in .cache/related_features.json by content hash, so
+after editing one post only that post is re-tokenized; the similarity pass over
+the whole collection takes milliseconds. The output file is rewritten only when
+it changes.
+
+Usage:
+    python scripts/build_related_index.py
+    python scripts/build_related_index.py --count 6
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import sys
+from collections import Counter
+from datetime import date
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import yaml
+
+from build_search_index import (
+    FIELD_WEIGHTS,
+    LOOPS_DIR,
+    POST_FILENAME_PATTERN,
+    POSTS_DIR,
+    as_date,
+    markdown_to_text,
+    parse_front_matter,
+    slugify,
+    tokenize,
+)
+from profiling import add_profile_argument, start_profiling
+
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+OUTPUT_FILE = PROJECT_ROOT / "_data" / "related.json"
+FEATURE_CACHE_FILE = PROJECT_ROOT / ".cache" / "related_features.json"
+
+# Bump when feature extraction changes, so cached features are rebuilt
+FEATURE_VERSION = 1
+
+RELATED_COUNT = 4
+
+# Whole-tag and category matches count on top of the words they contain
+TAG_FEATURE_WEIGHT = 4.0
+CATEGORY_FEATURE_WEIGHT = 4.0
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Precompute related posts and loops for the templates.",
+    )
+    parser.add_argument(
+        "--count",
+        type=int,
+        default=RELATED_COUNT,
+        help=f"Related items per page (default: {RELATED_COUNT})",
+    )
+    parser.add_argument(
+        "--output",
+        type=Path,
+        default=OUTPUT_FILE,
+        help="Output JSON file (default: _data/related.json)",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Re-tokenize every document instead of reusing cached features",
+    )
+    add_profile_argument(parser, "build_related_index")
+    args = parser.parse_args()
+    if args.count < 1:
+        parser.error("--count must be at least 1")
+    return args
+
+
+def as_tags(tags: Any) -> list[str]:
+    if isinstance(tags, str):
+        tags = tags.split()
+    return [str(tag) for tag in (tags or [])]
+
+
+def extract_features(front_matter: dict[str, Any], body: str) -> dict[str, float]:
+    """Weighted term frequencies of one document, before TF-IDF."""
+    tags = as_tags(front_matter.get("tags"))
+    fields = {
+        "title": str(front_matter.get("title", "")),
+        "tags": " ".join(tags),
+        "excerpt": str(front_matter.get("excerpt", "")),
+        "content": markdown_to_text(body),
+    }
+    counts: Counter[str] = Counter()
+    for field, text in fields.items():
+        for term in tokenize(text):
+            counts[term] += FIELD_WEIGHTS[field]
+    for tag in tags:
+        counts[f"#tag:{slugify(tag)}"] += TAG_FEATURE_WEIGHT
+    if front_matter.get("category"):
+        counts[f"#category:{slugify(front_matter['category'])}"] += CATEGORY_FEATURE_WEIGHT
+    return dict(counts)
+
+
+class FeatureCache:
+    """Term features per source file, reused while the file's content hash is unchanged."""
+
+    def __init__(self, path: Path, enabled: bool = True):
+        self.path = path
+        self.entries: dict[str, dict[str, Any]] = {}
+        self.used: set[str] = set()
+        self.hits = 0
+        self.misses = 0
+        if enabled:
+            try:
+                data = json.loads(path.read_text(encoding="utf-8"))
+            except (OSError, json.JSONDecodeError):
+                data = {}
+            if data.get("version") == FEATURE_VERSION:
+                self.entries = data.get("documents", {})
+
+    def features(self, key: str, content: str, front_matter: dict[str, Any], body: str) -> dict[str, float]:
+        content_hash = hashlib.sha256(content.encode("utf-8")).hexdigest()
+        self.used.add(key)
+        entry = self.entries.get(key)
+        if entry and entry.get("hash") == content_hash:
+            self.hits += 1
+            return entry["features"]
+        self.misses += 1
+        features = extract_features(front_matter, body)
+        self.entries[key] = {"hash": content_hash, "features": features}
+        return features
+
+    def save(self) -> None:
+        # Entries of deleted or renamed files are dropped
+        entries = {key: self.entries[key] for key in sorted(self.used)}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.path.write_text(
+            json.dumps({"version": FEATURE_VERSION, "documents": entries}, ensure_ascii=False, separators=(",", ":")),
+            encoding="utf-8",
+        )
+
+
+def load_documents(cache: FeatureCache) -> tuple[list[dict[str, Any]], list[dict[str, Any]]]:
+    """Return (posts newest first, loops by title), each with its card fields and features."""
+    posts: list[dict[str, Any]] = []
+    for path in sorted(POSTS_DIR.glob("*.md")):
+        match = POST_FILENAME_PATTERN.match(path.name)
+        if not match:
+            continue
+        try:
+            content = path.read_text(encoding="utf-8")
+            front_matter, body = parse_front_matter(content)
+        except (OSError, ValueError, yaml.YAMLError) as e:
+            print(f"! Skipping {path.name}: {e}")
+            continue
+        if front_matter.get("published") is False:
+            continue
+        slug = match.group(4)
+        post_date = as_date(front_matter.get("date")) or date(*(int(part) for part in match.groups()[:3]))
+        posts.append({
+            "card": {
+                "url": f"/{post_date:%Y/%m/%d}/{slug}/",
+                "title": str(front_matter.get("title", slug)),
+                "date": post_date.isoformat(),
+                "excerpt": str(front_matter.get("excerpt", "")),
+                "tags": as_tags(front_matter.get("tags")),
+            },
+            "features": cache.features(f"_posts/{path.name}", content, front_matter, body),
+        })
+    # Newest first, matching site.posts, so ties favour recent posts
+    posts.sort(key=lambda doc: doc["card"]["date"], reverse=True)
+
+    loops: list[dict[str, Any]] = []
+    for path in sorted(LOOPS_DIR.glob("*.md")):
+        try:
+            content = path.read_text(encoding="utf-8")
+            front_matter, body = parse_front_matter(content)
+        except (OSError, ValueError, yaml.YAMLError) as e:
+            print(f"! Skipping {path.name}: {e}")
+            continue
+        loops.append({
+            "card": {
+                "url": f"/awesome-loops/{path.stem}/",
+                "title": str(front_matter.get("title", path.stem)),
+                "excerpt": str(front_matter.get("excerpt", "")),
+            },
+            "features": cache.features(f"_loops/{path.name}", content, front_matter, body),
+        })
+    loops.sort(key=lambda doc: doc["card"]["title"])
+    return posts, loops
+
+
+def tfidf_matrix(features: list[dict[str, float]]) -> np.ndarray:
+    """
+    L2-normalized TF-IDF rows (documents x shared terms).
+
+    Terms that occur in a single document add to its norm but can never make
+    two documents similar, so their columns are dropped after normalizing.
+    """
+    vocabulary: dict[str, int] = {}
+    rows, cols, weights = [], [], []
+    for row, doc_features in enumerate(features):
+        for term, weight in doc_features.items():
+            rows.append(row)
+            cols.append(vocabulary.setdefault(term, len(vocabulary)))
+            weights.append(weight)
+    rows_array = np.asarray(rows, dtype=np.int64)
+    cols_array = np.asarray(cols, dtype=np.int64)
+
+    # Sublinear term frequency and smoothed inverse document frequency
+    document_frequency = np.bincount(cols_array, minlength=len(vocabulary))
+    idf = np.log((1 + len(features)) / (1 + document_frequency)) + 1
+    values = (1 + np.log(np.asarray(weights, dtype=np.float64))) * idf[cols_array]
+
+    norms = np.sqrt(np.bincount(rows_array, weights=values ** 2, minlength=len(features)))
+    values /= np.maximum(norms, 1e-12)[rows_array]
+
+    shared = document_frequency > 1
+    column_of = np.cumsum(shared) - 1
+    keep = shared[cols_array]
+    matrix = np.zeros((len(features), int(shared.sum())), dtype=np.float32)
+    matrix[rows_array[keep], column_of[cols_array[keep]]] = values[keep]
+    return matrix
+
+
+def top_related(matrix: np.ndarray, count: int) -> list[list[int]]:
+    """Indices of the `count` most similar other rows, best first; ties keep the earlier row."""
+    similarity = matrix @ matrix.T
+    np.fill_diagonal(similarity, -np.inf)
+    count = min(count, len(matrix) - 1)
+    if count < 1:
+        return [[] for _ in range(len(matrix))]
+    # Stable sort on the negated scores keeps collection order among equal scores
+    order = np.argsort(-similarity, axis=1, kind="stable")[:, :count]
+    scores = np.take_along_axis(similarity, order, axis=1)
+    return [
+        [int(index) for index, score in zip(row, row_scores) if score > 0]
+        for row, row_scores in zip(order, scores)
+    ]
+
+
+def related_index(documents: list[dict[str, Any]], count: int) -> dict[str, list[dict[str, Any]]]:
+    if not documents:
+        return {}
+    related = top_related(tfidf_matrix([doc["features"] for doc in documents]), count)
+    return {
+        doc["card"]["url"]: [documents[index]["card"] for index in indices]
+        for doc, indices in zip(documents, related)
+    }
+
+
+def main() -> None:
+    args = parse_args()
+    start_profiling(args.profile)
+
+    cache = FeatureCache(FEATURE_CACHE_FILE, enabled=not args.no_cache)
+    posts, loops = load_documents(cache)
+    if not posts and not loops:
+        print("No documents found.")
+        sys.exit(1)
+
+    data = {
+        "posts": related_index(posts, args.count),
+        "loops": related_index(loops, args.count),
+    }
+    cache.save()
+
+    text = json.dumps(data, ensure_ascii=False, indent=2) + "\n"
+    try:
+        unchanged = args.output.read_text(encoding="utf-8") == text
+    except OSError:
+        unchanged = False
+    if not unchanged:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(text, encoding="utf-8")
+
+    print(
+        f"{'Unchanged' if unchanged else 'Wrote'} {args.output}: {len(posts)} posts, {len(loops)} loops "
+        f"(features: {cache.misses} extracted, {cache.hits} cached)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,467 @@
+#!/usr/bin/env python3
+"""
+Build prebuilt, per-language search and listing artifacts.
+
+Reads `_posts`, `_books`, `_loops` and the translation JSON files under
+`assets/translations/<lang>/`. Each language's translations are streamed
+once, and two artifacts are written per language:
+
+- `assets/search/<lang>.json`: a compact inverted index. The search page
+  downloads only the shard for the active language instead of scanning
+  `search.json` linearly.
+- `assets/search/<lang>.posts.json`: a lightweight post listing (title,
+  excerpt, URL, date, word count, reading time, translated flag). Localized
+  UI can list posts without fetching full `content_html` payloads.
+
+Shard layout:
+- docs:      result metadata in the same shape as `search.json` items
+- terms:     sorted vocabulary (binary search gives exact and prefix lookups)
+- postings:  per term, a flat [doc, weight, doc, weight, ...] list where weight
+             is the precomputed BM25 score x 100
+- trigrams:  trigram -> term ids, for substring matches inside longer terms
+
+Posts without a translation fall back to the English text in every shard, so
+each shard covers the whole archive.
+
+Usage:
+    python scripts/build_search_index.py                 # Build all shards
+    python scripts/build_search_index.py --lang en --lang zh
+"""
+
+from __future__ import annotations
+
+import argparse
+import html
+import json
+import math
+import re
+import sys
+import unicodedata
+from collections import Counter, defaultdict
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any, Iterator
+
+import yaml
+
+from profiling import add_profile_argument, start_profiling
+from translation_storage import resolve_shared_blocks
+
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+POSTS_DIR = PROJECT_ROOT / "_posts"
+BOOKS_DIR = PROJECT_ROOT / "_books"
+LOOPS_DIR = PROJECT_ROOT / "_loops"
+TRANSLATIONS_DIR = PROJECT_ROOT / "assets" / "translations"
+VIEW_COUNT_FILE = PROJECT_ROOT / "_data" / "view_count.json"
+OUTPUT_DIR = PROJECT_ROOT / "assets" / "search"
+
+DEFAULT_LANG = "en"
+LANGUAGES = ["en", "es", "zh", "hi", "pt", "fr", "de", "ja", "ko"]
+
+# BM25 parameters and per-field term frequency multipliers
+BM25_K1 = 1.2
+BM25_B = 0.75
+FIELD_WEIGHTS = {
+    "title": 3.0,
+    "tags": 2.0,
+    "excerpt": 1.5,
+    "content": 1.0,
+}
+
+READING_WORDS_PER_MINUTE = 200
+# CJK text is counted per character; readers cover roughly 400 per minute.
+READING_CJK_CHARS_PER_MINUTE = 400
+
+# Han, Hiragana/Katakana and Hangul are indexed as character bigrams because
+# these scripts do not separate words with spaces.
+CJK_CHARS = "\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\u1100-\u11ff\u3130-\u318f\uac00-\ud7af"
+# Letters, digits and underscore, plus combining accents and the Devanagari
+# block so vowel signs stay inside Hindi words. Mirrored in discovery.js.
+WORD_PATTERN = re.compile("[\\w\u0300-\u036f\u0900-\u097f]+")
+CJK_SPLIT_PATTERN = re.compile(f"[{CJK_CHARS}]+|[^{CJK_CHARS}]+")
+CJK_PATTERN = re.compile(f"[{CJK_CHARS}]")
+
+STOPWORDS = frozenset("""
+a an and are as at be but by for from has have in is it its of on or that the
+this to was were will with
+""".split())
+
+# Index-only or listing-only fields that are not part of a search result
+SHARD_EXCLUDED_FIELDS = frozenset({"slug", "content", "word_count", "translated"})
+LISTING_FIELDS = (
+    "slug", "url", "title", "excerpt", "date_iso", "word_count", "reading_minutes", "translated",
+)
+
+FRONT_MATTER_PATTERN = re.compile(r"^---\s*\n(.*?)\n---\s*\n", re.DOTALL)
+POST_FILENAME_PATTERN = re.compile(r"^(\d{4})-(\d{2})-(\d{2})-(.+)\.md$")
+LIQUID_PATTERN = re.compile(r"\{%.*?%\}|\{\{.*?\}\}", re.DOTALL)
+HTML_TAG_PATTERN = re.compile(r"<[^>]+>")
+MARKDOWN_LINK_TARGET_PATTERN = re.compile(r"\]\([^)]*\)")
+URL_PATTERN = re.compile(r"https?://\S+")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Build per-language search index shards.",
+    )
+    parser.add_argument(
+        "--lang",
+        action="append",
+        choices=LANGUAGES,
+        help="Build only this language (repeatable). Defaults to all languages.",
+    )
+    parser.add_argument(
+        "--output-dir",
+        type=Path,
+        default=OUTPUT_DIR,
+        help="Directory for <lang>.json and <lang>.posts.json (default: assets/search).",
+    )
+    add_profile_argument(parser, "build_search_index")
+    return parser.parse_args()
+
+
+def tokenize(text: str) -> list[str]:
+    """
+    Split text into index terms.
+
+    Text is NFKC-normalized and lowercased; runs of CJK characters become
+    overlapping bigrams, everything else is split on non-word characters.
+    Single-letter non-CJK tokens and a few English stopwords are dropped.
+    """
+    tokens: list[str] = []
+    normalized = unicodedata.normalize("NFKC", text).lower()
+    for word in WORD_PATTERN.findall(normalized):
+        for segment in CJK_SPLIT_PATTERN.findall(word):
+            if CJK_PATTERN.match(segment):
+                if len(segment) == 1:
+                    tokens.append(segment)
+                else:
+                    tokens.extend(segment[i:i + 2] for i in range(len(segment) - 1))
+            elif len(segment) > 1 and segment not in STOPWORDS:
+                tokens.append(segment)
+    return tokens
+
+
+def count_words(text: str) -> tuple[int, int]:
+    """Return (space-delimited words, CJK characters) in text."""
+    words = 0
+    cjk_chars = 0
+    for word in WORD_PATTERN.findall(text):
+        for segment in CJK_SPLIT_PATTERN.findall(word):
+            if CJK_PATTERN.match(segment):
+                cjk_chars += len(segment)
+            else:
+                words += 1
+    return words, cjk_chars
+
+
+def reading_stats(text: str) -> tuple[int, int]:
+    """Return (word count, reading minutes); each CJK character counts as a word."""
+    words, cjk_chars = count_words(text)
+    minutes = words / READING_WORDS_PER_MINUTE + cjk_chars / READING_CJK_CHARS_PER_MINUTE
+    return words + cjk_chars, max(1, int(minutes))
+
+
+def parse_front_matter(content: str) -> tuple[dict[str, Any], str]:
+    match = FRONT_MATTER_PATTERN.match(content)
+    if not match:
+        raise ValueError("No valid YAML front matter found.")
+    loaded = yaml.safe_load(match.group(1))
+    if not isinstance(loaded, dict):
+        raise ValueError("Front matter is not a mapping.")
+    return loaded, content[match.end():]
+
+
+def markdown_to_text(body: str) -> str:
+    """Reduce Markdown/Liquid source to plain searchable text."""
+    text = LIQUID_PATTERN.sub(" ", body)
+    text = MARKDOWN_LINK_TARGET_PATTERN.sub("]", text)
+    text = URL_PATTERN.sub(" ", text)
+    text = HTML_TAG_PATTERN.sub(" ", text)
+    return html.unescape(text)
+
+
+def html_to_text(content_html: str) -> str:
+    text = HTML_TAG_PATTERN.sub(" ", content_html)
+    text = URL_PATTERN.sub(" ", html.unescape(text))
+    return text
+
+
+def slugify(value: str) -> str:
+    """Approximate Jekyll's default `slugify` filter."""
+    return re.sub(r"[\W_]+", "-", str(value).lower()).strip("-")
+
+
+def as_date(value: Any) -> date | None:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    if value:
+        try:
+            return datetime.strptime(str(value)[:10], "%Y-%m-%d").date()
+        except ValueError:
+            return None
+    return None
+
+
+def display_date(value: date | None) -> str | None:
+    if value is None:
+        return None
+    return f"{value.strftime('%B')} {value.day}, {value.year}"
+
+
+def load_view_counts() -> dict[str, int]:
+    try:
+        data = json.loads(VIEW_COUNT_FILE.read_text(encoding="utf-8"))
+    except (OSError, json.JSONDecodeError):
+        return {}
+    return {item["url"]: item["views"] for item in data.get("view_counts", [])}
+
+
+def tag_entries(tags: Any, url_for_tag) -> list[dict[str, str]]:
+    if isinstance(tags, str):
+        tags = tags.split()
+    return [
+        {"name": str(tag), "slug": slugify(tag), "url": url_for_tag(tag)}
+        for tag in (tags or [])
+    ]
+
+
+def load_source_documents() -> list[dict[str, Any]]:
+    """
+    Load English source documents (posts, books, loops) in search.json order.
+
+    Each document carries the result metadata plus the raw text fields that
+    feed the index; translations later replace title/excerpt/content.
+    """
+    view_counts = load_view_counts()
+    posts: list[dict[str, Any]] = []
+
+    for path in sorted(POSTS_DIR.glob("*.md")):
+        match = POST_FILENAME_PATTERN.match(path.name)
+        if not match:
+            continue
+        try:
+            front_matter, body = parse_front_matter(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError, yaml.YAMLError) as e:
+            print(f"! Skipping {path.name}: {e}")
+            continue
+
+        slug = match.group(4)
+        post_date = as_date(front_matter.get("date")) or date(*(int(part) for part in match.groups()[:3]))
+        url = f"/{post_date:%Y/%m/%d}/{slug}/"
+        content = markdown_to_text(body)
+        word_count, reading_minutes = reading_stats(content)
+        posts.append({
+            "slug": slug,
+            "kind": "post",
+            "title": str(front_matter.get("title", slug)),
+            "url": url,
+            "date_display": display_date(post_date),
+            "date_iso": post_date.isoformat(),
+            "excerpt": str(front_matter.get("excerpt", "")),
+            "content": content,
+            "views": view_counts.get(url, 0),
+            "reading_minutes": reading_minutes,
+            "word_count": word_count,
+            "translated": False,
+            "tags": tag_entries(front_matter.get("tags"), lambda tag: f"/tags/{slugify(tag)}/#posts"),
+        })
+
+    # Newest first, matching site.posts
+    posts.sort(key=lambda doc: doc["date_iso"], reverse=True)
+    documents = list(posts)
+
+    for path in sorted(BOOKS_DIR.glob("*.md")):
+        try:
+            front_matter, body = parse_front_matter(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError, yaml.YAMLError) as e:
+            print(f"! Skipping {path.name}: {e}")
+            continue
+        book_date = as_date(front_matter.get("date"))
+        documents.append({
+            "slug": path.stem,
+            "kind": "book",
+            "title": str(front_matter.get("title", path.stem)),
+            "url": str(front_matter.get("web_url") or f"/books/{path.stem}/"),
+            "date_display": display_date(book_date),
+            "date_iso": book_date.isoformat() if book_date else None,
+            "excerpt": str(front_matter.get("excerpt", "")),
+            "content": markdown_to_text(body),
+            "views": None,
+            "reading_minutes": None,
+            "tags": tag_entries(front_matter.get("tags"), lambda tag: f"/tags/{slugify(tag)}/#books"),
+        })
+
+    for path in sorted(LOOPS_DIR.glob("*.md")):
+        try:
+            front_matter, body = parse_front_matter(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError, yaml.YAMLError) as e:
+            print(f"! Skipping {path.name}: {e}")
+            continue
+        url = f"/awesome-loops/{path.stem}/"
+        documents.append({
+            "slug": path.stem,
+            "kind": "loop",
+            "title": str(front_matter.get("title", path.stem)),
+            "url": url,
+            "date_display": None,
+            "date_iso": None,
+            "excerpt": str(front_matter.get("excerpt", "")),
+            "content": markdown_to_text(body),
+            "views": None,
+            "reading_minutes": None,
+            "tags": tag_entries(front_matter.get("tags"), lambda tag: url),
+        })
+
+    return documents
+
+
+def iter_language_documents(lang: str, sources: list[dict[str, Any]]) -> Iterator[dict[str, Any]]:
+    """Yield documents for one language, overlaying translated post text where it exists."""
+    lang_dir = TRANSLATIONS_DIR / lang
+    for doc in sources:
+        if lang == DEFAULT_LANG or doc["kind"] != "post":
+            yield doc
+            continue
+
+        translation_path = lang_dir / f"{doc['slug']}.json"
+        try:
+            translation = resolve_shared_blocks(
+                json.loads(translation_path.read_text(encoding="utf-8")), TRANSLATIONS_DIR, doc["slug"]
+            )
+        except (OSError, json.JSONDecodeError):
+            yield doc
+            continue
+
+        content = html_to_text(translation.get("content_html", ""))
+        if not content.strip():
+            yield doc
+            continue
+
+        word_count, reading_minutes = reading_stats(content)
+        yield {
+            **doc,
+            "title": translation.get("title") or doc["title"],
+            "excerpt": translation.get("excerpt") or doc["excerpt"],
+            "content": content,
+            "word_count": word_count,
+            "reading_minutes": reading_minutes,
+            "translated": True,
+        }
+
+
+def build_shard(lang: str, documents: list[dict[str, Any]]) -> dict[str, Any]:
+    """Build the inverted index for one language's documents."""
+    doc_term_freqs: list[Counter[str]] = []
+    doc_lengths: list[float] = []
+    for doc in documents:
+        fields = {
+            "title": doc["title"],
+            "tags": " ".join(tag["name"] for tag in doc["tags"]),
+            "excerpt": doc["excerpt"],
+            "content": doc["content"],
+        }
+        freqs: Counter[str] = Counter()
+        length = 0.0
+        for field, text in fields.items():
+            weight = FIELD_WEIGHTS[field]
+            for token in tokenize(text):
+                freqs[token] += weight
+                length += weight
+        doc_term_freqs.append(freqs)
+        doc_lengths.append(length)
+
+    doc_count = len(documents)
+    avg_length = (sum(doc_lengths) / doc_count) if doc_count else 0.0
+
+    postings_by_term: dict[str, list[tuple[int, float]]] = defaultdict(list)
+    for doc_id, freqs in enumerate(doc_term_freqs):
+        for term, tf in freqs.items():
+            postings_by_term[term].append((doc_id, tf))
+
+    terms = sorted(postings_by_term)
+    postings: list[list[int]] = []
+    for term in terms:
+        entries = postings_by_term[term]
+        idf = math.log(1 + (doc_count - len(entries) + 0.5) / (len(entries) + 0.5))
+        flat: list[int] = []
+        for doc_id, tf in entries:
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * doc_lengths[doc_id] / avg_length)
+            score = idf * tf * (BM25_K1 + 1) / (tf + norm)
+            flat.extend((doc_id, max(1, round(score * 100))))
+        postings.append(flat)
+
+    trigrams: dict[str, list[int]] = defaultdict(list)
+    for term_id, term in enumerate(terms):
+        if len(term) < 4 or CJK_PATTERN.match(term):
+            continue
+        for gram in sorted({term[i:i + 3] for i in range(len(term) - 2)}):
+            trigrams[gram].append(term_id)
+
+    docs = [
+        {key: value for key, value in doc.items() if key not in SHARD_EXCLUDED_FIELDS}
+        for doc in documents
+    ]
+    return {
+        "version": 1,
+        "lang": lang,
+        "docs": docs,
+        "terms": terms,
+        "postings": postings,
+        "trigrams": dict(sorted(trigrams.items())),
+    }
+
+
+def build_listing(lang: str, documents: list[dict[str, Any]]) -> dict[str, Any]:
+    """Build the lightweight post listing for one language (newest first)."""
+    return {
+        "version": 1,
+        "lang": lang,
+        "posts": [
+            {field: doc[field] for field in LISTING_FIELDS}
+            for doc in documents
+            if doc["kind"] == "post"
+        ],
+    }
+
+
+def write_artifact(data: dict[str, Any], output_path: Path) -> Path:
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    text = json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+    output_path.write_text(text, encoding="utf-8")
+    return output_path
+
+
+def main() -> None:
+    args = parse_args()
+    start_profiling(args.profile)
+    languages = args.lang or LANGUAGES
+
+    sources = load_source_documents()
+    if not sources:
+        print("No documents found.")
+        sys.exit(1)
+
+    for lang in languages:
+        # One pass over the language's translation files feeds both artifacts
+        documents = list(iter_language_documents(lang, sources))
+
+        shard = build_shard(lang, documents)
+        shard_path = write_artifact(shard, args.output_dir / f"{lang}.json")
+        listing = build_listing(lang, documents)
+        listing_path = write_artifact(listing, args.output_dir / f"{lang}.posts.json")
+
+        translated = sum(1 for post in listing["posts"] if post["translated"])
+        print(
+            f"Built {lang}: {len(shard['docs'])} docs, {len(shard['terms']):,} terms "
+            f"({shard_path.stat().st_size / 1024:.1f} KiB); "
+            f"{len(listing['posts'])} listed posts, {translated} translated "
+            f"({listing_path.stat().st_size / 1024:.1f} KiB)"
+        )
+
+
+if __name__ == "__main__":
+    main()
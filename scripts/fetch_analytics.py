@@ -2,59 +2,499 @@
 """
 Fetch popular posts from Google Analytics 4 and save to JSON file.
 This script is designed to run in GitHub Actions.
+
+Report sources:
+- ga4 (default): live Google Analytics Data API, needs GA_PROPERTY_ID and GA_CREDENTIALS
+- fixture: replays recorded RunReportResponse pages from a JSON file (see --record)
+- synthetic: generates deterministic GA4-shaped rows locally (see --synthetic-rows)
+
+Usage:
+    python scripts/fetch_analytics.py                                   # Live GA4 fetch
+    python scripts/fetch_analytics.py --record /tmp/ga4.json            # Live fetch, also record pages
+    python scripts/fetch_analytics.py --source fixture --fixture /tmp/ga4.json --output /tmp/view_count.json
+    python scripts/fetch_analytics.py --source synthetic --benchmark    # 100k-row offline benchmark
+    python scripts/fetch_analytics.py --checkpoint /tmp/ga4.ckpt.json   # Resume from pages fetched earlier
+    python scripts/fetch_analytics.py --self-check                      # Offline regression checks
+
+Transient API errors (quota, unavailable, deadline) are retried per page with
+exponential backoff. With --checkpoint, every fetched page is persisted, along
+with the resolved date range, so a failed run keeps its progress and the next
+run only requests the missing pages for the same dates.
+
+Output is canonical (sorted, fixed key order, trailing newline) and the fetch
+timestamp lives in a sibling *_meta.json file, so unchanged data leaves
+_data/view_count.json byte-identical. --change-threshold additionally keeps
+the existing file when no post moved and no view count changed by more than
+the given fraction.
+
+Every run also refreshes the stats page aggregates in a sibling
+*_summary.json file (totals, view percentiles, top posts with titles, and
+posts per month joined with _posts dates), so stats.md renders without
+Liquid loops. --summary-only rebuilds it from the existing data file.
 """
 
+import argparse
 import json
 import os
-from datetime import datetime, timedelta
+import random
+import re
+import tempfile
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta
 from google.analytics.data_v1beta import BetaAnalyticsDataClient
+from google.api_core import exceptions as api_exceptions
 from google.analytics.data_v1beta.types import (
     DateRange,
     Dimension,
     Metric,
     RunReportRequest,
+    RunReportResponse,
 )
 from google.oauth2.service_account import Credentials
 
+from profiling import add_profile_argument, start_profiling
+
+
+DEFAULT_OUTPUT_FILE = '_data/view_count.json'
+DEFAULT_POSTS_DIR = '_posts'
+
+# Minimum relative change in any post's views before the data file is
+# rewritten (0.01 = 1%). Ranking or membership changes always rewrite.
+CHANGE_THRESHOLD = 0.01
+
+# Rows requested per RunReport call; GA4 allows up to 250k but smaller pages
+# keep individual responses (and retries) cheap.
+PAGE_SIZE = 10000
+
+# Synthetic source defaults, sized to stress pagination and aggregation
+SYNTHETIC_ROWS = 100000
+SYNTHETIC_POSTS = 5000
+
+# A checkpoint for data ending earlier than this is refetched from scratch
+CHECKPOINT_MAX_AGE_DAYS = 3
+
+# Retry settings for transient GA4 API errors
+MAX_RETRIES = 5
+INITIAL_RETRY_DELAY = 5  # seconds
+MAX_RETRY_DELAY = 120  # 2 minutes
+
+# gRPC statuses worth retrying: quota/rate limits and transient server faults
+RETRYABLE_ERRORS = (
+    api_exceptions.ResourceExhausted,
+    api_exceptions.ServiceUnavailable,
+    api_exceptions.DeadlineExceeded,
+    api_exceptions.InternalServerError,
+    api_exceptions.Aborted,
+)
+
+BLOG_POST_PATTERN = re.compile(r'^/\d{4}/\d{2}/\d{2}/')
+POST_FILENAME_PATTERN = re.compile(r'^(\d{4})-(\d{2})-(\d{2})-(.+)\.md$')
+FRONT_MATTER_PATTERN = re.compile(r'^---\s*\n(.*?)\n---\s*\n', re.DOTALL)
+
+# Stats page aggregates: rows in the top posts table and view percentiles
+STATS_TOP_POSTS = 25
+STATS_PERCENTILES = (50, 75, 90, 99)
+
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(
+        description="Fetch popular posts from Google Analytics 4.",
+    )
+    parser.add_argument(
+        "--source",
+        choices=["ga4", "fixture", "synthetic"],
+        default="ga4",
+        help="Where report rows come from (default: ga4)",
+    )
+    parser.add_argument(
+        "--fixture",
+        type=str,
+        help="Recorded RunReportResponse pages to replay with --source fixture",
+    )
+    parser.add_argument(
+        "--synthetic-rows",
+        type=int,
+        default=SYNTHETIC_ROWS,
+        help=f"Number of rows generated by --source synthetic (default: {SYNTHETIC_ROWS})",
+    )
+    parser.add_argument(
+        "--page-size",
+        type=int,
+        default=PAGE_SIZE,
+        help=f"Rows requested per report page (default: {PAGE_SIZE})",
+    )
+    parser.add_argument(
+        "--synthetic-failures",
+        type=int,
+        default=0,
+        help="Make the first N synthetic page requests fail with a retryable error",
+    )
+    parser.add_argument(
+        "--max-retries",
+        type=int,
+        default=MAX_RETRIES,
+        help=f"Attempts per report page on retryable errors (default: {MAX_RETRIES})",
+    )
+    parser.add_argument(
+        "--retry-delay",
+        type=float,
+        default=INITIAL_RETRY_DELAY,
+        help=f"Initial retry delay in seconds (default: {INITIAL_RETRY_DELAY})",
+    )
+    parser.add_argument(
+        "--time-budget",
+        type=float,
+        help="Stop retrying once this many seconds have elapsed (keeps CI within its timeout)",
+    )
+    parser.add_argument(
+        "--checkpoint",
+        type=str,
+        help="Persist fetched pages here and resume from them on the next run",
+    )
+    parser.add_argument(
+        "--record",
+        type=str,
+        help="Write every fetched response page to this JSON file for later replay",
+    )
+    parser.add_argument(
+        "--output",
+        type=str,
+        default=DEFAULT_OUTPUT_FILE,
+        help=f"Output JSON file (default: {DEFAULT_OUTPUT_FILE})",
+    )
+    parser.add_argument(
+        "--change-threshold",
+        type=float,
+        default=float(os.environ.get('VIEW_COUNT_CHANGE_THRESHOLD', CHANGE_THRESHOLD)),
+        help=f"Relative view change needed to rewrite output (default: {CHANGE_THRESHOLD}, "
+             "or VIEW_COUNT_CHANGE_THRESHOLD; 0 rewrites on any change)",
+    )
+    parser.add_argument(
+        "--benchmark",
+        action="store_true",
+        help="Measure fetch-to-JSON time and peak memory instead of writing --output",
+    )
+    parser.add_argument(
+        "--posts-dir",
+        type=str,
+        default=DEFAULT_POSTS_DIR,
+        help=f"Posts joined into the stats summary for titles and dates (default: {DEFAULT_POSTS_DIR})",
+    )
+    parser.add_argument(
+        "--summary-only",
+        action="store_true",
+        help="Rebuild the stats summary from the existing --output file without fetching",
+    )
+    parser.add_argument(
+        "--self-check",
+        action="store_true",
+        help="Run offline regression checks of pagination, aggregation, retries, "
+             "checkpoints and output, then exit",
+    )
+    add_profile_argument(parser, "fetch_analytics")
+    return parser.parse_args()
+
 
 def get_credentials():
     """Get credentials from environment variable."""
     creds_json = os.environ.get('GA_CREDENTIALS')
     if not creds_json:
         raise ValueError("GA_CREDENTIALS environment variable not set")
-    
+
     creds_dict = json.loads(creds_json)
     return Credentials.from_service_account_info(creds_dict)
 
 
-def fetch_popular_posts(property_id, days=None, limit=None):
+class GA4ReportSource:
+    """Report source backed by the live Google Analytics Data API."""
+
+    def __init__(self):
+        self.client = BetaAnalyticsDataClient(credentials=get_credentials())
+
+    def run_report(self, request):
+        return self.client.run_report(request)
+
+
+class FixtureReportSource:
+    """
+    Report source that replays recorded RunReportResponse pages.
+
+    The fixture is a JSON list of responses in the format written by
+    --record. Rows from all recorded pages are flattened and re-paginated,
+    so replay works with any page size.
+    """
+
+    def __init__(self, fixture_path):
+        with open(fixture_path, 'r', encoding='utf-8') as f:
+            pages = json.load(f)
+        if isinstance(pages, dict):
+            pages = [pages]
+
+        self.rows = []
+        for page in pages:
+            response = RunReportResponse.from_json(json.dumps(page))
+            self.rows.extend(response.rows)
+
+    def run_report(self, request):
+        end = request.offset + request.limit
+        return RunReportResponse(rows=self.rows[request.offset:end], row_count=len(self.rows))
+
+
+class SyntheticReportSource:
+    """
+    Report source that generates GA4-shaped rows without network access.
+
+    Rows are a pure function of their index, so pages are independent of
+    page size and only the requested page is ever held in memory. About
+    one row in ten is a non-post path and post paths repeat (as GA4
+    returns one row per pagePath/pageTitle pair), exercising the filter
+    and duplicate merging.
+    """
+
+    def __init__(self, row_count=SYNTHETIC_ROWS, post_count=SYNTHETIC_POSTS, failures=0):
+        self.row_count = row_count
+        self.post_count = post_count
+        self.failures_left = failures
+
+    def make_row(self, index):
+        mixed = (index * 2654435761) & 0xFFFFFFFF
+        post_id = mixed % self.post_count
+        if mixed % 10 == 0:
+            page_path = f"/tags/topic-{post_id % 50}/"
+        else:
+            year = 2020 + post_id % 7
+            month = 1 + post_id % 12
+            day = 1 + post_id % 28
+            page_path = f"/{year}/{month:02d}/{day:02d}/synthetic-post-{post_id}/"
+        return {
+            "dimension_values": [
+                {"value": page_path},
+                {"value": f"Synthetic Post {post_id} | Subramanya N"},
+            ],
+            "metric_values": [
+                {"value": str(1 + mixed % 2000)},
+                {"value": str(30 + (mixed >> 8) % 600)},
+                {"value": str(((mixed >> 4) % 1000) / 1000)},
+            ],
+        }
+
+    def run_report(self, request):
+        if self.failures_left > 0:
+            self.failures_left -= 1
+            raise api_exceptions.ServiceUnavailable("synthetic transient failure")
+        end = min(request.offset + request.limit, self.row_count)
+        rows = [self.make_row(index) for index in range(request.offset, end)]
+        return RunReportResponse(rows=rows, row_count=self.row_count)
+
+
+def build_report_source(args):
+    """Create the report source selected on the command line."""
+    if args.source == "fixture":
+        if not args.fixture:
+            raise ValueError("--source fixture requires --fixture PATH")
+        return FixtureReportSource(args.fixture)
+    if args.source == "synthetic":
+        return SyntheticReportSource(
+            row_count=args.synthetic_rows,
+            failures=args.synthetic_failures,
+        )
+    return GA4ReportSource()
+
+
+class RetryPolicy:
+    """Exponential backoff for retryable GA4 errors, bounded by an optional time budget."""
+
+    def __init__(self, max_retries=MAX_RETRIES, initial_delay=INITIAL_RETRY_DELAY,
+                 time_budget=None):
+        self.max_retries = max(1, max_retries)
+        self.initial_delay = initial_delay
+        self.deadline = time.monotonic() + time_budget if time_budget else None
+
+    def run(self, source, request):
+        """Run one report request, retrying transient failures."""
+        retry_delay = self.initial_delay
+        for attempt in range(self.max_retries):
+            try:
+                return source.run_report(request)
+            except RETRYABLE_ERRORS as e:
+                if attempt >= self.max_retries - 1:
+                    raise
+                # Jitter keeps parallel jobs from retrying in lockstep
+                sleep_for = retry_delay * random.uniform(1.0, 1.25)
+                if self.deadline and time.monotonic() + sleep_for > self.deadline:
+                    raise TimeoutError(f"time budget exhausted while retrying: {e}") from e
+                print(f"  Page at offset {request.offset} failed ({type(e).__name__}). "
+                      f"Retrying in {sleep_for:.1f}s...")
+                time.sleep(sleep_for)
+                retry_delay = min(retry_delay * 2, MAX_RETRY_DELAY)
+
+
+class PageCheckpoint:
+    """
+    Persist fetched response pages so a failed run can resume.
+
+    Pages are keyed by offset and the whole checkpoint is tied to the
+    report (property, lookback, page size); a checkpoint written for a
+    different report is ignored. The resolved date range is stored with the
+    pages, so a resumed run requests the remaining pages for the same dates
+    even on a later day. Checkpoints older than CHECKPOINT_MAX_AGE_DAYS are
+    discarded rather than resumed.
+
+    A complete fetch replaces the pages with a "complete" marker instead of
+    deleting the file. When the file is cached between CI runs, the marker
+    is the newest entry, so a checkpoint from an earlier failed run cannot be
+    restored and resumed after a later success.
+    """
+
+    def __init__(self, path, property_name, days, page_size):
+        self.path = path
+        self.key = f"{property_name}|{days or 'all'}|{page_size}"
+        self.pages = {}
+        self.date_range = None
+
+        if path and os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                print(f"Ignoring unreadable checkpoint {path}: {e}")
+                return
+            date_range = data.get("date_range")
+            if data.get("key") != self.key or not date_range or data.get("complete"):
+                return
+            age = datetime.now() - datetime.strptime(date_range[1], "%Y-%m-%d")
+            if age > timedelta(days=CHECKPOINT_MAX_AGE_DAYS):
+                print(f"Ignoring checkpoint {path} for data through {date_range[1]}; it is too old to resume")
+                return
+            self.date_range = tuple(date_range)
+            self.pages = {int(offset): page for offset, page in data.get("pages", {}).items()}
+            print(f"Resuming from checkpoint with {len(self.pages)} page(s) already fetched "
+                  f"({date_range[0]} to {date_range[1]})")
+
+    def get(self, offset):
+        page = self.pages.get(offset)
+        if page is None:
+            return None
+        return RunReportResponse.from_json(json.dumps(page))
+
+    def save(self, offset, response):
+        if not self.path:
+            return
+        self.pages[offset] = json.loads(RunReportResponse.to_json(response))
+        self._write({"key": self.key, "date_range": self.date_range, "pages": self.pages})
+
+    def complete(self):
+        """Mark the fetch finished; the fetched pages are dropped."""
+        if not self.path:
+            return
+        self._write({"key": self.key, "date_range": self.date_range, "complete": True})
+
+    def _write(self, data):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+
+def iter_report_pages(source, request, page_size=PAGE_SIZE, retry_policy=None, checkpoint=None):
+    """
+    Yield successive response pages until every row has been fetched.
+
+    Pages found in the checkpoint are replayed instead of re-requested, and
+    each page is retried on its own, so a transient failure never discards
+    pages that were already fetched.
+    """
+    retry_policy = retry_policy or RetryPolicy()
+    offset = 0
+    while True:
+        response = checkpoint.get(offset) if checkpoint else None
+        if response is None:
+            page_request = RunReportRequest(request, offset=offset, limit=page_size)
+            response = retry_policy.run(source, page_request)
+            if checkpoint:
+                checkpoint.save(offset, response)
+        yield response
+
+        offset += len(response.rows)
+        if not response.rows or offset >= response.row_count:
+            break
+
+
+def aggregate_rows(rows, posts_dict):
+    """
+    Merge report rows into posts_dict, keyed by page path.
+
+    Duplicate URLs (one row per title variant) are combined with views
+    summed and duration/engagement accumulated as view-weighted totals.
+    """
+    for row in rows:
+        page_path = row.dimension_values[0].value
+
+        # Filter for blog posts (adjust pattern based on your URL structure)
+        # Assuming blog posts are in /YYYY/MM/DD/ format
+        if not is_blog_post(page_path):
+            continue
+
+        page_views = int(row.metric_values[0].value)
+        avg_duration = float(row.metric_values[1].value)
+        engagement_rate = float(row.metric_values[2].value) * 100  # Convert to percentage
+
+        if page_path in posts_dict:
+            # Aggregate views for duplicate URLs
+            posts_dict[page_path]["views"] += page_views
+            # Average the duration and engagement rate
+            posts_dict[page_path]["total_duration"] += avg_duration * page_views
+            posts_dict[page_path]["total_engagement"] += engagement_rate * page_views
+            posts_dict[page_path]["count"] += 1
+        else:
+            posts_dict[page_path] = {
+                "url": page_path,
+                "title": row.dimension_values[1].value,
+                "views": page_views,
+                "total_duration": avg_duration * page_views,
+                "total_engagement": engagement_rate * page_views,
+                "count": 1
+            }
+
+
+def fetch_popular_posts(property_id, days=None, limit=None, source=None,
+                        page_size=PAGE_SIZE, record_file=None, retry_policy=None,
+                        checkpoint_file=None):
     """
     Fetch popular posts from Google Analytics.
-    
+
     Args:
         property_id: GA4 property ID
         days: Number of days to look back (None for all-time)
         limit: Number of posts to return (None for all posts)
-    
+        source: Report source (defaults to the live GA4 API)
+        page_size: Rows requested per report page
+        record_file: Optional path to record fetched pages for replay
+        retry_policy: Backoff settings for transient API errors
+        checkpoint_file: Optional path used to persist and resume fetched pages
+
     Returns:
         List of popular posts with metadata
     """
-    credentials = get_credentials()
-    client = BetaAnalyticsDataClient(credentials=credentials)
-    
-    # Calculate date range
-    end_date = datetime.now()
-    if days:
-        start_date = end_date - timedelta(days=days)
-    else:
-        # All-time data (GA4 typically retains data from 2020 onwards)
-        start_date = datetime(2020, 1, 1)
-    
+    checkpoint = PageCheckpoint(checkpoint_file, f"properties/{property_id}", days, page_size)
+
+    # A resumed checkpoint keeps its date range, so its pages stay consistent with the rest
+    if checkpoint.date_range is None:
+        end_date = datetime.now()
+        if days:
+            start_date = end_date - timedelta(days=days)
+        else:
+            # All-time data (GA4 typically retains data from 2020 onwards)
+            start_date = datetime(2020, 1, 1)
+        checkpoint.date_range = (start_date.strftime("%Y-%m-%d"), end_date.strftime("%Y-%m-%d"))
+
     request = RunReportRequest(
         property=f"properties/{property_id}",
         date_ranges=[DateRange(
-            start_date=start_date.strftime("%Y-%m-%d"),
-            end_date=end_date.strftime("%Y-%m-%d"),
+            start_date=checkpoint.date_range[0],
+            end_date=checkpoint.date_range[1],
         )],
         dimensions=[
             Dimension(name="pagePath"),
@@ -65,7 +505,6 @@ def fetch_popular_posts(property_id, days=None, limit=None):
             Metric(name="averageSessionDuration"),
             Metric(name="engagementRate"),
         ],
-        limit=1000,  # Fetch all blog posts (increased limit)
         order_bys=[{
             "metric": {
                 "metric_name": "screenPageViews"
@@ -73,39 +512,32 @@ def fetch_popular_posts(property_id, days=None, limit=None):
             "desc": True
         }],
     )
-    
+
     try:
-        response = client.run_report(request)
-        
-        # Aggregate posts by URL (combine duplicates)
+        if source is None:
+            source = GA4ReportSource()
+
+        # Aggregate posts by URL (combine duplicates) one page at a time
         posts_dict = {}
-        for row in response.rows:
-            page_path = row.dimension_values[0].value
-            page_title = row.dimension_values[1].value
-            page_views = int(row.metric_values[0].value)
-            avg_duration = float(row.metric_values[1].value)
-            engagement_rate = float(row.metric_values[2].value) * 100  # Convert to percentage
-            
-            # Filter for blog posts (adjust pattern based on your URL structure)
-            # Assuming blog posts are in /YYYY/MM/DD/ format
-            if is_blog_post(page_path):
-                if page_path in posts_dict:
-                    # Aggregate views for duplicate URLs
-                    posts_dict[page_path]["views"] += page_views
-                    # Average the duration and engagement rate
-                    posts_dict[page_path]["total_duration"] += avg_duration * page_views
-                    posts_dict[page_path]["total_engagement"] += engagement_rate * page_views
-                    posts_dict[page_path]["count"] += 1
-                else:
-                    posts_dict[page_path] = {
-                        "url": page_path,
-                        "title": page_title,
-                        "views": page_views,
-                        "total_duration": avg_duration * page_views,
-                        "total_engagement": engagement_rate * page_views,
-                        "count": 1
-                    }
-        
+        recorded_pages = []
+        pages = iter_report_pages(
+            source,
+            request,
+            page_size=page_size,
+            retry_policy=retry_policy,
+            checkpoint=checkpoint,
+        )
+        for response in pages:
+            aggregate_rows(response.rows, posts_dict)
+            if record_file:
+                recorded_pages.append(json.loads(RunReportResponse.to_json(response)))
+        checkpoint.complete()
+
+        if record_file:
+            with open(record_file, 'w', encoding='utf-8') as f:
+                json.dump(recorded_pages, f, ensure_ascii=False)
+            print(f"Recorded {len(recorded_pages)} report page(s) to {record_file}")
+
         # Calculate weighted averages and filter by views > 100
         view_counts = []
         for post_data in posts_dict.values():
@@ -117,18 +549,21 @@ def fetch_popular_posts(property_id, days=None, limit=None):
                     "avg_duration_seconds": round(post_data["total_duration"] / views, 1),
                     "engagement_rate": round(post_data["total_engagement"] / views, 2),
                 })
-        
+
         # Sort by views (descending)
         view_counts.sort(key=lambda x: x["views"], reverse=True)
-        
+
         # Apply limit if specified
         if limit:
             view_counts = view_counts[:limit]
-        
+
         return view_counts
-    
+
     except Exception as e:
         print(f"Error fetching analytics data: {e}")
+        if checkpoint.pages:
+            print(f"Kept {len(checkpoint.pages)} fetched page(s) in {checkpoint.path}; "
+                  "the next run with this checkpoint fetches only the missing pages.")
         # Return empty list on error so site still builds
         return []
 
@@ -136,62 +571,509 @@ def fetch_popular_posts(property_id, days=None, limit=None):
 def is_blog_post(path):
     """
     Check if the path is a blog post.
-    Adjust this function based on your URL structure.
+    Adjust BLOG_POST_PATTERN based on your URL structure.
     """
     # Example: /2025/12/07/post-title/
-    import re
-    pattern = r'^/\d{4}/\d{2}/\d{2}/'
-    return bool(re.match(pattern, path))
+    return bool(BLOG_POST_PATTERN.match(path))
 
 
-def save_to_json(data, output_file):
-    """Save data to JSON file."""
-    output_data = {
-        "last_updated": datetime.now().isoformat(),
-        "view_counts": data
-    }
-    
-    # Ensure directory exists
-    os.makedirs(os.path.dirname(output_file), exist_ok=True)
-    
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(output_data, f, indent=2, ensure_ascii=False)
-    
-    print(f"Saved {len(data)} posts with view counts to {output_file}")
+def meta_file_for(output_file):
+    """Return the sibling file holding the fetch timestamp (view_count_meta.json)."""
+    root, ext = os.path.splitext(output_file)
+    return f"{root}_meta{ext or '.json'}"
 
 
-def has_existing_view_counts(output_file):
-    """Return True when the existing analytics file has usable view data."""
+def canonical_json(data):
+    """
+    Serialize view counts deterministically: posts ordered by views then
+    URL, keys sorted, fixed indentation and a trailing newline.
+    """
+    view_counts = sorted(data, key=lambda x: (-x["views"], x["url"]))
+    return json.dumps({"view_counts": view_counts}, indent=2, ensure_ascii=False, sort_keys=True) + "\n"
+
+
+def is_material_change(old_counts, new_counts, threshold):
+    """
+    Decide whether new view counts differ enough from the existing ones to
+    be worth a commit. Any change in which posts are ranked, or in their
+    order, is material; otherwise a post's views must move by more than
+    `threshold` (a fraction of its previous views).
+    """
+    if threshold <= 0:
+        return old_counts != new_counts
+    if [item["url"] for item in old_counts] != [item["url"] for item in new_counts]:
+        return True
+
+    for old, new in zip(old_counts, new_counts):
+        if abs(new["views"] - old["views"]) > threshold * max(old["views"], 1):
+            return True
+    return False
+
+
+def load_existing_view_counts(output_file):
+    """Return the view counts currently on disk, or None when unavailable."""
     if not os.path.exists(output_file):
-        return False
+        return None
 
     try:
         with open(output_file, 'r', encoding='utf-8') as f:
             existing_data = json.load(f)
     except (OSError, json.JSONDecodeError) as e:
         print(f"Could not read existing analytics data: {e}")
+        return None
+
+    return existing_data.get("view_counts")
+
+
+def write_text_if_changed(path, text):
+    """Write text to path unless it already holds exactly that content."""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            if f.read() == text:
+                return False
+    except OSError:
+        pass
+
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    return True
+
+
+def save_to_json(data, output_file, change_threshold=0.0):
+    """
+    Save data to JSON file.
+
+    Returns True when the file was rewritten. The timestamp in the meta
+    file only moves when the data file does, so a run that changes nothing
+    leaves both files untouched.
+    """
+    text = canonical_json(data)
+    existing = load_existing_view_counts(output_file)
+    if existing is not None:
+        new_counts = json.loads(text)["view_counts"]
+        old_counts = json.loads(canonical_json(existing))["view_counts"]
+        if not is_material_change(old_counts, new_counts, change_threshold):
+            print(f"No material change (threshold {change_threshold:.1%}); keeping {output_file}")
+            return False
+
+    # Ensure directory exists
+    os.makedirs(os.path.dirname(output_file) or '.', exist_ok=True)
+
+    if not write_text_if_changed(output_file, text):
+        print(f"{output_file} already up to date")
         return False
 
-    return bool(existing_data.get("view_counts"))
+    meta = {"last_updated": datetime.now().isoformat(timespec='seconds')}
+    write_text_if_changed(meta_file_for(output_file), json.dumps(meta, indent=2) + "\n")
+
+    print(f"Saved {len(data)} posts with view counts to {output_file}")
+    return True
+
+
+def summary_file_for(output_file):
+    """Return the sibling file holding the stats page aggregates (view_count_summary.json)."""
+    root, ext = os.path.splitext(output_file)
+    return f"{root}_summary{ext or '.json'}"
+
+
+def load_published_posts(posts_dir):
+    """
+    Return {url: {"title", "date"}} for every published post.
+
+    URLs follow the site's pretty permalinks, with the front matter date
+    taking precedence over the filename date.
+    """
+    import yaml
+
+    posts = {}
+    if not os.path.isdir(posts_dir):
+        return posts
+
+    for name in sorted(os.listdir(posts_dir)):
+        match = POST_FILENAME_PATTERN.match(name)
+        if not match:
+            continue
+        try:
+            with open(os.path.join(posts_dir, name), 'r', encoding='utf-8') as f:
+                front_matter_match = FRONT_MATTER_PATTERN.match(f.read())
+            front_matter = yaml.safe_load(front_matter_match.group(1)) if front_matter_match else {}
+        except (OSError, yaml.YAMLError) as e:
+            print(f"Skipping {name}: {e}")
+            continue
+        if not isinstance(front_matter, dict) or front_matter.get("published") is False:
+            continue
+
+        post_date = front_matter.get("date")
+        if isinstance(post_date, datetime):
+            post_date = post_date.date()
+        elif not isinstance(post_date, date):
+            try:
+                post_date = datetime.strptime(str(post_date)[:10], "%Y-%m-%d").date()
+            except ValueError:
+                post_date = date(*(int(part) for part in match.groups()[:3]))
+
+        slug = match.group(4)
+        posts[f"/{post_date:%Y/%m/%d}/{slug}/"] = {
+            "title": str(front_matter.get("title", slug)),
+            "date": post_date,
+        }
+    return posts
+
+
+def percentile(sorted_values, pct):
+    """Linearly interpolated percentile of an ascending list."""
+    if not sorted_values:
+        return 0
+    position = (len(sorted_values) - 1) * pct / 100
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def format_duration(seconds):
+    """Format seconds the way the stats page shows them: 45s, 2.3m."""
+    minutes = round(seconds / 60, 1)
+    if minutes < 1:
+        return f"{round(seconds)}s"
+    return f"{minutes:g}m"
+
+
+def iter_months(first, last):
+    """Yield (year, month) from `first` through `last`, inclusive."""
+    year, month = first.year, first.month
+    while (year, month) <= (last.year, last.month):
+        yield year, month
+        year, month = (year, month + 1) if month < 12 else (year + 1, 1)
+
+
+def build_stats_summary(view_counts, posts, top=STATS_TOP_POSTS):
+    """
+    Compute every aggregate the stats page shows.
+
+    Averages are plain means over tracked posts, as the page has always
+    shown them. Display strings are precomputed, so neither Liquid nor the
+    page script formats numbers.
+    """
+    view_counts = sorted(view_counts, key=lambda x: (-x["views"], x["url"]))
+    tracked = len(view_counts)
+    total_views = sum(item["views"] for item in view_counts)
+    avg_duration = sum(item["avg_duration_seconds"] for item in view_counts) / tracked if tracked else 0
+    avg_engagement = sum(item["engagement_rate"] for item in view_counts) / tracked if tracked else 0
+    sorted_views = sorted(item["views"] for item in view_counts)
+    percentiles = {f"p{pct}": round(percentile(sorted_views, pct)) for pct in STATS_PERCENTILES}
+
+    top_posts = []
+    for rank, item in enumerate(view_counts[:top], start=1):
+        post = posts.get(item["url"])
+        top_posts.append({
+            "rank": rank,
+            "url": item["url"],
+            "title": post["title"] if post else item["url"],
+            "views": item["views"],
+            "views_display": f"{item['views']:,}",
+            "engagement_rate": item["engagement_rate"],
+            "avg_duration_seconds": item["avg_duration_seconds"],
+            "avg_duration_display": format_duration(item["avg_duration_seconds"]),
+        })
+
+    # Publishing activity per calendar month, oldest first, with empty months kept
+    views_by_url = {item["url"]: item["views"] for item in view_counts}
+    monthly = {}
+    for url, post in posts.items():
+        key = (post["date"].year, post["date"].month)
+        entry = monthly.setdefault(key, {"posts": 0, "views": 0})
+        entry["posts"] += 1
+        entry["views"] += views_by_url.get(url, 0)
+    posts_per_month = []
+    if monthly:
+        dates = [post["date"] for post in posts.values()]
+        busiest = max(entry["posts"] for entry in monthly.values())
+        for year, month in iter_months(min(dates), max(dates)):
+            entry = monthly.get((year, month), {"posts": 0, "views": 0})
+            posts_per_month.append({
+                "month": f"{year:04d}-{month:02d}",
+                "label": date(year, month, 1).strftime("%b %Y"),
+                "posts": entry["posts"],
+                "views": entry["views"],
+                "bar_percent": round(entry["posts"] / busiest * 100),
+            })
+
+    return {
+        "totals": {
+            "views": total_views,
+            "views_display": f"{total_views:,}",
+            "tracked_posts": tracked,
+            "published_posts": len(posts),
+            "avg_engagement_rate": round(avg_engagement),
+            "avg_duration_seconds": round(avg_duration, 1),
+            "avg_duration_display": format_duration(avg_duration),
+        },
+        "views_percentiles": percentiles,
+        "views_percentiles_display": {key: f"{value:,}" for key, value in percentiles.items()},
+        "top_posts": top_posts,
+        "posts_per_month": posts_per_month,
+    }
+
+
+def save_stats_summary(output_file, posts_dir):
+    """
+    Rebuild the stats summary from the view counts on disk and the posts in
+    posts_dir. Runs after every fetch, including ones that kept the data
+    file, so new posts reach the summary on the next scheduled run.
+    """
+    view_counts = load_existing_view_counts(output_file) or []
+    summary = build_stats_summary(view_counts, load_published_posts(posts_dir))
+    summary_file = summary_file_for(output_file)
+    text = json.dumps(summary, indent=2, ensure_ascii=False, sort_keys=True) + "\n"
+    if write_text_if_changed(summary_file, text):
+        print(f"Saved stats summary to {summary_file}")
+    else:
+        print(f"{summary_file} already up to date")
+
+
+def has_existing_view_counts(output_file):
+    """Return True when the existing analytics file has usable view data."""
+    return bool(load_existing_view_counts(output_file))
+
+
+def run_benchmark(args, property_id):
+    """
+    Time the full fetch -> aggregate -> JSON pipeline, then repeat it under
+    tracemalloc to report peak Python heap usage. Output goes to a
+    temporary file so tracked data is never touched.
+    """
+    def fetch_and_save(output_file):
+        view_counts = fetch_popular_posts(
+            property_id,
+            source=build_report_source(args),
+            page_size=args.page_size,
+        )
+        save_to_json(view_counts, output_file)
+        return view_counts
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        output_file = os.path.join(tmp_dir, 'view_count.json')
+
+        start = time.perf_counter()
+        view_counts = fetch_and_save(output_file)
+        elapsed = time.perf_counter() - start
+        output_bytes = os.path.getsize(output_file)
+
+        os.remove(output_file)
+        tracemalloc.start()
+        fetch_and_save(output_file)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    print(f"\n{'='*60}")
+    print("Benchmark:")
+    print(f"  Source: {args.source} (page size {args.page_size:,})")
+    print(f"  Posts written: {len(view_counts):,} ({output_bytes/1024:.1f} KiB)")
+    print(f"  Fetch-to-JSON time: {elapsed:.2f}s")
+    print(f"  Peak traced memory: {peak/1024/1024:.1f} MiB")
+    print(f"{'='*60}")
+
+
+class RecordingReportSource:
+    """
+    Wraps a report source for --self-check: records the offset of every
+    request and raises a non-retryable error at `fail_at_offset`.
+    """
+
+    def __init__(self, source, fail_at_offset=None):
+        self.source = source
+        self.fail_at_offset = fail_at_offset
+        self.offsets = []
+
+    def run_report(self, request):
+        self.offsets.append(request.offset)
+        if request.offset == self.fail_at_offset:
+            raise api_exceptions.PermissionDenied("self-check failure")
+        return self.source.run_report(request)
+
+
+def run_self_check():
+    """
+    Exercise the fetch pipeline offline and report any regression.
+
+    Synthetic rows are recorded once and replayed through FixtureReportSource,
+    so every check runs against the same report: pagination merging across
+    page sizes, duplicate aggregation, retries, checkpoint resume (including
+    the "complete" marker), canonical output and the change threshold.
+
+    Returns:
+        Number of failed checks
+    """
+    failures = []
+
+    def check(name, condition):
+        print(f"  {'ok  ' if condition else 'FAIL'} {name}")
+        if not condition:
+            failures.append(name)
+
+    def row(path, views, duration, engagement, title="Title"):
+        return {
+            "dimension_values": [{"value": path}, {"value": title}],
+            "metric_values": [{"value": str(views)}, {"value": str(duration)}, {"value": str(engagement)}],
+        }
+
+    def read_checkpoint():
+        try:
+            with open(checkpoint_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return {}
+
+    def fetch(source, page_size, **kwargs):
+        return fetch_popular_posts(
+            "self-check",
+            source=source,
+            page_size=page_size,
+            retry_policy=RetryPolicy(initial_delay=0),
+            **kwargs,
+        )
+
+    print("Self-check:")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        fixture_file = os.path.join(tmp_dir, 'fixture.json')
+        checkpoint_file = os.path.join(tmp_dir, 'checkpoint.json')
+
+        # Aggregation: duplicate URLs merge with view-weighted averages, non-posts are dropped
+        response = RunReportResponse.from_json(json.dumps({"rows": [
+            row("/2024/01/02/a/", 300, 10, 0.5, title="A"),
+            row("/2024/01/02/a/", 100, 50, 0.1, title="A (old title)"),
+            row("/tags/python/", 999, 1, 1),
+        ]}))
+        posts_dict = {}
+        aggregate_rows(response.rows, posts_dict)
+        merged = posts_dict.get("/2024/01/02/a/", {})
+        check("aggregate_rows drops non-post paths", list(posts_dict) == ["/2024/01/02/a/"])
+        check("aggregate_rows sums duplicate views", merged.get("views") == 400)
+        check("aggregate_rows keeps the first title", merged.get("title") == "A")
+        check("aggregate_rows weights duration by views",
+              abs(merged.get("total_duration", 0) / 400 - 20) < 1e-9)
+        check("aggregate_rows weights engagement by views",
+              abs(merged.get("total_engagement", 0) / 400 - 40) < 1e-9)
+
+        # Pagination: a recorded report replays to the same posts at any page size
+        expected = fetch(SyntheticReportSource(row_count=2500, post_count=300), 1000, record_file=fixture_file)
+        fixture = FixtureReportSource(fixture_file)
+        check("fixture replays every recorded row", len(fixture.rows) == 2500)
+        check("synthetic fetch returns posts", len(expected) > 0)
+        for page_size in (1, 333, 2500, 10000):
+            source = RecordingReportSource(fixture)
+            result = fetch(source, page_size)
+            check(f"page size {page_size} merges to the same posts", result == expected)
+            check(f"page size {page_size} requests each page once",
+                  source.offsets == list(range(0, 2500, page_size)))
+
+        # Retries: transient failures are retried without losing or repeating rows
+        result = fetch(SyntheticReportSource(row_count=2500, post_count=300, failures=3), 1000)
+        check("retryable errors are retried", result == expected)
+
+        # Checkpoint: a failed run keeps its pages and the next run fetches only the rest
+        source = RecordingReportSource(fixture, fail_at_offset=2000)
+        result = fetch(source, 1000, checkpoint_file=checkpoint_file)
+        check("failed fetch returns no posts", result == [])
+        saved = read_checkpoint()
+        check("failed fetch keeps fetched pages", sorted(saved.get("pages", {})) == ["0", "1000"])
+
+        source = RecordingReportSource(fixture)
+        result = fetch(source, 1000, checkpoint_file=checkpoint_file)
+        check("resumed fetch requests only missing pages", source.offsets == [2000])
+        check("resumed fetch merges to the same posts", result == expected)
+        saved = read_checkpoint()
+        # Deleting the file instead would let CI restore the older cached pages over this run
+        check("complete fetch leaves a marker without pages",
+              saved.get("complete") is True and "pages" not in saved)
+
+        source = RecordingReportSource(fixture)
+        fetch(source, 1000, checkpoint_file=checkpoint_file)
+        check("completed checkpoint is not resumed", source.offsets == [0, 1000, 2000])
+
+        source = RecordingReportSource(fixture, fail_at_offset=1000)
+        fetch(source, 1000, checkpoint_file=checkpoint_file)
+        source = RecordingReportSource(fixture)
+        fetch(source, 500, checkpoint_file=checkpoint_file)
+        check("checkpoint for another page size is ignored", source.offsets == list(range(0, 2500, 500)))
+
+    # Canonical output: input order never changes the bytes; ties order by URL
+    counts = [
+        {"url": "/2024/01/02/b/", "views": 200, "avg_duration_seconds": 1.0, "engagement_rate": 2.0},
+        {"url": "/2024/01/02/a/", "views": 200, "avg_duration_seconds": 1.0, "engagement_rate": 2.0},
+        {"url": "/2024/01/02/c/", "views": 500, "avg_duration_seconds": 1.0, "engagement_rate": 2.0},
+    ]
+    text = canonical_json(counts)
+    check("canonical_json ignores input order", text == canonical_json(list(reversed(counts))))
+    check("canonical_json orders by views then URL",
+          [item["url"] for item in json.loads(text)["view_counts"]]
+          == ["/2024/01/02/c/", "/2024/01/02/a/", "/2024/01/02/b/"])
+    check("canonical_json ends with a newline", text.endswith("}\n"))
+
+    # Change threshold: rank changes always count, small view moves do not
+    old = json.loads(text)["view_counts"]
+    nudged = [dict(item, views=item["views"] + 1) for item in old]
+    check("identical counts are not a change", not is_material_change(old, old, 0.01))
+    check("a move within the threshold is not a change", not is_material_change(old, nudged, 0.01))
+    check("any move is a change at threshold 0", is_material_change(old, nudged, 0))
+    check("a move beyond the threshold is a change",
+          is_material_change(old, [dict(old[0], views=510)] + old[1:], 0.01))
+    check("a reordering is a change", is_material_change(old, [old[1], old[0], old[2]], 0.01))
+    check("a new post is a change", is_material_change(old[:2], old, 0.01))
+
+    print(f"Self-check {'passed' if not failures else f'failed: {len(failures)} check(s)'}")
+    return len(failures)
 
 
 def main():
     """Main function."""
+    args = parse_args()
+    start_profiling(args.profile)
+
+    if args.self_check:
+        raise SystemExit(1 if run_self_check() else 0)
+
+    if args.summary_only:
+        save_stats_summary(args.output, args.posts_dir)
+        return
+
     property_id = os.environ.get('GA_PROPERTY_ID')
+    if args.source != "ga4":
+        # Offline sources never reach GA4, so the property id is only a label
+        property_id = property_id or "offline"
     if not property_id:
         raise ValueError("GA_PROPERTY_ID environment variable not set")
-    
-    print("Fetching all-time view counts from Google Analytics...")
+
+    if args.benchmark:
+        run_benchmark(args, property_id)
+        return
+
+    print(f"Fetching all-time view counts ({args.source})...")
     # Get all-time data (days=None) for all posts (limit=None)
-    view_counts = fetch_popular_posts(property_id, days=None, limit=None)
-    
-    output_file = '_data/view_count.json'
+    view_counts = fetch_popular_posts(
+        property_id,
+        days=None,
+        limit=None,
+        source=build_report_source(args),
+        page_size=args.page_size,
+        record_file=args.record,
+        retry_policy=RetryPolicy(
+            max_retries=args.max_retries,
+            initial_delay=args.retry_delay,
+            time_budget=args.time_budget,
+        ),
+        checkpoint_file=args.checkpoint,
+    )
+
+    output_file = args.output
     if not view_counts and has_existing_view_counts(output_file):
         print("Fetched 0 posts; keeping existing analytics data instead of overwriting it.")
+        save_stats_summary(output_file, args.posts_dir)
         return
 
-    save_to_json(view_counts, output_file)
-    
+    save_to_json(view_counts, output_file, change_threshold=args.change_threshold)
+    save_stats_summary(output_file, args.posts_dir)
+
     print(f"Done! Fetched {len(view_counts)} posts with all-time views.")
 
 
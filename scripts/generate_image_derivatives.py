@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+Generate responsive image derivatives for images used in blog posts.
+
+Companion to generate_og_images.py: it reuses the same `_posts` scan and
+Pillow pipeline. For every local raster image referenced from a post body,
+it writes resized AVIF and WebP variants, and it records a srcset manifest
+in `_data/responsive_images.json`. The `responsive_images` Jekyll plugin
+reads that manifest and wraps matching <img> tags in <picture> elements.
+
+Derivative filenames include a hash of the source bytes, so:
+- runs are incremental: images whose hash is already in the manifest (with
+  all files present) are skipped;
+- each manifest entry lists its files, so the previous files of a changed
+  image, and those of images no longer referenced, are deleted by name;
+- browsers can cache derivatives forever, since a changed source gets new
+  URLs.
+
+Usage:
+    python scripts/generate_image_derivatives.py               # All posts
+    python scripts/generate_image_derivatives.py --post oidc   # One post
+    python scripts/generate_image_derivatives.py --force       # Ignore the manifest
+    python scripts/generate_image_derivatives.py --jobs 4      # Worker processes
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any
+from urllib.parse import unquote
+
+from PIL import Image, features
+
+from generate_og_images import PROJECT_ROOT, selected_posts
+from profiling import add_profile_argument, start_profiling
+
+
+IMAGES_URL_PREFIX = "/assets/images/"
+IMAGES_DIR = PROJECT_ROOT / "assets" / "images"
+DERIVATIVES_DIR = IMAGES_DIR / "responsive"
+MANIFEST_FILE = PROJECT_ROOT / "_data" / "responsive_images.json"
+
+# Post content is at most 800px wide; 1200/1600 cover 1.5x and 2x displays.
+TARGET_WIDTHS = (480, 800, 1200, 1600)
+RASTER_EXTENSIONS = {".png", ".jpg", ".jpeg", ".webp"}
+
+# (extension, MIME type, Pillow save options), best compression first.
+OUTPUT_FORMATS = [
+    ("avif", "image/avif", {"format": "AVIF", "quality": 55, "speed": 6}),
+    ("webp", "image/webp", {"format": "WEBP", "quality": 80, "method": 6}),
+]
+
+MARKDOWN_IMAGE_PATTERN = re.compile(r"!\[[^\]]*\]\(\s*<?([^)\s>]+)")
+HTML_IMAGE_PATTERN = re.compile(r"<img\b[^>]*\bsrc=[\"']([^\"']+)[\"']", re.IGNORECASE)
+HASH_LENGTH = 12
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Generate responsive AVIF/WebP derivatives for post images.",
+    )
+    parser.add_argument(
+        "--post",
+        type=str,
+        help="Process images from one post only (filename or slug).",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Regenerate derivatives even if the manifest says they are current.",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Number of worker processes (default: CPU count).",
+    )
+    add_profile_argument(parser, "generate_image_derivatives")
+    return parser.parse_args()
+
+
+def available_formats() -> list[tuple[str, str, dict[str, Any]]]:
+    """Drop AVIF when the installed Pillow was built without libavif."""
+    return [fmt for fmt in OUTPUT_FORMATS if fmt[0] != "avif" or features.check("avif")]
+
+
+def image_urls_in_post(content: str) -> set[str]:
+    """Return local /assets/images/ raster URLs referenced from a post body."""
+    urls: set[str] = set()
+    for pattern in (MARKDOWN_IMAGE_PATTERN, HTML_IMAGE_PATTERN):
+        for raw_url in pattern.findall(content):
+            url = raw_url.split("#", 1)[0].split("?", 1)[0]
+            if not url.startswith(IMAGES_URL_PREFIX):
+                continue
+            if url.startswith(IMAGES_URL_PREFIX + "responsive/"):
+                continue
+            if Path(unquote(url)).suffix.lower() in RASTER_EXTENSIONS:
+                urls.add(url)
+    return urls
+
+
+def source_path_for(url: str) -> Path:
+    return PROJECT_ROOT / unquote(url).lstrip("/")
+
+
+def file_hash(path: Path) -> str:
+    return hashlib.sha256(path.read_bytes()).hexdigest()[:HASH_LENGTH]
+
+
+def derivative_stem(source: Path, digest: str) -> str:
+    safe_stem = re.sub(r"[^A-Za-z0-9._-]+", "-", source.stem).strip("-") or "image"
+    return f"{safe_stem}-{digest}"
+
+
+def derivative_widths(source_width: int) -> list[int]:
+    """Target widths no larger than the source; small images keep their own width."""
+    return sorted({min(width, source_width) for width in TARGET_WIDTHS})
+
+
+def entry_files(entry: dict[str, Any] | None) -> set[Path]:
+    """Derivative files listed in a manifest entry's srcsets."""
+    files: set[Path] = set()
+    for source in (entry or {}).get("sources", []):
+        for candidate in source["srcset"].split(","):
+            url = candidate.strip().split(" ", 1)[0]
+            files.add(PROJECT_ROOT / url.lstrip("/"))
+    return files
+
+
+def entry_is_current(entry: dict[str, Any] | None, digest: str) -> bool:
+    if not entry or entry.get("hash") != digest:
+        return False
+    return all(path.exists() for path in entry_files(entry))
+
+
+def build_derivatives(url: str, digest: str, formats: list[tuple[str, str, dict[str, Any]]]) -> dict[str, Any]:
+    """
+    Resize one source image to every target width and format.
+
+    Runs in a worker process; returns the manifest entry for the image.
+    """
+    source = source_path_for(url)
+    stem = derivative_stem(source, digest)
+    DERIVATIVES_DIR.mkdir(parents=True, exist_ok=True)
+
+    with Image.open(source) as opened:
+        # Decode once; each width is resized from the same in-memory image
+        has_alpha = "A" in opened.getbands() or "transparency" in opened.info
+        image = opened.convert("RGBA" if has_alpha else "RGB")
+    width, height = image.size
+
+    sources = []
+    for extension, mime_type, save_options in formats:
+        candidates = []
+        for target_width in derivative_widths(width):
+            if target_width == width:
+                resized = image
+            else:
+                target_height = max(1, round(height * target_width / width))
+                resized = image.resize((target_width, target_height), Image.Resampling.LANCZOS)
+            output_path = DERIVATIVES_DIR / f"{stem}-{target_width}.{extension}"
+            resized.save(output_path, **save_options)
+            candidates.append(f"/{output_path.relative_to(PROJECT_ROOT).as_posix()} {target_width}w")
+        sources.append({"type": mime_type, "srcset": ", ".join(candidates)})
+
+    return {"hash": digest, "width": width, "height": height, "sources": sources}
+
+
+def remove_stale_derivatives(stale: dict[str, Any] | None, manifest: dict[str, Any]) -> None:
+    """
+    Delete the files of a replaced or pruned manifest entry.
+
+    Only the files that entry listed are touched, and any still listed by
+    the manifest are kept: derivative names come from the source's stem and
+    hash, so identical images under different paths share their files.
+    """
+    in_use: set[Path] = set()
+    for entry in manifest.values():
+        in_use |= entry_files(entry)
+    for path in entry_files(stale) - in_use:
+        path.unlink(missing_ok=True)
+
+
+def load_manifest() -> dict[str, Any]:
+    try:
+        return json.loads(MANIFEST_FILE.read_text(encoding="utf-8"))
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+
+def save_manifest(manifest: dict[str, Any]) -> None:
+    MANIFEST_FILE.parent.mkdir(parents=True, exist_ok=True)
+    text = json.dumps(manifest, indent=2, sort_keys=True, ensure_ascii=False) + "\n"
+    MANIFEST_FILE.write_text(text, encoding="utf-8")
+
+
+def main() -> None:
+    args = parse_args()
+    start_profiling(args.profile)
+    posts = selected_posts(args.post)
+    if not posts:
+        print("No matching posts found.")
+        sys.exit(1)
+
+    urls: set[str] = set()
+    for post_path in posts:
+        urls |= image_urls_in_post(post_path.read_text(encoding="utf-8"))
+
+    manifest = load_manifest()
+    formats = available_formats()
+    if len(formats) < len(OUTPUT_FORMATS):
+        print("Pillow has no AVIF support; generating WebP only.")
+
+    pending: dict[str, str] = {}
+    skipped = 0
+    missing = 0
+    for url in sorted(urls):
+        source = source_path_for(url)
+        if not source.exists():
+            print(f"! Missing source image: {url}")
+            missing += 1
+            continue
+        digest = file_hash(source)
+        if not args.force and entry_is_current(manifest.get(url), digest):
+            skipped += 1
+            continue
+        pending[url] = digest
+
+    generated = 0
+    failed = 0
+    if pending:
+        with ProcessPoolExecutor(max_workers=max(1, args.jobs)) as executor:
+            futures = {
+                executor.submit(build_derivatives, url, digest, formats): url
+                for url, digest in pending.items()
+            }
+            for future in as_completed(futures):
+                url = futures[future]
+                try:
+                    entry = future.result()
+                except Exception as e:
+                    print(f"! Failed: {url}: {e}")
+                    failed += 1
+                    continue
+                previous = manifest.get(url)
+                manifest[url] = entry
+                remove_stale_derivatives(previous, manifest)
+                generated += 1
+                print(f"Generated: {url}")
+
+    # Only a full run knows every referenced image, so only it prunes entries
+    if not args.post:
+        for url in [url for url in manifest if url not in urls]:
+            remove_stale_derivatives(manifest.pop(url), manifest)
+
+    save_manifest(manifest)
+    print(
+        f"\nDone. Generated: {generated}, Skipped: {skipped}, "
+        f"Missing: {missing}, Failed: {failed}"
+    )
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
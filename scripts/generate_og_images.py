@@ -9,30 +9,67 @@ Card layout:
 - Post title on the left
 - Author name and date at the bottom-left
 - Modern minimalist visual style
+
+With --lang, cards are localized instead: titles come from the translation
+JSONs in assets/translations/<lang>/, set in a font that covers the language
+(CJK, Devanagari), and wrapped between characters for scripts written without
+spaces. Only cards older than their translation are redrawn, in parallel.
+
+Each post is laid out once (title fit, pattern, footer) and rendered in every
+requested format (--formats): the 1200x630 OG card plus Twitter, square and
+thumbnail variants.
 """
 
 from __future__ import annotations
 
 import argparse
+import json
+import os
 import random
 import re
 import sys
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, as_completed, wait
+from dataclasses import dataclass
 from datetime import date, datetime
+from functools import lru_cache
 from pathlib import Path
-from typing import Any
+from typing import Any, Iterator, Optional
 
 import yaml
-from PIL import Image, ImageDraw, ImageFont
+from PIL import Image, ImageDraw, ImageFont, features
+
+from post_changes import changed_posts, record_build_ref, resolve_since
+from profiling import add_profile_argument, start_profiling
+from sharding import parse_shard, shard_units
 
 
 PROJECT_ROOT = Path(__file__).resolve().parent.parent
 POSTS_DIR = PROJECT_ROOT / "_posts"
+TRANSLATIONS_DIR = PROJECT_ROOT / "assets" / "translations"
 OUTPUT_DIR = PROJECT_ROOT / "assets" / "images"
+SOCIAL_DIR = OUTPUT_DIR / "social"
 
 WIDTH = 1200
 HEIGHT = 630
 MARGIN_X = 90
 
+# Card variants, all rendered from one layout per post. "og" keeps the original
+# path; scaled formats are downsampled from another format instead of redrawn.
+CARD_FORMATS = {
+    "og": {"size": (WIDTH, HEIGHT), "dir": OUTPUT_DIR},                     # Open Graph
+    "twitter": {"size": (1200, 600), "dir": SOCIAL_DIR / "twitter"},       # summary_large_image, 2:1
+    "square": {"size": (1200, 1200), "dir": SOCIAL_DIR / "square"},        # LinkedIn / Mastodon
+    "thumb": {"size": (400, 210), "dir": SOCIAL_DIR / "thumb", "scaled_from": "og"},
+}
+
+# zlib level for the PNGs. Encoding is most of a card's cost: level 9 (optimize=True)
+# takes ~4x as long as 6 for files only ~7% smaller, which would make every extra format
+# nearly as expensive as a whole card.
+PNG_COMPRESS_LEVEL = 6
+
+# Render jobs in flight per worker; job planning (and translation reads) stays this far ahead
+JOBS_IN_FLIGHT_PER_WORKER = 2
+
 # Minimalist Theme Colors
 BG_COLOR = (255, 255, 255)
 TEXT_MAIN = (15, 23, 42)       # Dark slate/black
@@ -43,6 +80,48 @@ ACCENT_LINE = (226, 232, 240)  # Very light gray for background shapes
 TITLE_MAX_LINES = 5
 TITLE_MAX_WIDTH = 1000
 
+LANGUAGES = ["es", "zh", "hi", "pt", "fr", "de", "ja", "ko"]
+
+# Title fonts for scripts the Latin fonts do not cover, as (path, face index) candidates.
+# Noto Sans CJK collections hold JP, KR, SC, TC faces in that order.
+LANGUAGE_FONTS = {
+    "zh": {
+        True: [("NotoSansCJK-Bold.ttc", 2), ("/usr/share/fonts/opentype/noto/NotoSansCJK-Bold.ttc", 2),
+               ("/System/Library/Fonts/PingFang.ttc", 0)],
+        False: [("NotoSansCJK-Regular.ttc", 2), ("/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc", 2),
+                ("/System/Library/Fonts/PingFang.ttc", 0)],
+    },
+    "ja": {
+        True: [("NotoSansCJK-Bold.ttc", 0), ("/usr/share/fonts/opentype/noto/NotoSansCJK-Bold.ttc", 0),
+               ("/System/Library/Fonts/ヒラギノ角ゴシック W6.ttc", 0)],
+        False: [("NotoSansCJK-Regular.ttc", 0), ("/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc", 0),
+                ("/System/Library/Fonts/ヒラギノ角ゴシック W3.ttc", 0)],
+    },
+    "ko": {
+        True: [("NotoSansCJK-Bold.ttc", 1), ("/usr/share/fonts/opentype/noto/NotoSansCJK-Bold.ttc", 1),
+               ("/System/Library/Fonts/AppleSDGothicNeo.ttc", 6)],
+        False: [("NotoSansCJK-Regular.ttc", 1), ("/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc", 1),
+                ("/System/Library/Fonts/AppleSDGothicNeo.ttc", 0)],
+    },
+    "hi": {
+        True: [("NotoSansDevanagari-Bold.ttf", 0), ("/usr/share/fonts/truetype/noto/NotoSansDevanagari-Bold.ttf", 0),
+               ("/System/Library/Fonts/Kohinoor.ttc", 4)],
+        False: [("NotoSansDevanagari-Regular.ttf", 0),
+                ("/usr/share/fonts/truetype/noto/NotoSansDevanagari-Regular.ttf", 0),
+                ("/System/Library/Fonts/Kohinoor.ttc", 0)],
+    },
+}
+
+# Han, kana, CJK punctuation and fullwidth forms: written without spaces, so a
+# line may break between any two characters (Hangul is spaced and wraps by word)
+NO_SPACE_CHARS = "\u3000-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uff00-\uffef"
+BREAK_UNIT_PATTERN = re.compile(f"[{NO_SPACE_CHARS}]|[^{NO_SPACE_CHARS}]+")
+
+# Line breaking rules (kinsoku): never start a line with these...
+NO_LINE_START = set("、。，．,.!?！？：；:;)]}）］｝〕〉》」』】〙〗ー々・…‥ぁぃぅぇぉっゃゅょゎァィゥェォッャュョヮヵヶ")
+# ...or end one with these
+NO_LINE_END = set("([{（［｛〔〈《「『【〘〖")
+
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(
         description="Generate OG images for blog posts.",
@@ -74,7 +153,53 @@ def parse_args() -> argparse.Namespace:
         default="post",
         help="Use today's date or post front-matter date.",
     )
-    return parser.parse_args()
+    parser.add_argument(
+        "--formats",
+        type=str,
+        default="og",
+        help=f"Comma-separated card formats to write ({', '.join(CARD_FORMATS)}) or 'all'. Default: og.",
+    )
+    parser.add_argument(
+        "--lang",
+        type=str,
+        help=f"Render localized cards from translation titles: comma-separated ({', '.join(LANGUAGES)}) or 'all'.",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Worker processes for rendering (default: CPU count).",
+    )
+    parser.add_argument(
+        "--shard",
+        type=str,
+        help="Only render shard i of N (e.g. 2/4) of the card jobs, for a CI matrix.",
+    )
+    parser.add_argument(
+        "--changed-since",
+        type=str,
+        help="Only consider posts changed since this git ref ('last' = last successful run); "
+             "falls back to all posts when git cannot tell.",
+    )
+    add_profile_argument(parser, "generate_og_images")
+    args = parser.parse_args()
+    names = list(CARD_FORMATS) if args.formats == "all" else [name.strip() for name in args.formats.split(",") if name.strip()]
+    unknown = [name for name in names if name not in CARD_FORMATS]
+    if unknown or not names:
+        parser.error(f"--formats: unknown format(s) {', '.join(unknown) or '(none)'}; choose from {', '.join(CARD_FORMATS)}")
+    args.formats = names
+    try:
+        args.shard = parse_shard(args.shard)
+    except ValueError as e:
+        parser.error(f"--shard: {e}")
+
+    if args.lang:
+        langs = LANGUAGES if args.lang == "all" else [lang.strip() for lang in args.lang.split(",") if lang.strip()]
+        unknown = [lang for lang in langs if lang not in LANGUAGES]
+        if unknown or not langs:
+            parser.error(f"--lang: unknown language(s) {', '.join(unknown) or '(none)'}; choose from {', '.join(LANGUAGES)}")
+        args.lang = langs
+    return args
 
 
 def post_slug_from_filename(filename: str) -> str:
@@ -96,7 +221,24 @@ def parse_front_matter(content: str) -> dict[str, Any]:
     return loaded
 
 
-def load_font(size: int, bold: bool) -> ImageFont.FreeTypeFont | ImageFont.ImageFont:
+@lru_cache(maxsize=None)
+def load_language_font(size: int, bold: bool, lang: str) -> Optional[ImageFont.FreeTypeFont]:
+    """Font covering `lang`'s script, or None when none of its candidates is installed."""
+    for font_path, index in LANGUAGE_FONTS[lang][bold]:
+        try:
+            return ImageFont.truetype(font_path, size=size, index=index)
+        except OSError:
+            continue
+    return None
+
+
+@lru_cache(maxsize=None)
+def load_font(size: int, bold: bool, lang: Optional[str] = None) -> ImageFont.FreeTypeFont | ImageFont.ImageFont:
+    if lang in LANGUAGE_FONTS:
+        font = load_language_font(size, bold, lang)
+        if font is not None:
+            return font
+
     candidates: list[str]
     if bold:
         candidates = [
@@ -122,29 +264,52 @@ def load_font(size: int, bold: bool) -> ImageFont.FreeTypeFont | ImageFont.Image
     return ImageFont.load_default()
 
 
+# Text is measured on a scratch canvas; layouts do not depend on the card size
+MEASURE_DRAW = ImageDraw.Draw(Image.new("RGB", (1, 1)))
+
+
 def wrap_lines(
     draw: ImageDraw.ImageDraw,
     text: str,
     font: ImageFont.FreeTypeFont | ImageFont.ImageFont,
     max_width: int,
 ) -> list[str]:
-    words = text.split()
-    if not words:
+    units = break_units(text)
+    if not units:
         return [""]
 
     lines: list[str] = []
-    current = words[0]
-    for word in words[1:]:
-        candidate = f"{current} {word}"
+    current = units[0][0]
+    for unit, spaced in units[1:]:
+        candidate = f"{current} {unit}" if spaced else f"{current}{unit}"
         if draw.textlength(candidate, font=font) <= max_width:
             current = candidate
         else:
             lines.append(current)
-            current = word
+            current = unit
     lines.append(current)
     return lines
 
 
+def break_units(text: str) -> list[tuple[str, bool]]:
+    """
+    Split text into the pieces a line may break between.
+
+    Returns:
+        List of (unit, whether a space precedes it). Words are units; in scripts
+        written without spaces every character is, except that punctuation stays
+        attached where a line may not start or end with it.
+    """
+    units: list[tuple[str, bool]] = []
+    for word_index, word in enumerate(text.split()):
+        for piece_index, piece in enumerate(BREAK_UNIT_PATTERN.findall(word)):
+            if piece_index and (piece[0] in NO_LINE_START or units[-1][0][-1] in NO_LINE_END):
+                units[-1] = (units[-1][0] + piece, units[-1][1])
+            else:
+                units.append((piece, word_index > 0 and piece_index == 0))
+    return units
+
+
 def clamp_lines_with_ellipsis(
     draw: ImageDraw.ImageDraw,
     lines: list[str],
@@ -167,16 +332,17 @@ def fit_title(
     draw: ImageDraw.ImageDraw,
     title: str,
     max_width: int,
+    lang: Optional[str] = None,
 ) -> tuple[ImageFont.FreeTypeFont | ImageFont.ImageFont, list[str], int]:
     # Supermemory font style: larger, bolder
     for size in (80, 72, 64, 56, 48):
-        font = load_font(size=size, bold=True)
+        font = load_font(size=size, bold=True, lang=lang)
         lines = wrap_lines(draw=draw, text=title, font=font, max_width=max_width)
         if len(lines) <= TITLE_MAX_LINES:
             return font, lines, size
 
     fallback_size = 42
-    fallback_font = load_font(size=fallback_size, bold=True)
+    fallback_font = load_font(size=fallback_size, bold=True, lang=lang)
     fallback_lines = wrap_lines(
         draw=draw,
         text=title,
@@ -226,98 +392,152 @@ import random
 
 # ... existing code ...
 
-def draw_pattern_1(draw: ImageDraw.ImageDraw, line_width: int):
+def draw_pattern_1(draw: ImageDraw.ImageDraw, line_width: int, width: int, height: int):
     """Original chevron pattern"""
     draw.line(
-        [(WIDTH - 350, -50), (WIDTH - 150, 150), (WIDTH - 350, 350)],
+        [(width - 350, -50), (width - 150, 150), (width - 350, 350)],
         fill=ACCENT_LINE,
         width=line_width
     )
     draw.line(
-        [(WIDTH - 280, -50), (WIDTH - 80, 150), (WIDTH - 280, 350)],
+        [(width - 280, -50), (width - 80, 150), (width - 280, 350)],
         fill=ACCENT_LINE,
         width=line_width
     )
     draw.line(
-        [(50, HEIGHT - 350), (250, HEIGHT - 150), (50, HEIGHT + 50)],
+        [(50, height - 350), (250, height - 150), (50, height + 50)],
         fill=ACCENT_LINE,
         width=line_width
     )
 
-def draw_pattern_2(draw: ImageDraw.ImageDraw, line_width: int):
+def draw_pattern_2(draw: ImageDraw.ImageDraw, line_width: int, width: int, height: int):
     """Grid of dots"""
-    for x in range(0, WIDTH, 60):
-        for y in range(0, HEIGHT, 60):
+    for x in range(0, width, 60):
+        for y in range(0, height, 60):
             draw.ellipse(
                 [(x, y), (x + line_width, y + line_width)],
                 fill=ACCENT_LINE
             )
 
-def draw_pattern_3(draw: ImageDraw.ImageDraw, line_width: int):
+def draw_pattern_3(draw: ImageDraw.ImageDraw, line_width: int, width: int, height: int):
     """Diagonal stripes (top right)"""
     step = 40
-    for i in range(-WIDTH, WIDTH, step):
-        start = (WIDTH + i, -50)
-        end = (WIDTH + i - 300, 300)
+    for i in range(-width, width, step):
+        start = (width + i, -50)
+        end = (width + i - 300, 300)
         draw.line([start, end], fill=ACCENT_LINE, width=line_width // 2)
 
-def draw_pattern_4(draw: ImageDraw.ImageDraw, line_width: int):
+def draw_pattern_4(draw: ImageDraw.ImageDraw, line_width: int, width: int, height: int):
     """Large Circles"""
     draw.ellipse(
-        [(WIDTH - 400, -100), (WIDTH + 100, 400)],
+        [(width - 400, -100), (width + 100, 400)],
         outline=ACCENT_LINE,
         width=line_width
     )
     draw.ellipse(
-        [(WIDTH - 250, 100), (WIDTH - 50, 300)],
+        [(width - 250, 100), (width - 50, 300)],
         outline=ACCENT_LINE,
         width=line_width
     )
     draw.ellipse(
-        [(-100, HEIGHT - 300), (200, HEIGHT)],
+        [(-100, height - 300), (200, height)],
         outline=ACCENT_LINE,
         width=line_width
     )
 
-def create_card_image(title: str, footer_text: str, output_path: Path) -> None:
-    # 1. Solid white background
-    image = Image.new("RGB", (WIDTH, HEIGHT), BG_COLOR)
+PATTERNS = [draw_pattern_1, draw_pattern_2, draw_pattern_3, draw_pattern_4]
+
+
+@dataclass(frozen=True)
+class CardLayout:
+    """Everything about a card that does not depend on its size, computed once per post."""
+
+    title_font: ImageFont.FreeTypeFont | ImageFont.ImageFont
+    title_lines: list[str]
+    title_size: int
+    footer_text: str
+    pattern: int
+
+
+def layout_card(
+    title: str,
+    footer_text: str,
+    lang: Optional[str] = None,
+    pattern_title: Optional[str] = None,
+) -> CardLayout:
+    # Subtle Geometric Background (Randomized deterministically based on title)
+    # Use title length + first char code to pick a stable random seed; localized
+    # cards seed from the English title so every language gets the same pattern
+    seed = sum(ord(c) for c in (pattern_title or title))
+    pattern = random.Random(seed).choice(range(len(PATTERNS)))
+
+    # Every rendered size shares the design width, so the title is fitted once
+    title_font, title_lines, title_size = fit_title(
+        draw=MEASURE_DRAW, title=title, max_width=TITLE_MAX_WIDTH, lang=lang
+    )
+    return CardLayout(title_font, title_lines, title_size, footer_text, pattern)
+
+
+@lru_cache(maxsize=None)
+def card_background(pattern: int, width: int, height: int) -> Image.Image:
+    """Solid background with its geometric pattern, shared by every card of that size."""
+    image = Image.new("RGB", (width, height), BG_COLOR)
+    PATTERNS[pattern](ImageDraw.Draw(image), 3, width, height)
+    return image
+
+
+def render_card(layout: CardLayout, width: int, height: int) -> Image.Image:
+    image = card_background(layout.pattern, width, height).copy()
     draw = ImageDraw.Draw(image)
 
-    # 2. Subtle Geometric Background (Randomized deterministically based on title)
-    # Use title length + first char code to pick a stable random seed
-    seed = sum(ord(c) for c in title)
-    random.seed(seed)
-    
-    line_width = 3
-    patterns = [draw_pattern_1, draw_pattern_2, draw_pattern_3, draw_pattern_4]
-    selected_pattern = random.choice(patterns)
-    selected_pattern(draw, line_width)
-    
-    # 3. Branding (Top Left) - REMOVED per user request
-    # ...
-
-    # 4. Title (Vertically Centered, Left Aligned)
-    title_font, title_lines, title_size = fit_title(draw=draw, title=title, max_width=TITLE_MAX_WIDTH)
-    
-    # Calculate vertical center for the text block
-    line_height = int(title_size * 1.2)
-    total_text_height = line_height * len(title_lines)
-    
+    # Title (Vertically Centered, Left Aligned)
+    line_height = int(layout.title_size * 1.2)
+    total_text_height = line_height * len(layout.title_lines)
+
     # Optical center
-    start_y = (HEIGHT - total_text_height) // 2 - 20 
-    
-    for line in title_lines:
-        draw.text((MARGIN_X, start_y), line, font=title_font, fill=TEXT_MAIN)
+    start_y = (height - total_text_height) // 2 - 20
+
+    for line in layout.title_lines:
+        draw.text((MARGIN_X, start_y), line, font=layout.title_font, fill=TEXT_MAIN)
         start_y += line_height
 
-    # 5. Footer (Bottom Left)
-    meta_font = load_font(size=32, bold=False)
-    draw.text((MARGIN_X, HEIGHT - 90), footer_text, font=meta_font, fill=TEXT_META)
+    # Footer (Bottom Left)
+    draw.text((MARGIN_X, height - 90), layout.footer_text, font=load_font(size=32, bold=False), fill=TEXT_META)
+    return image
 
-    # Save
-    output_path.parent.mkdir(parents=True, exist_ok=True)
-    image.save(output_path, format="PNG", optimize=True)
+
+def create_card_images(
+    title: str,
+    footer_text: str,
+    outputs: dict[str, Path],
+    lang: Optional[str] = None,
+    pattern_title: Optional[str] = None,
+) -> None:
+    """
+    Render the requested CARD_FORMATS of one post from a single layout.
+
+    Scaled formats are resized from their base rendering, which is drawn once
+    even when only the scaled variant is written.
+    """
+    layout = layout_card(title, footer_text, lang, pattern_title)
+    rendered: dict[str, Image.Image] = {}
+
+    def render(name: str) -> Image.Image:
+        if name not in rendered:
+            card_format = CARD_FORMATS[name]
+            if "scaled_from" in card_format:
+                rendered[name] = render(card_format["scaled_from"]).resize(card_format["size"], Image.LANCZOS)
+            else:
+                rendered[name] = render_card(layout, *card_format["size"])
+        return rendered[name]
+
+    for name, output_path in outputs.items():
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        render(name).save(output_path, format="PNG", compress_level=PNG_COMPRESS_LEVEL)
+
+
+def create_card_image(title: str, footer_text: str, output_path: Path) -> None:
+    create_card_images(title, footer_text, {"og": output_path})
 
 
 def selected_posts(post_filter: str | None) -> list[Path]:
@@ -333,28 +553,54 @@ def selected_posts(post_filter: str | None) -> list[Path]:
     return filtered
 
 
-def main() -> None:
-    args = parse_args()
-    posts = selected_posts(args.post)
-    if not posts:
-        print("No matching posts found.")
-        sys.exit(1)
+def card_output_path(name: str, slug: str, lang: Optional[str] = None) -> Path:
+    """English cards keep the CARD_FORMATS paths; localized ones go to social/<lang>/<format>/."""
+    if lang:
+        return SOCIAL_DIR / lang / name / f"{slug}.png"
+    return CARD_FORMATS[name]["dir"] / f"{slug}.png"
 
-    generated = 0
-    skipped = 0
 
+def missing_languages(langs: list[str]) -> list[str]:
+    """Languages with a script-specific font entry but no such font installed."""
+    return [lang for lang in langs if lang in LANGUAGE_FONTS and load_language_font(80, True, lang) is None]
+
+
+def shard_card_units(args: argparse.Namespace, posts: list[Path]) -> Optional[set]:
+    """Post file names (or (name, lang) pairs with --lang) this shard renders; None renders all."""
+    if args.shard is None:
+        return None
+    if args.lang:
+        units = [(post_path.name, lang) for post_path in posts for lang in args.lang]
+    else:
+        units = [post_path.name for post_path in posts]
+    # Cards cost about the same to render, so shards get equal counts
+    return shard_units({unit: 1.0 for unit in units}, args.shard)
+
+
+def iter_card_jobs(
+    args: argparse.Namespace,
+    posts: list[Path],
+    stats: dict[str, int],
+    units: Optional[set] = None,
+) -> Iterator[dict[str, Any]]:
+    """
+    Yield one render job per post (or per post and language with --lang) that needs cards.
+
+    Jobs are produced lazily: a translation file is read only when the next
+    job is requested, and render_card_jobs() requests them no faster than the
+    workers finish. A localized card is redrawn when it is missing or older
+    than its translation.
+    Units outside `units` belong to another shard and are left out.
+    """
     for post_path in posts:
+        if units is not None and not args.lang and post_path.name not in units:
+            continue
         content = post_path.read_text(encoding="utf-8")
         front_matter = parse_front_matter(content)
         slug = post_slug_from_filename(post_path.name)
 
         if not args.all and front_matter.get("image"):
-            skipped += 1
-            continue
-
-        output_path = OUTPUT_DIR / f"{slug}.png"
-        if output_path.exists() and not args.force:
-            skipped += 1
+            stats["skipped"] += 1
             continue
 
         title = str(front_matter.get("title", slug.replace("-", " ").title()))
@@ -362,14 +608,122 @@ def main() -> None:
             date_label = date_from_front_matter(front_matter)
         else:
             date_label = datetime.now().strftime("%b %d, %Y")
-
         footer = f"{args.author}  |  {date_label}"
-        create_card_image(title=title, footer_text=footer, output_path=output_path)
-        generated += 1
-        print(f"Generated: {output_path.relative_to(PROJECT_ROOT)}")
 
-    print(f"\nDone. Generated: {generated}, Skipped: {skipped}")
+        if not args.lang:
+            outputs = {
+                name: card_output_path(name, slug)
+                for name in args.formats
+                if args.force or not card_output_path(name, slug).exists()
+            }
+            if not outputs:
+                stats["skipped"] += 1
+                continue
+            yield {"title": title, "footer_text": footer, "outputs": outputs}
+            continue
+
+        for lang in args.lang:
+            if units is not None and (post_path.name, lang) not in units:
+                continue
+            translation_path = TRANSLATIONS_DIR / lang / f"{slug}.json"
+            try:
+                translated_at = translation_path.stat().st_mtime
+                translated_title = json.loads(translation_path.read_text(encoding="utf-8")).get("title")
+            except (OSError, json.JSONDecodeError):
+                translated_title = None
+            if not translated_title:
+                stats["untranslated"] += 1
+                continue
+
+            outputs = {}
+            for name in args.formats:
+                output_path = card_output_path(name, slug, lang)
+                if args.force or not output_path.exists() or output_path.stat().st_mtime < translated_at:
+                    outputs[name] = output_path
+            if not outputs:
+                stats["skipped"] += 1
+                continue
+            yield {
+                "title": str(translated_title),
+                "footer_text": footer,
+                "outputs": outputs,
+                "lang": lang,
+                "pattern_title": title,
+            }
+
+
+def render_card_job(job: dict[str, Any]) -> list[Path]:
+    """Process pool entry point; fonts and backgrounds stay cached per worker."""
+    create_card_images(**job)
+    return list(job["outputs"].values())
+
+
+def render_card_jobs(jobs: Iterator[dict[str, Any]], workers: int) -> Iterator[list[Path]]:
+    """
+    Render jobs as they are produced and yield each job's written paths.
+
+    With a process pool at most JOBS_IN_FLIGHT_PER_WORKER jobs per worker are
+    submitted at a time, and the next one is only pulled from `jobs` when one
+    finishes. Results arrive in completion order.
+    """
+    if workers <= 1:
+        yield from map(render_card_job, jobs)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = set()
+        for job in jobs:
+            pending.add(executor.submit(render_card_job, job))
+            if len(pending) >= workers * JOBS_IN_FLIGHT_PER_WORKER:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+        for future in as_completed(pending):
+            yield future.result()
+
+
+def main() -> None:
+    args = parse_args()
+    start_profiling(args.profile)
+    posts = selected_posts(args.post)
+    if args.changed_since and not args.post:
+        since = resolve_since(args.changed_since, "generate_og_images")
+        changed = changed_posts(POSTS_DIR, since) if since else None
+        if changed is None:
+            print(f"No git diff against '{args.changed_since}', scanning all {len(posts)} posts.")
+        elif not changed:
+            print("No posts changed.")
+            record_build_ref("generate_og_images")
+            return
+        else:
+            posts = changed
+    if not posts:
+        print("No matching posts found.")
+        sys.exit(1)
+
+    if args.lang:
+        missing = missing_languages(args.lang)
+        for lang in missing:
+            print(f"Skipping {lang}: no font for its script found (install Noto Sans CJK / Noto Sans Devanagari).")
+        args.lang = [lang for lang in args.lang if lang not in missing]
+        if "hi" in args.lang and not features.check("raqm"):
+            print("Warning: Pillow lacks libraqm; Devanagari conjuncts and vowel signs will not be shaped correctly.")
+
+    generated = 0
+    stats = {"skipped": 0, "untranslated": 0}
+    jobs = iter_card_jobs(args, posts, stats, shard_card_units(args, posts))
+
+    for paths in render_card_jobs(jobs, args.jobs):
+        generated += len(paths)
+        print(f"Generated: {', '.join(str(path.relative_to(PROJECT_ROOT)) for path in paths)}")
+
+    summary = f"\nDone. Generated: {generated}, Skipped: {stats['skipped']}"
+    if args.lang:
+        summary += f", Untranslated: {stats['untranslated']}"
+    print(summary)
+    if not args.post and not args.lang and not args.shard:
+        record_build_ref("generate_og_images")
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
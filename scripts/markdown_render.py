@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Local markdown rendering for translate_posts.py --output-format markdown.
+
+Follows the site's kramdown settings (_config.yml: GFM input, auto_ids) as far
+as the translated post bodies need:
+
+- CommonMark with GFM tables and strikethrough, raw HTML passed through;
+- fenced code as <pre><code class="language-x">, like the existing translations
+  (rouge highlighting is left to the English pages);
+- smart quotes and typographic dashes/ellipses;
+- heading ids generated the way kramdown's auto_ids does;
+- span IALs after images ({: .post-img width="..." height="..." }) applied as
+  attributes of the image.
+
+Needs the markdown-it-py package.
+"""
+
+from __future__ import annotations
+
+import re
+from functools import lru_cache
+from typing import Any
+
+
+# kramdown accepts spaces in link targets; CommonMark needs them in <...>
+SPACED_TARGET_PATTERN = re.compile(r"(\]\()([^()<>\s\"']+(?: [^()<>\s\"']+)+)(\))")
+IAL_PATTERN = re.compile(r"^\{:\s*([^}]*)\}")
+IAL_PART_PATTERN = re.compile(r"\.([\w-]+)|#([\w-]+)|([\w-]+)=(?:\"([^\"]*)\"|'([^']*)'|(\S+))")
+
+
+def parse_ial(text: str) -> list[tuple[str, str]]:
+    """Attributes of a kramdown inline attribute list body (".cls #id key="value")."""
+    classes = []
+    attrs = []
+    for match in IAL_PART_PATTERN.finditer(text):
+        css_class, element_id, key = match.group(1), match.group(2), match.group(3)
+        if css_class:
+            classes.append(css_class)
+        elif element_id:
+            attrs.append(("id", element_id))
+        elif key:
+            attrs.append((key, next((value for value in match.groups()[3:] if value is not None), "")))
+    if classes:
+        attrs.insert(0, ("class", " ".join(classes)))
+    return attrs
+
+
+def kramdown_id(text: str, used: dict[str, int]) -> str:
+    """Heading id as kramdown's auto_ids builds it, numbered when repeated."""
+    generated = re.sub(r"^[^a-zA-Z]+", "", text)
+    generated = re.sub(r"[^a-zA-Z0-9 -]", "", generated)
+    generated = generated.replace(" ", "-").lower() or "section"
+    if generated in used:
+        used[generated] += 1
+        return f"{generated}-{used[generated]}"
+    used[generated] = 0
+    return generated
+
+
+def kramdown_extensions(state: Any) -> None:
+    """markdown-it core rule: heading ids and image IALs, before smart quotes rewrite the IAL text."""
+    used_ids: dict[str, int] = {}
+    tokens = state.tokens
+    for index, token in enumerate(tokens):
+        if token.type == "heading_open" and index + 1 < len(tokens):
+            children = tokens[index + 1].children or []
+            text = "".join(child.content for child in children if child.type in {"text", "code_inline"})
+            token.attrSet("id", kramdown_id(text, used_ids))
+        if token.type != "inline" or not token.children:
+            continue
+        children = token.children
+        for position, child in enumerate(children[:-1]):
+            following = children[position + 1]
+            if child.type != "image" or following.type != "text":
+                continue
+            ial = IAL_PATTERN.match(following.content)
+            if not ial:
+                continue
+            for key, value in parse_ial(ial.group(1)):
+                child.attrSet(key, value)
+            following.content = following.content[ial.end():]
+
+
+@lru_cache(maxsize=1)
+def markdown_parser() -> Any:
+    from markdown_it import MarkdownIt
+
+    parser = MarkdownIt("commonmark", {"html": True, "typographer": True, "quotes": "“”‘’"})
+    parser.enable(["table", "strikethrough", "replacements", "smartquotes"])
+    parser.core.ruler.before("replacements", "kramdown_extensions", kramdown_extensions)
+    return parser
+
+
+def render_markdown(text: str) -> str:
+    """Render a markdown post body to HTML."""
+    return markdown_parser().render(SPACED_TARGET_PATTERN.sub(r"\1<\2>\3", text))
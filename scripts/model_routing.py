@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Model fallback and hedged requests for translate_posts.py.
+
+ModelRouter runs one translation against an ordered list of models:
+
+- the first model gets the request;
+- if it has not answered by its hedge deadline (the p95 of its recorded
+  latencies), the next model gets a duplicate request, and the first valid
+  result wins while the other request is cancelled;
+- if a model fails outright, the next model is tried immediately.
+
+ModelStats persists per-model latencies and outcomes between runs, so the
+hedge deadlines follow what each model actually does. A recorded latency runs
+from the moment the answering HTTP request went out (mark_request_sent, called
+by the HTTP layer), so time spent waiting for a pooled connection or sleeping
+between retries does not inflate the deadlines.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Optional, TypeVar
+
+from translation_metrics import percentile
+
+
+T = TypeVar("T")
+
+# Successful request durations kept per model; older ones age out
+LATENCY_WINDOW = 200
+
+# Until a model has this many recorded successes its p95 is not trusted
+MIN_LATENCY_SAMPLES = 10
+
+# Hedge deadlines in seconds: used without enough samples, and the floor,
+# so a fast streak cannot make every request a duplicate
+DEFAULT_HEDGE_DEADLINE = 300.0
+MIN_HEDGE_DEADLINE = 30.0
+
+# Send times of the current routed request; each launched task gets its own list
+_send_times: contextvars.ContextVar[Optional[list[float]]] = contextvars.ContextVar("send_times", default=None)
+
+
+def mark_request_sent() -> None:
+    """Note that the current routed request has just gone out on a connection."""
+    send_times = _send_times.get()
+    if send_times is not None:
+        send_times.append(time.monotonic())
+
+
+class ModelStats:
+    """Per-model latency and outcome history, persisted as JSON."""
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = path
+        data = {}
+        if path is not None:
+            try:
+                data = json.loads(path.read_text(encoding="utf-8"))
+            except (OSError, json.JSONDecodeError):
+                data = {}
+        self._models: dict[str, dict[str, Any]] = data if isinstance(data, dict) else {}
+        self._run: dict[str, dict[str, int]] = {}
+
+    def _entry(self, model: str) -> dict[str, Any]:
+        entry = self._models.setdefault(model, {})
+        entry.setdefault("latencies", [])
+        entry.setdefault("successes", 0)
+        entry.setdefault("failures", 0)
+        return entry
+
+    def _run_entry(self, model: str) -> dict[str, int]:
+        return self._run.setdefault(model, {"successes": 0, "failures": 0, "hedges": 0, "fallbacks": 0})
+
+    def record(self, model: str, seconds: float, ok: bool) -> None:
+        """Record a finished (not cancelled) request."""
+        entry = self._entry(model)
+        if ok:
+            entry["successes"] += 1
+            entry["latencies"] = (entry["latencies"] + [round(seconds, 3)])[-LATENCY_WINDOW:]
+            self._run_entry(model)["successes"] += 1
+        else:
+            entry["failures"] += 1
+            self._run_entry(model)["failures"] += 1
+
+    def launched(self, model: str, cause: str) -> None:
+        """Count a request sent to `model` as a hedge or a fallback."""
+        self._run_entry(model)[f"{cause}s"] += 1
+
+    def deadline(self, model: str) -> float:
+        """Seconds to wait for `model` before hedging with the next one."""
+        latencies = sorted(self._entry(model)["latencies"])
+        if len(latencies) < MIN_LATENCY_SAMPLES:
+            return DEFAULT_HEDGE_DEADLINE
+        return max(MIN_HEDGE_DEADLINE, percentile(latencies, 0.95))
+
+    def save(self) -> None:
+        if self.path is None:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        tmp_path.write_text(json.dumps(self._models, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+        os.replace(tmp_path, self.path)
+
+    def summary_lines(self) -> list[str]:
+        """One line per model used in this run."""
+        lines = []
+        for model, run in self._run.items():
+            latencies = sorted(self._entry(model)["latencies"])
+            line = f"  {model}: {run['successes']} ok, {run['failures']} failed"
+            if run["hedges"] or run["fallbacks"]:
+                line += f" | sent as hedge {run['hedges']}, fallback {run['fallbacks']}"
+            if latencies:
+                line += f" | p50 {percentile(latencies, 0.50):.0f}s, p95 {percentile(latencies, 0.95):.0f}s"
+            lines.append(line)
+        return lines
+
+
+class ModelRouter:
+    """Runs a request against an ordered list of models with hedging and fallback."""
+
+    def __init__(self, models: list[str], stats: ModelStats, hedge: bool = True):
+        if not models:
+            raise ValueError("ModelRouter needs at least one model")
+        self.models = models
+        self.stats = stats
+        self.hedge = hedge
+
+    async def run(
+        self,
+        request: Callable[[str], Awaitable[T]],
+        on_switch: Optional[Callable[[str], None]] = None,
+    ) -> tuple[str, T]:
+        """
+        Call `request(model)` until one model returns a result.
+
+        Returns:
+            Tuple of (model that answered, its result). When every model fails,
+            the first model's error is raised. `on_switch` is called with
+            "hedge" or "fallback" each time another model is brought in.
+        """
+        pending: dict[asyncio.Task, tuple[str, float, list[float]]] = {}
+        errors: list[BaseException] = []
+        next_index = 0
+
+        def launch(cause: str = "") -> None:
+            nonlocal next_index
+            model = self.models[next_index]
+            next_index += 1
+            if cause:
+                self.stats.launched(model, cause)
+                if on_switch is not None:
+                    on_switch(cause)
+            # The task copies the context here, so its sends land in its own list
+            send_times: list[float] = []
+            token = _send_times.set(send_times)
+            try:
+                pending[asyncio.ensure_future(request(model))] = (model, time.monotonic(), send_times)
+            finally:
+                _send_times.reset(token)
+
+        launch()
+        try:
+            while pending:
+                timeout = None
+                if self.hedge and next_index < len(self.models):
+                    model, started, _ = max(pending.values(), key=lambda item: item[1])
+                    timeout = max(0.0, started + self.stats.deadline(model) - time.monotonic())
+
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    launch("hedge")
+                    continue
+
+                # Prefer a success when several requests finish together
+                for task in sorted(done, key=lambda task: task.exception() is not None):
+                    model, started, send_times = pending.pop(task)
+                    error = task.exception()
+                    # Latency of the last attempt, from when it was sent
+                    sent = send_times[-1] if send_times else started
+                    self.stats.record(model, time.monotonic() - sent, ok=error is None)
+                    if error is None:
+                        return model, task.result()
+                    errors.append(error)
+
+                if not pending and next_index < len(self.models):
+                    launch("fallback")
+            raise errors[0]
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
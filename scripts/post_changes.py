@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Git-based change detection for the post maintenance scripts.
+
+translate_posts.py and generate_og_images.py normally read every file in
+_posts. With --changed-since they ask git which posts were added or modified
+since a ref instead (committed changes, uncommitted edits and untracked
+files), so planning cost follows the size of the change, not of the archive.
+
+The special ref "last" is the HEAD recorded by the script's previous
+successful run (.cache/last_build_refs.json). Whenever git cannot answer
+(no repository, unknown ref, shallow clone), callers fall back to a full scan.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import subprocess
+from pathlib import Path
+from typing import Optional
+
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+BUILD_REFS_FILE = PROJECT_ROOT / ".cache" / "last_build_refs.json"
+
+
+def git(*args: str) -> Optional[str]:
+    """Run a git command in the project root; None if git is missing or the command fails."""
+    try:
+        result = subprocess.run(
+            ["git", *args], cwd=PROJECT_ROOT, capture_output=True, text=True, check=True
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return result.stdout
+
+
+def load_build_refs() -> dict[str, str]:
+    try:
+        data = json.loads(BUILD_REFS_FILE.read_text(encoding="utf-8"))
+    except (OSError, json.JSONDecodeError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def resolve_since(since: str, key: str) -> Optional[str]:
+    """Map "last" to the ref recorded for `key`; other refs pass through."""
+    if since == "last":
+        return load_build_refs().get(key)
+    return since
+
+
+def changed_posts(posts_dir: Path, since: str) -> Optional[list[Path]]:
+    """
+    Posts added or modified since `since`, including uncommitted and untracked files.
+
+    Returns:
+        Sorted post paths (deleted posts excluded), or None when git cannot
+        diff against `since` and the caller should scan every post.
+    """
+    commit = git("rev-parse", "--verify", "--quiet", f"{since}^{{commit}}")
+    if not commit:
+        return None
+    relative_dir = str(posts_dir.relative_to(PROJECT_ROOT))
+    diff = git("diff", "--name-only", "-z", "--diff-filter=d", commit.strip(), "--", relative_dir)
+    untracked = git("ls-files", "-z", "--others", "--exclude-standard", "--", relative_dir)
+    if diff is None or untracked is None:
+        return None
+
+    names = set(filter(None, diff.split("\0"))) | set(filter(None, untracked.split("\0")))
+    return sorted(
+        path
+        for path in (PROJECT_ROOT / name for name in names)
+        if path.suffix == ".md" and path.name.lower() != "readme.md" and path.is_file()
+    )
+
+
+def record_build_ref(key: str) -> Optional[str]:
+    """Remember HEAD as the last successful run of `key`, for --changed-since last."""
+    head = git("rev-parse", "HEAD")
+    if not head:
+        return None
+    refs = load_build_refs()
+    refs[key] = head.strip()
+    BUILD_REFS_FILE.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = BUILD_REFS_FILE.with_name(BUILD_REFS_FILE.name + ".tmp")
+    tmp_path.write_text(json.dumps(refs, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+    os.replace(tmp_path, BUILD_REFS_FILE)
+    return refs[key]
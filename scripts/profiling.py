@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Shared --profile option for the maintenance scripts.
+
+`--profile [PREFIX]` profiles the whole run and writes, next to PREFIX
+(default .cache/profiles/<script>):
+
+- PREFIX.pstats: cProfile data (`python -m pstats`, snakeviz, ...);
+- PREFIX.collapsed: stack samples in collapsed format ("a;b;c count" lines),
+  ready for flamegraph.pl, speedscope or inferno;
+- PREFIX.txt: the top functions by own and cumulative time, plus, for
+  asyncio scripts, the busy time each kind of task spent on the event loop.
+
+The summary is also printed when the run ends. Stacks are sampled from every
+thread every PROFILE_SAMPLE_INTERVAL seconds; work in child processes (process
+pools) is not captured.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import atexit
+import cProfile
+import io
+import pstats
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from collections.abc import Coroutine
+from pathlib import Path
+from typing import Any, Awaitable, Optional, TypeVar
+
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+PROFILE_DIR = PROJECT_ROOT / ".cache" / "profiles"
+
+# Seconds between stack samples of every thread
+PROFILE_SAMPLE_INTERVAL = 0.005
+
+# Rows in each hotspot table
+PROFILE_TOP = 20
+
+T = TypeVar("T")
+
+
+def add_profile_argument(parser: argparse.ArgumentParser, script: str) -> None:
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const=str(PROFILE_DIR / script),
+        default=None,
+        metavar="PREFIX",
+        help=f"Profile the run; writes PREFIX.pstats, .collapsed (flamegraph) and .txt "
+             f"(default PREFIX: .cache/profiles/{script})",
+    )
+
+
+def frame_label(frame: Any) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})"
+
+
+class TaskTimes:
+    """Event-loop time per asyncio task kind (coroutine qualname)."""
+
+    def __init__(self):
+        self.tasks: Counter[str] = Counter()
+        self.steps: Counter[str] = Counter()
+        self.busy: defaultdict[str, float] = defaultdict(float)
+        self.longest_step: defaultdict[str, float] = defaultdict(float)
+        self.wall: defaultdict[str, float] = defaultdict(float)
+
+    def add_step(self, name: str, seconds: float) -> None:
+        self.steps[name] += 1
+        self.busy[name] += seconds
+        self.longest_step[name] = max(self.longest_step[name], seconds)
+
+    def task_factory(self, loop: asyncio.AbstractEventLoop, coro: Any, **kwargs: Any) -> asyncio.Task:
+        name = getattr(coro, "__qualname__", type(coro).__name__)
+        self.tasks[name] += 1
+        task = asyncio.Task(TimedCoroutine(coro, name, self), loop=loop, **kwargs)
+        created = time.perf_counter()
+        task.add_done_callback(lambda _: self.wall.__setitem__(name, self.wall[name] + time.perf_counter() - created))
+        return task
+
+    def summary_lines(self, top: int = PROFILE_TOP) -> list[str]:
+        lines = []
+        for name in sorted(self.busy, key=self.busy.get, reverse=True)[:top]:
+            lines.append(
+                f"  {self.busy[name]:8.3f}s busy  {self.wall[name]:9.1f}s wall  {self.tasks[name]:5d} tasks  "
+                f"{self.steps[name]:7d} steps  longest {self.longest_step[name]*1000:7.1f}ms  {name}"
+            )
+        return lines
+
+
+class TimedCoroutine(Coroutine):
+    """Coroutine wrapper that charges the time of every step to its task kind."""
+
+    def __init__(self, coro: Any, name: str, times: TaskTimes):
+        self._coro = coro
+        self._name = name
+        self._times = times
+
+    def send(self, value: Any) -> Any:
+        start = time.perf_counter()
+        try:
+            return self._coro.send(value)
+        finally:
+            self._times.add_step(self._name, time.perf_counter() - start)
+
+    def throw(self, *args: Any) -> Any:
+        start = time.perf_counter()
+        try:
+            return self._coro.throw(*args)
+        finally:
+            self._times.add_step(self._name, time.perf_counter() - start)
+
+    def close(self) -> None:
+        self._coro.close()
+
+    def __await__(self):
+        return self
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> Any:
+        return self.send(None)
+
+
+class Profiler:
+    """cProfile plus a stack sampler for one run; `stop` writes the outputs."""
+
+    def __init__(self, prefix: Path, top: int = PROFILE_TOP):
+        self.prefix = prefix
+        self.top = top
+        self.samples: Counter[str] = Counter()
+        self.task_times: Optional[TaskTimes] = None
+        self._profile = cProfile.Profile()
+        self._stop = threading.Event()
+        self._sampler = threading.Thread(target=self._sample, name="profile-sampler", daemon=True)
+        self._stopped = False
+
+    def start(self) -> None:
+        self._profile.enable()
+        self._sampler.start()
+
+    def _sample(self) -> None:
+        own_id = threading.get_ident()
+        while not self._stop.wait(PROFILE_SAMPLE_INTERVAL):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(frame_label(frame))
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, str(thread_id)))
+                self.samples[";".join(reversed(stack))] += 1
+
+    async def run_with_task_timing(self, awaitable: Awaitable[T]) -> T:
+        """Await `awaitable` with every task created meanwhile timed per step."""
+        self.task_times = TaskTimes()
+        loop = asyncio.get_running_loop()
+        previous = loop.get_task_factory()
+        loop.set_task_factory(self.task_times.task_factory)
+        try:
+            return await awaitable
+        finally:
+            loop.set_task_factory(previous)
+
+    def summary(self) -> str:
+        out = io.StringIO()
+        stats = pstats.Stats(self._profile, stream=out)
+        for sort_key, title in (("tottime", "own time"), ("cumulative", "cumulative time")):
+            out.write(f"Top {self.top} functions by {title}:\n")
+            stats.sort_stats(sort_key).print_stats(self.top)
+        if self.task_times is not None and self.task_times.busy:
+            out.write("Asyncio tasks by event-loop busy time:\n")
+            out.write("\n".join(self.task_times.summary_lines(self.top)) + "\n")
+        return out.getvalue()
+
+    def stop(self) -> None:
+        if self._stopped:
+            return
+        self._stopped = True
+        self._profile.disable()
+        self._stop.set()
+        self._sampler.join()
+
+        self.prefix.parent.mkdir(parents=True, exist_ok=True)
+        self._profile.dump_stats(f"{self.prefix}.pstats")
+        Path(f"{self.prefix}.collapsed").write_text(
+            "".join(f"{stack} {count}\n" for stack, count in sorted(self.samples.items())), encoding="utf-8"
+        )
+        summary = self.summary()
+        Path(f"{self.prefix}.txt").write_text(summary, encoding="utf-8")
+        print(f"\n{summary}")
+        print(f"Profile written to {self.prefix}.pstats, .collapsed and .txt")
+
+
+def start_profiling(prefix: Optional[str]) -> Optional[Profiler]:
+    """Start profiling when --profile was given; outputs are written at interpreter exit."""
+    if prefix is None:
+        return None
+    profiler = Profiler(Path(prefix))
+    profiler.start()
+    atexit.register(profiler.stop)
+    return profiler
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Deterministic work sharding for translate_posts.py and generate_og_images.py.
+
+`--shard i/N` runs only the i-th of N parts of the work, so a CI matrix can
+split a full regeneration across runners. Every runner computes the same
+assignment from the same checkout: units (a post, or a post and language) are
+placed heaviest first onto the currently lightest shard, with ties broken by
+key. Cost estimates come from the checkout alone, never from per-runner caches.
+Shards write disjoint files, so their outputs merge without conflicts.
+"""
+
+from __future__ import annotations
+
+import heapq
+from typing import Hashable, Optional
+
+
+def parse_shard(spec: Optional[str]) -> Optional[tuple[int, int]]:
+    """
+    Parse "i/N" (1-based) into (i, N); None passes through.
+
+    Raises:
+        ValueError: for anything other than 1 <= i <= N
+    """
+    if spec is None:
+        return None
+    index, separator, count = spec.partition("/")
+    try:
+        shard = (int(index), int(count))
+    except ValueError:
+        raise ValueError(f"expected i/N, got '{spec}'") from None
+    if not separator or not 1 <= shard[0] <= shard[1]:
+        raise ValueError(f"expected i/N with 1 <= i <= N, got '{spec}'")
+    return shard
+
+
+def assign_shards(costs: dict[Hashable, float], count: int) -> dict[Hashable, int]:
+    """Map each unit to a shard (1..count), balancing the summed cost per shard."""
+    loads = [(0.0, shard) for shard in range(1, count + 1)]
+    assignment = {}
+    for key in sorted(costs, key=lambda key: (-costs[key], str(key))):
+        load, shard = heapq.heappop(loads)
+        assignment[key] = shard
+        heapq.heappush(loads, (load + costs[key], shard))
+    return assignment
+
+
+def shard_units(costs: dict[Hashable, float], shard: tuple[int, int]) -> set[Hashable]:
+    """Units that belong to `shard`, given as (i, N)."""
+    index, count = shard
+    return {key for key, assigned in assign_shards(costs, count).items() if assigned == index}
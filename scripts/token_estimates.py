@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Offline token estimators for translate_posts.py planning.
+
+Estimators are selected with a spec string:
+
+- "heuristic"               Script-aware approximation of a BPE tokenizer; no dependencies.
+- "tiktoken:<encoding>"     tiktoken encoding, e.g. "tiktoken:o200k_base". Needs the
+                            tiktoken package and a cached encoding file (TIKTOKEN_CACHE_DIR)
+                            when running offline.
+- "<path>/tokenizer.json"   A Hugging Face tokenizer file (e.g. the model's own), loaded
+                            with the tokenizers package.
+
+TokenCountCache memoizes counts by content hash and estimator, so repeated
+dry runs over unchanged posts do not re-tokenize them.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import math
+import os
+import re
+from pathlib import Path
+from typing import Protocol
+
+
+# One token per CJK ideograph, kana or Hangul syllable; BPE vocabularies rarely merge them
+CJK_CHAR = "\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff"
+TOKEN_PIECE_PATTERN = re.compile(
+    f"(?P<cjk>[{CJK_CHAR}])"
+    f"|(?P<word>[^\\W\\d_{CJK_CHAR}]+)"
+    r"|(?P<digits>\d{1,3})"
+    r"|(?P<space>\s{2,})"
+    r"|(?P<symbols>[^\w\s]+)"
+)
+
+
+class TokenEstimator(Protocol):
+    name: str
+
+    def count(self, text: str) -> int: ...
+
+
+class HeuristicEstimator:
+    """
+    Approximate BPE token counts without a vocabulary.
+
+    Common words are one token and long words split every ~5 characters. CJK
+    characters count one each. Digits are grouped by three, and symbol runs
+    (markup, code operators) cost a token per two characters. Indentation and
+    blank-line runs cost one token. Much closer than words x 1.3 for CJK and
+    code-heavy text.
+    """
+
+    name = "heuristic"
+
+    def count(self, text: str) -> int:
+        tokens = 0
+        for match in TOKEN_PIECE_PATTERN.finditer(text):
+            kind = match.lastgroup
+            if kind == "word":
+                tokens += 1 + max(0, len(match.group()) - 8) // 5
+            elif kind == "symbols":
+                tokens += math.ceil(len(match.group()) / 2)
+            else:
+                tokens += 1
+        return tokens
+
+
+class TiktokenEstimator:
+    """Exact counts for a tiktoken encoding (optional dependency)."""
+
+    def __init__(self, encoding: str):
+        import tiktoken
+
+        self.name = f"tiktoken:{encoding}"
+        self._encoding = tiktoken.get_encoding(encoding)
+
+    def count(self, text: str) -> int:
+        return len(self._encoding.encode(text, disallowed_special=()))
+
+
+class HuggingFaceEstimator:
+    """Exact counts for a local tokenizer.json (optional dependency)."""
+
+    def __init__(self, path: Path):
+        from tokenizers import Tokenizer
+
+        digest = hashlib.sha256(path.read_bytes()).hexdigest()[:12]
+        self.name = f"hf:{path.name}:{digest}"
+        self._tokenizer = Tokenizer.from_file(str(path))
+
+    def count(self, text: str) -> int:
+        return len(self._tokenizer.encode(text, add_special_tokens=False).ids)
+
+
+def load_estimator(spec: str) -> TokenEstimator:
+    """Build an estimator from a spec string (see module docstring)."""
+    if spec == "heuristic":
+        return HeuristicEstimator()
+    if spec.startswith("tiktoken:"):
+        try:
+            return TiktokenEstimator(spec.split(":", 1)[1])
+        except ImportError:
+            raise ValueError("tiktoken is not installed (pip install tiktoken)")
+    path = Path(spec)
+    if path.is_file():
+        try:
+            return HuggingFaceEstimator(path)
+        except ImportError:
+            raise ValueError("tokenizers is not installed (pip install tokenizers)")
+    raise ValueError(f"Unknown tokenizer '{spec}': use 'heuristic', 'tiktoken:<encoding>' or a tokenizer.json path")
+
+
+class TokenCountCache:
+    """Token counts per estimator, keyed by a hash of the counted text."""
+
+    def __init__(self, estimator: TokenEstimator, path: Path):
+        self.estimator = estimator
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._dirty = False
+        self._used: set[str] = set()
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError):
+            data = {}
+        self._all = data if isinstance(data, dict) else {}
+        self._counts = self._all.setdefault(estimator.name, {})
+
+    def count(self, text: str) -> int:
+        key = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        self._used.add(key)
+        cached = self._counts.get(key)
+        if cached is not None:
+            self.hits += 1
+            return cached
+        self.misses += 1
+        tokens = self.estimator.count(text)
+        self._counts[key] = tokens
+        self._dirty = True
+        return tokens
+
+    def save(self, prune_unused: bool = False) -> None:
+        """Persist counts; prune_unused drops texts not counted this run (e.g. old post versions)."""
+        if prune_unused:
+            stale = [key for key in self._counts if key not in self._used]
+            for key in stale:
+                del self._counts[key]
+            self._dirty = self._dirty or bool(stale)
+        if not self._dirty:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        tmp_path.write_text(json.dumps(self._all, sort_keys=True) + "\n", encoding="utf-8")
+        os.replace(tmp_path, self.path)
+        self._dirty = False
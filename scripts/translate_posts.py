@@ -6,6 +6,8 @@ Supports parallel execution for faster processing with rate limit handling.
 
 Features:
 - Smart content hashing to skip unchanged translations
+- Local structural check (code blocks, links, images, [n] references, headings)
+  that requeues cached translations which lost structure
 - Parallel execution with configurable concurrency
 - Automatic retry with exponential backoff for rate limits
 - Beautiful progress bars and stats using Rich library
@@ -20,19 +22,37 @@ Usage:
     python scripts/translate_posts.py --concurrency 3        # Run 3 translations in parallel
     python scripts/translate_posts.py --max-retries 10       # Retry up to 10 times on failure
     python scripts/translate_posts.py --retry-delay 10       # Start with 10s retry delay
+    python scripts/translate_posts.py --check-structure      # Report cached translations with broken structure
+    python scripts/translate_posts.py --metrics run.jsonl    # Append structured per-task metrics
+    python scripts/translate_posts.py --budget 500000        # Spend at most ~500k tokens, most-viewed first
+    python scripts/translate_posts.py --lang-weights zh=2    # Prioritize Chinese in the queue
+    python scripts/translate_posts.py --changed-since last   # Only posts changed since the last successful run
+    python scripts/translate_posts.py --output-format markdown  # Model returns markdown, HTML rendered locally
+    python scripts/translate_posts.py --force --shard 2/4     # Second quarter of the work, for a CI matrix
+    python scripts/translate_posts.py --repack --shared-blocks  # Re-store cached translations minified, code in a shared sidecar
 """
 
 import argparse
+import importlib.util
 import asyncio
+import contextlib
+import functools
 import hashlib
+import heapq
+import html
+import itertools
 import json
 import os
 import re
+import queue
 import sys
 import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Optional
+from typing import AsyncIterator, Optional
+from urllib.parse import unquote
 
 import httpx
 import yaml
@@ -41,6 +61,21 @@ from pydantic import BaseModel
 from tqdm.asyncio import tqdm
 import threading
 
+from markdown_render import render_markdown
+from model_routing import ModelRouter, ModelStats, mark_request_sent
+from post_changes import changed_posts, record_build_ref, resolve_since
+from profiling import add_profile_argument, start_profiling
+from sharding import parse_shard, shard_units
+from token_estimates import HeuristicEstimator, TokenCountCache, load_estimator
+from translation_metrics import RunMetrics, TaskTrace
+from translation_storage import (
+    StorageStats,
+    extract_shared_blocks,
+    minify_html,
+    resolve_shared_blocks,
+    update_shared_blocks,
+)
+
 # Load environment variables from .env file
 load_dotenv(Path(__file__).parent.parent / ".env")
 
@@ -55,6 +90,20 @@ READ_TIMEOUT = 600.0          # seconds between receiving data chunks (10 min)
 WRITE_TIMEOUT = 60.0          # seconds to send request
 TOTAL_TIMEOUT = 1200.0        # total request timeout (20 min)
 
+# Connection pool: idle connections stay open across retry backoffs and between
+# tasks, so most requests skip the TCP + TLS handshake
+KEEPALIVE_EXPIRY = 120.0      # seconds an idle pooled connection is kept
+
+# Head start for the first language of a post, so the provider has cached the
+# shared prompt prefix before the other languages are sent
+PREFIX_WARMUP_SECONDS = 15.0
+
+# Completed translations waiting for the writer thread before tasks block on saving
+WRITER_QUEUE_SIZE = 16
+
+# Planned tasks waiting for a worker; planning pauses when it is this far ahead
+PLAN_QUEUE_SIZE = 32
+
 # Supported languages with their native names
 SUPPORTED_LANGUAGES = {
     "es": {"name": "Spanish", "native": "Español"},
@@ -78,6 +127,15 @@ PROJECT_ROOT = Path(__file__).parent.parent
 POSTS_DIR = PROJECT_ROOT / "_posts"
 TRANSLATIONS_DIR = PROJECT_ROOT / "assets" / "translations"
 ERROR_LOG_FILE = PROJECT_ROOT / "scripts" / "translation_errors.log"
+VIEW_COUNT_FILE = PROJECT_ROOT / "_data" / "view_count.json"
+TOKEN_CACHE_FILE = PROJECT_ROOT / ".cache" / "translation_token_counts.json"
+MODEL_STATS_FILE = PROJECT_ROOT / ".cache" / "translation_model_stats.json"
+
+# Token estimation: translated HTML output relative to the markdown source, per language
+# (median over the cached translations: markup overhead plus script/tokenizer expansion)
+HEURISTIC_ESTIMATOR = HeuristicEstimator()
+OUTPUT_TOKEN_RATIOS = {"es": 1.3, "zh": 1.6, "hi": 2.7, "pt": 1.3, "fr": 1.4, "de": 1.3, "ja": 2.2, "ko": 1.9}
+DEFAULT_OUTPUT_TOKEN_RATIO = 1.5
 
 
 def parse_args() -> argparse.Namespace:
@@ -104,6 +162,13 @@ Examples:
         type=str,
         help="Translate only a specific post (filename or slug)",
     )
+    parser.add_argument(
+        "--changed-since",
+        type=str,
+        default=os.environ.get("TRANSLATION_CHANGED_SINCE"),
+        help="Only plan posts changed since this git ref ('last' = last successful run); "
+             "falls back to all posts when git cannot tell (or TRANSLATION_CHANGED_SINCE)",
+    )
     parser.add_argument(
         "--lang",
         type=str,
@@ -128,6 +193,12 @@ Examples:
         default=int(os.environ.get("TRANSLATION_CONCURRENCY", "3")),
         help="Number of parallel translation requests (default: 3, or TRANSLATION_CONCURRENCY)",
     )
+    parser.add_argument(
+        "--http2",
+        action="store_true",
+        default=os.environ.get("TRANSLATION_HTTP2", "").lower() in {"1", "true", "yes"},
+        help="Multiplex requests over HTTP/2 (needs httpx[http2]; or TRANSLATION_HTTP2=1)",
+    )
     parser.add_argument(
         "--max-retries",
         type=int,
@@ -146,7 +217,132 @@ Examples:
         default=os.environ.get("OPENROUTER_MODEL", DEFAULT_OPENROUTER_MODEL),
         help=f"OpenRouter model id (default: {DEFAULT_OPENROUTER_MODEL}, or OPENROUTER_MODEL)",
     )
-    return parser.parse_args()
+    parser.add_argument(
+        "--fallback-models",
+        type=str,
+        default=os.environ.get("OPENROUTER_FALLBACK_MODELS", ""),
+        help="Comma-separated models tried in order when --model is slow or fails (or OPENROUTER_FALLBACK_MODELS)",
+    )
+    parser.add_argument(
+        "--no-hedge",
+        action="store_true",
+        help="Only use fallback models after a failure, never as duplicate requests past the p95 deadline",
+    )
+    parser.add_argument(
+        "--output-format",
+        choices=sorted(OUTPUT_FORMATS),
+        default=os.environ.get("TRANSLATION_OUTPUT_FORMAT", "html"),
+        help="Ask the model for HTML, or for markdown rendered locally (needs markdown-it-py) "
+             "(default: html, or TRANSLATION_OUTPUT_FORMAT)",
+    )
+    parser.add_argument(
+        "--no-mask",
+        action="store_true",
+        help="Send code blocks, inline code and URLs to the model instead of placeholders",
+    )
+    parser.add_argument(
+        "--shared-blocks",
+        action="store_true",
+        default=os.environ.get("TRANSLATION_SHARED_BLOCKS", "").lower() in {"1", "true", "yes"},
+        help="Store code blocks and SVG figures once per post in assets/translations/shared/ "
+             "(or TRANSLATION_SHARED_BLOCKS=1)",
+    )
+    parser.add_argument(
+        "--repack",
+        action="store_true",
+        help="Only re-store cached translations through the minify/shared-block stage (no API calls)",
+    )
+    parser.add_argument(
+        "--check-structure",
+        action="store_true",
+        help="Only run the structural check over cached translations and report failures (no API calls)",
+    )
+    parser.add_argument(
+        "--skip-structure-check",
+        action="store_true",
+        help="Do not requeue cached translations that fail the structural check",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Worker processes for the structural check (default: CPU count)",
+    )
+    parser.add_argument(
+        "--tokenizer",
+        type=str,
+        default=os.environ.get("TRANSLATION_TOKENIZER", "heuristic"),
+        help="Token estimator: 'heuristic', 'tiktoken:<encoding>' or a tokenizer.json path "
+             "(default: heuristic, or TRANSLATION_TOKENIZER)",
+    )
+    parser.add_argument(
+        "--lang-weights",
+        type=str,
+        default=os.environ.get("TRANSLATION_LANG_WEIGHTS", ""),
+        help="Per-language priority weights, e.g. 'zh=2,es=1.5' (default: all 1, or TRANSLATION_LANG_WEIGHTS)",
+    )
+    parser.add_argument(
+        "--budget",
+        type=int,
+        help="Maximum estimated tokens (input + output) to spend; most-viewed posts go first",
+    )
+    parser.add_argument(
+        "--max-cost",
+        type=float,
+        help="Maximum estimated cost in USD for this run (needs --input-price and --output-price)",
+    )
+    parser.add_argument(
+        "--input-price",
+        type=float,
+        default=float(os.environ["OPENROUTER_INPUT_PRICE"]) if os.environ.get("OPENROUTER_INPUT_PRICE") else None,
+        help="USD per million input tokens (or OPENROUTER_INPUT_PRICE)",
+    )
+    parser.add_argument(
+        "--output-price",
+        type=float,
+        default=float(os.environ["OPENROUTER_OUTPUT_PRICE"]) if os.environ.get("OPENROUTER_OUTPUT_PRICE") else None,
+        help="USD per million output tokens (or OPENROUTER_OUTPUT_PRICE)",
+    )
+    parser.add_argument(
+        "--shard",
+        type=str,
+        default=os.environ.get("TRANSLATION_SHARD"),
+        help="Only run shard i of N (e.g. 2/4) of the (post, language) tasks, balanced by estimated cost "
+             "(or TRANSLATION_SHARD)",
+    )
+    parser.add_argument(
+        "--metrics",
+        type=str,
+        default=os.environ.get("TRANSLATION_METRICS_FILE"),
+        help="Append per-task spans, retries and token usage as JSONL (or TRANSLATION_METRICS_FILE)",
+    )
+    parser.add_argument(
+        "--openmetrics",
+        type=str,
+        help="Write run counters and stage latency histograms in OpenMetrics text format",
+    )
+    add_profile_argument(parser, "translate_posts")
+    args = parser.parse_args()
+    if args.max_cost is not None and (args.input_price is None or args.output_price is None):
+        parser.error("--max-cost needs --input-price and --output-price")
+    try:
+        args.lang_weights = parse_language_weights(args.lang_weights)
+    except ValueError as e:
+        parser.error(str(e))
+    args.models = list(dict.fromkeys(
+        [args.model] + [model.strip() for model in args.fallback_models.split(",") if model.strip()]
+    ))
+    if args.concurrency < 1:
+        parser.error("--concurrency must be at least 1")
+    try:
+        args.shard = parse_shard(args.shard)
+    except ValueError as e:
+        parser.error(f"--shard: {e}")
+    if args.output_format == "markdown" and importlib.util.find_spec("markdown_it") is None:
+        parser.error("--output-format markdown needs the markdown-it-py package (pip install markdown-it-py)")
+    if args.http2 and importlib.util.find_spec("h2") is None:
+        parser.error("--http2 needs the h2 package (pip install 'httpx[http2]')")
+    return args
 
 
 def parse_front_matter(content: str) -> tuple[dict, str]:
@@ -179,10 +375,19 @@ def calculate_content_hash(content: str) -> str:
     return f"sha256:{hashlib.sha256(content.encode('utf-8')).hexdigest()}"
 
 
-def log_error_to_file(slug: str, lang: str, error: Exception, response_snippet: str = ""):
-    """Log detailed error information to error log file."""
+def log_error_to_file(
+    slug: str,
+    lang: str,
+    error: Exception,
+    response_snippet: str = "",
+    traceback_text: Optional[str] = None,
+):
+    """
+    Log detailed error information to error log file.
+
+    Pass traceback_text when logging from outside the except block (e.g. from the writer thread).
+    """
     try:
-        import traceback
         timestamp = datetime.now().isoformat()
         with open(ERROR_LOG_FILE, "a", encoding="utf-8") as f:
             f.write(f"\n{'='*80}\n")
@@ -194,7 +399,7 @@ def log_error_to_file(slug: str, lang: str, error: Exception, response_snippet:
             if response_snippet:
                 f.write(f"Response Snippet:\n{response_snippet[:500]}\n")
             f.write(f"\nFull Traceback:\n")
-            f.write(traceback.format_exc())
+            f.write(traceback_text if traceback_text is not None else traceback.format_exc())
             f.write(f"\n{'='*80}\n")
     except Exception as e:
         # Don't let logging errors crash the script
@@ -213,9 +418,57 @@ def get_post_slug(filename: str) -> str:
 
 
 def estimate_tokens(text: str) -> int:
-    """Estimate token count for text (approximation: 1 word ≈ 1.3 tokens)."""
-    word_count = len(text.split())
-    return int(word_count * 1.3)
+    """Estimate token count for text with the offline heuristic tokenizer."""
+    return HEURISTIC_ESTIMATOR.count(text)
+
+
+def load_post_views() -> dict[str, int]:
+    """Map post slugs to page views from _data/view_count.json (written by fetch_analytics.py)."""
+    try:
+        with open(VIEW_COUNT_FILE, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (json.JSONDecodeError, IOError):
+        return {}
+    views = {}
+    for entry in data.get("view_counts", []):
+        slug = entry.get("url", "").rstrip("/").rsplit("/", 1)[-1]
+        if slug:
+            views[slug] = views.get(slug, 0) + int(entry.get("views", 0))
+    return views
+
+
+def parse_language_weights(spec: str) -> dict[str, float]:
+    """Parse "zh=2,es=1.5" into per-language priority weights (unlisted languages weigh 1)."""
+    weights = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        lang, _, value = item.partition("=")
+        lang = lang.strip()
+        if lang not in SUPPORTED_LANGUAGES:
+            raise ValueError(f"unknown language '{lang}' in language weights")
+        try:
+            weights[lang] = float(value)
+        except ValueError:
+            raise ValueError(f"invalid weight for '{lang}': '{value}'")
+    return weights
+
+
+def task_priority(views: int, lang: str, date: str, lang_weights: dict[str, float]) -> tuple:
+    """
+    Queue key for a (post, language) task; lower sorts first.
+
+    Ranks by page views times the language weight. Views are offset by one so
+    weights still order posts without analytics data. Ties go to newer posts.
+    """
+    score = (views + 1) * lang_weights.get(lang, 1.0)
+    date_key = int(date.replace("-", "")) if date.replace("-", "").isdigit() else 0
+    return (-score, -date_key, lang)
+
+
+def estimate_task_cost(task: dict, input_price: Optional[float], output_price: Optional[float]) -> float:
+    """Estimated USD cost of a task, given prices per million tokens."""
+    if input_price is None or output_price is None:
+        return 0.0
+    return (task["tokens"] * input_price + task["output_tokens"] * output_price) / 1_000_000
 
 
 def get_cached_translation(lang: str, slug: str) -> Optional[dict]:
@@ -224,7 +477,7 @@ def get_cached_translation(lang: str, slug: str) -> Optional[dict]:
     if translation_path.exists():
         try:
             with open(translation_path, "r", encoding="utf-8") as f:
-                return json.load(f)
+                return resolve_shared_blocks(json.load(f), TRANSLATIONS_DIR, slug)
         except (json.JSONDecodeError, IOError):
             return None
     return None
@@ -235,9 +488,13 @@ def should_translate(
     slug: str,
     content_hash: str,
     force: bool = False,
+    structure_issues: Optional[list[str]] = None,
 ) -> tuple[bool, str]:
     """
     Determine if a post needs translation.
+
+    structure_issues are the structural check failures found for the cached
+    translation (see check_cached_translations); they send it back for retranslation.
     
     Returns:
         Tuple of (should_translate, reason)
@@ -253,19 +510,14 @@ def should_translate(
     cached_hash = cached.get("source_hash", "")
     if cached_hash != content_hash:
         return True, f"content changed (hash mismatch)"
+
+    if structure_issues:
+        return True, f"structure check failed ({'; '.join(structure_issues)})"
     
     return False, "cached translation up to date"
 
 
-def build_translation_messages(
-    title: str,
-    excerpt: str,
-    body: str,
-    target_language: str,
-    target_native: str,
-) -> list[dict]:
-    """Build the translation messages for OpenRouter."""
-    system_message = """You are a professional translator.
+TRANSLATION_SYSTEM_MESSAGE = """You are a professional translator.
 
 CRITICAL JSON OUTPUT REQUIREMENT:
 - Return only one valid JSON object.
@@ -275,6 +527,7 @@ CRITICAL JSON OUTPUT REQUIREMENT:
 - Escape quotes, backslashes, and newlines correctly so json.loads can parse the response.
 
 Rules:
+- Translate into the target language named in the final message
 - Preserve all markdown formatting, code blocks, and HTML tags exactly
 - Keep technical terms, proper nouns, and code in English
 - Maintain the author's voice and writing style
@@ -282,33 +535,77 @@ Rules:
 - Translate the full CONTENT from first word to last; do not summarize or omit sections
 - Keep URLs and image paths unchanged
 - Preserve reference links [1], [2], etc. exactly as they appear
+- Placeholders like {{CODE1}}, {{C1}}, {{U1}} and {{A1}} stand for code, URLs and links: copy each one exactly once, unchanged, in its place; keep every {{CODEn}} on its own line
 - Convert markdown to HTML for the content_html field
 - The content_html value must contain the complete translated post"""
 
-    user_message = f"""Translate this blog post to {target_language} ({target_native}).
+# --output-format markdown: the model returns translated markdown, rendered to HTML locally
+TRANSLATION_MARKDOWN_SYSTEM_MESSAGE = """You are a professional translator.
 
-Return only valid JSON with exactly this shape:
-{{
-  "title": "translated title",
-  "excerpt": "translated excerpt",
-  "content_html": "complete translated content converted to HTML"
-}}
+CRITICAL JSON OUTPUT REQUIREMENT:
+- Return only one valid JSON object.
+- The JSON object must have exactly these keys: "title", "excerpt", "content_markdown".
+- Do not wrap the JSON in markdown fences.
+- Do not add explanations, comments, prose, or any text outside the JSON object.
+- Escape quotes, backslashes, and newlines correctly so json.loads can parse the response.
+
+Rules:
+- Translate into the target language named in the final message
+- Keep the markdown source structure exactly: headings, lists, tables, emphasis, links, images, HTML tags and attribute lists like {: .post-img}
+- Keep technical terms, proper nouns, and code in English
+- Maintain the author's voice and writing style
+- Translate naturally, not literally
+- Translate the full CONTENT from first word to last; do not summarize or omit sections
+- Keep URLs and image paths unchanged
+- Preserve reference links [1], [2], etc. exactly as they appear
+- Placeholders like {{CODE1}}, {{C1}}, {{U1}} and {{A1}} stand for code, URLs and links: copy each one exactly once, unchanged, in its place; keep every {{CODEn}} on its own line
+- Do not convert anything to HTML
+- The content_markdown value must contain the complete translated post"""
+
+
+def build_translation_prefix(title: str, excerpt: str, body: str, output_format: str = "html") -> list[dict]:
+    """
+    Build the language-independent messages for a post.
+
+    The system rules and the source post come first and are identical for every
+    target language, so providers with prompt caching can reuse them across the
+    per-language requests of a post. Only the final message names the language.
+    """
+    source_message = f"""Blog post to translate:
 
 TITLE: {title}
 
 EXCERPT: {excerpt}
 
 CONTENT:
-{body}
-
-Remember: Return ONLY the JSON object. No markdown fences. No prose. No explanations."""
+{body}"""
 
-    messages = [
-        {"role": "system", "content": system_message},
-        {"role": "user", "content": user_message},
+    return [
+        {"role": "system", "content": OUTPUT_FORMATS[output_format]["system"]},
+        {"role": "user", "content": source_message},
     ]
 
-    return messages
+
+def build_translation_messages(
+    prefix: list[dict],
+    target_language: str,
+    target_native: str,
+    output_format: str = "html",
+) -> list[dict]:
+    """Build the translation messages for OpenRouter from a shared post prefix."""
+    output = OUTPUT_FORMATS[output_format]
+    instruction_message = f"""Translate the blog post above to {target_language} ({target_native}).
+
+Return only valid JSON with exactly this shape:
+{{
+  "title": "translated title",
+  "excerpt": "translated excerpt",
+  "{output["field"]}": "{output["shape"]}"
+}}
+
+Remember: Return ONLY the JSON object. No markdown fences. No prose. No explanations."""
+
+    return [*prefix, {"role": "user", "content": instruction_message}]
 
 
 # Pydantic model for translation responses.
@@ -347,6 +644,63 @@ TRANSLATION_RESPONSE_FORMAT = {
 }
 
 
+class TranslationMarkdownOutput(BaseModel):
+    """Structured output model for markdown translations."""
+    title: str
+    excerpt: str
+    content_markdown: str
+
+
+TRANSLATION_MARKDOWN_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "translation_markdown_output",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "title": {
+                    "type": "string",
+                    "description": "The translated blog post title.",
+                },
+                "excerpt": {
+                    "type": "string",
+                    "description": "The translated blog post excerpt.",
+                },
+                "content_markdown": {
+                    "type": "string",
+                    "description": "The complete translated post body as markdown.",
+                },
+            },
+            "required": ["title", "excerpt", "content_markdown"],
+            "additionalProperties": False,
+        },
+    },
+}
+
+# What the model returns per --output-format. Markdown output skips the HTML tag
+# markup (about 20% of output tokens on the cached translations) and is rendered
+# locally with markdown_render, so the HTML structure is deterministic.
+OUTPUT_FORMATS = {
+    "html": {
+        "system": TRANSLATION_SYSTEM_MESSAGE,
+        "response_format": TRANSLATION_RESPONSE_FORMAT,
+        "model": TranslationOutput,
+        "field": "content_html",
+        "shape": "complete translated content converted to HTML",
+        "output_share": 1.0,
+    },
+    "markdown": {
+        "system": TRANSLATION_MARKDOWN_SYSTEM_MESSAGE,
+        "response_format": TRANSLATION_MARKDOWN_RESPONSE_FORMAT,
+        "model": TranslationMarkdownOutput,
+        "field": "content_markdown",
+        "shape": "complete translated content as markdown",
+        "output_share": 0.8,
+    },
+}
+
+
 def validate_translation_output(body: str, translation: dict) -> None:
     """Reject obviously incomplete translations that still satisfy the JSON schema."""
     content_html = translation["content_html"].strip()
@@ -374,7 +728,298 @@ def validate_translation_output(body: str, translation: dict) -> None:
         )
 
 
-def parse_translation_response(body: str, response_text: str) -> dict:
+# Patterns for the structural diff between a markdown source and its translated HTML.
+# Fenced blocks are cut out first so that nothing inside code counts as prose.
+FENCE_PATTERN = re.compile(r"^([ \t]*)(`{3,}|~{3,})[^\n]*\n(.*?)^[ \t]*\2[ \t]*$", re.DOTALL | re.MULTILINE)
+CODE_BLOCK_PATTERN = re.compile(r"\x00(\d+)\x00|<pre\b.*?</pre>", re.DOTALL | re.IGNORECASE)
+INLINE_CODE_PATTERN = re.compile(r"(`+)[^\n]*?\1")
+MARKDOWN_LINK_PATTERN = re.compile(r"(!?)\[(?:[^\[\]]|\[[^\[\]]*\])*\]\(\s*(<[^>]*>|[^)]*?)(?:\s+[\"'][^\"']*[\"'])?\s*\)")
+AUTOLINK_PATTERN = re.compile(r"<(https?://[^>\s]+)>")
+HTML_HREF_PATTERN = re.compile(r"<a\b[^>]*\bhref=[\"']([^\"']*)[\"']", re.IGNORECASE)
+HTML_SRC_PATTERN = re.compile(r"<img\b[^>]*\bsrc=[\"']([^\"']*)[\"']", re.IGNORECASE)
+HTML_PRE_PATTERN = re.compile(r"<pre\b.*?</pre>", re.DOTALL | re.IGNORECASE)
+HTML_CODE_PATTERN = re.compile(r"<code\b.*?</code>", re.DOTALL | re.IGNORECASE)
+HTML_HEADING_PATTERN = re.compile(r"<h([1-6])\b", re.IGNORECASE)
+HTML_TAG_PATTERN = re.compile(r"</?[A-Za-z][^>]*>")
+ATX_HEADING_PATTERN = re.compile(r"^ {0,3}(#{1,6})[ \t]", re.MULTILINE)
+# "[3]" as visible text: not a link label ("[3](...)", "[3][...]") and not a reference target ("][3]")
+REFERENCE_PATTERN = re.compile(r"(?<!\])\[(\d+)\](?![(\[:])")
+HTML_REFERENCE_PATTERN = re.compile(r"\[(\d+)\]")
+
+# A translated code block this much smaller than its source was summarized or cut off.
+# Translated comments and diagram labels (even into CJK) stay well above it.
+MIN_CODE_BLOCK_RATIO = 0.25
+
+
+# Placeholders that stand in for code and URLs in the prompt; numbered in document
+# order, so a post's masked source (and its cacheable prompt prefix) is stable
+URL_ATTRIBUTE_PATTERN = re.compile(r"\b(?:href|src)=[\"']([^\"']+)[\"']", re.IGNORECASE)
+PLACEHOLDER_RESTORE_PATTERN = re.compile(
+    r"<p>\s*(\{\{CODE\d+\}\})\s*</p>"
+    r"|<pre\b[^>]*>\s*(?:<code\b[^>]*>\s*)?(\{\{CODE\d+\}\})\s*(?:</code>\s*)?</pre>"
+    r"|<code\b[^>]*>\s*(\{\{C\d+\}\})\s*</code>"
+    r"|<a\b[^>]*>\s*(\{\{A\d+\}\})\s*</a>"
+    r"|(\{\{(?:CODE|C|U|A)\d+\}\})"
+)
+PLACEHOLDER_TOKEN_PATTERN = re.compile(r"(\{\{(?:CODE|C|U|A)\d+\}\})")
+
+
+def render_code_block(fence: str) -> str:
+    """Render a fenced code block as kramdown does: <pre><code class="language-x">."""
+    first_line, rest = fence.split("\n", 1)
+    code = rest.rsplit("\n", 1)[0] + "\n" if "\n" in rest else ""
+    # Fences indented inside list items: strip the fence's indentation from the code
+    indent = len(rest.rsplit("\n", 1)[-1]) - len(rest.rsplit("\n", 1)[-1].lstrip())
+    if indent:
+        code = "".join(re.sub(f"^ {{0,{indent}}}", "", line) for line in code.splitlines(keepends=True))
+    info = first_line.strip().lstrip("`~").split()
+    class_attr = f' class="language-{html.escape(info[0])}"' if info else ""
+    return f"<pre><code{class_attr}>{html.escape(code, quote=False)}</code></pre>"
+
+
+def render_placeholder(token: str, original: str) -> str:
+    """HTML for a masked piece of markdown (see mask_source)."""
+    if token.startswith("{{CODE"):
+        return render_code_block(original)
+    if token.startswith("{{C"):
+        ticks = len(original) - len(original.lstrip("`"))
+        code = original[ticks:-ticks]
+        # CommonMark strips one space on each side of padded inline code
+        if len(code) > 2 and code.startswith(" ") and code.endswith(" "):
+            code = code[1:-1]
+        return f"<code>{html.escape(code, quote=False)}</code>"
+    if token.startswith("{{A"):
+        # The whole <url> was masked, so the link text comes back with the target
+        url = html.escape(html.unescape(original[1:-1]))
+        return f'<a href="{url}">{url}</a>'
+    target = original[1:-1] if original.startswith("<") and original.endswith(">") else original
+    return html.escape(html.unescape(target))
+
+
+def mask_source(body: str) -> tuple[str, dict[str, str]]:
+    """
+    Replace code and URLs in a markdown body with placeholders before translation.
+
+    Fenced code blocks become {{CODEn}} lines, inline code {{Cn}}, link and
+    image targets (plus raw HTML href/src values) {{Un}}, and whole <url>
+    autolinks {{An}}, whose URL is also the link text. The model never has to
+    copy them, which cuts input and output tokens on code-heavy posts.
+
+    Returns:
+        Tuple of (masked body, placeholder -> original markdown)
+    """
+    placeholders = {}
+    counts = {"CODE": 0, "C": 0, "U": 0, "A": 0}
+
+    def add(kind: str, original: str) -> str:
+        counts[kind] += 1
+        token = f"{{{{{kind}{counts[kind]}}}}}"
+        placeholders[token] = original
+        return token
+
+    def mask_target(match: re.Match, group: int) -> str:
+        start, end = match.span(group)
+        if match.group(group) in {"", "<>"}:
+            return match.group(0)
+        token = add("U", match.group(group))
+        return match.string[match.start():start] + token + match.string[end:match.end()]
+
+    masked = FENCE_PATTERN.sub(lambda match: match.group(1) + add("CODE", match.group(0)[len(match.group(1)):]), body)
+    masked = INLINE_CODE_PATTERN.sub(lambda match: add("C", match.group(0)), masked)
+    masked = MARKDOWN_LINK_PATTERN.sub(lambda match: mask_target(match, 2), masked)
+    masked = AUTOLINK_PATTERN.sub(lambda match: add("A", match.group(0)), masked)
+    masked = URL_ATTRIBUTE_PATTERN.sub(lambda match: mask_target(match, 1), masked)
+    return masked, placeholders
+
+
+def restore_placeholders(text: str, placeholders: dict[str, str], markdown: bool = False) -> str:
+    """
+    Put masked code and URLs back into a translation.
+
+    In HTML, wrappers the model adds around a placeholder (<p>, <pre><code>,
+    <code>, <a>) are replaced along with it by the rendered original; in markdown
+    the original markdown goes back as is. Raises ValueError when a placeholder
+    is missing or unknown, so the request is retried.
+    """
+    seen = set()
+    unknown = set()
+
+    def restore(match: re.Match) -> str:
+        token = next(group for group in match.groups() if group)
+        if token not in placeholders:
+            unknown.add(token)
+            return match.group(0)
+        seen.add(token)
+        return placeholders[token] if markdown else render_placeholder(token, placeholders[token])
+
+    pattern = PLACEHOLDER_TOKEN_PATTERN if markdown else PLACEHOLDER_RESTORE_PATTERN
+    restored = pattern.sub(restore, text)
+    missing = [token for token in placeholders if token not in seen]
+    if missing or unknown:
+        problems = []
+        if missing:
+            problems.append(f"missing {', '.join(missing[:5])}" + (f" (+{len(missing) - 5})" if len(missing) > 5 else ""))
+        if unknown:
+            problems.append(f"unknown {', '.join(sorted(unknown)[:5])}")
+        raise ValueError(f"Translation placeholder mismatch: {'; '.join(problems)}")
+    return restored
+
+
+def normalize_url(url: str) -> str:
+    """Normalize a link or image target so markdown and HTML spellings compare equal."""
+    return unquote(html.unescape(url.strip().strip("<>")))
+
+
+def normalize_code(code: str) -> str:
+    """Collapse whitespace so code comparisons ignore indentation and line endings."""
+    return re.sub(r"\s+", "", code)
+
+
+def extract_source_structure(body: str) -> dict:
+    """
+    Extract the translation-invariant structure of a markdown post body.
+
+    Returns:
+        Dict with code blocks (in document order), link and image targets,
+        visible [n] references and the heading level sequence
+    """
+    fenced = []
+
+    def cut_fence(match: re.Match) -> str:
+        fenced.append(normalize_code(match.group(3)))
+        return f"\n\x00{len(fenced) - 1}\x00\n"
+
+    prose = FENCE_PATTERN.sub(cut_fence, body)
+    # Raw HTML <pre> blocks count as code too, but their markup makes content comparison unreliable
+    code_blocks = [
+        fenced[int(match.group(1))] if match.group(1) else None
+        for match in CODE_BLOCK_PATTERN.finditer(prose)
+    ]
+    prose = CODE_BLOCK_PATTERN.sub("\n", prose)
+    text = INLINE_CODE_PATTERN.sub(" ", prose)
+
+    links, images = set(), set()
+    for bang, target in MARKDOWN_LINK_PATTERN.findall(text):
+        (images if bang else links).add(normalize_url(target))
+    links.update(normalize_url(url) for url in AUTOLINK_PATTERN.findall(text))
+    links.update(normalize_url(url) for url in HTML_HREF_PATTERN.findall(text))
+    images.update(normalize_url(url) for url in HTML_SRC_PATTERN.findall(text))
+
+    headings = [len(marks) for marks in ATX_HEADING_PATTERN.findall(prose)]
+    headings += [int(level) for level in HTML_HEADING_PATTERN.findall(prose)]
+
+    return {
+        "code_blocks": code_blocks,
+        "links": links,
+        "images": images,
+        "references": set(REFERENCE_PATTERN.findall(text)),
+        "headings": headings,
+    }
+
+
+def extract_translation_structure(content_html: str) -> dict:
+    """Extract the same structure as extract_source_structure from translated HTML."""
+    code_blocks = [
+        normalize_code(html.unescape(HTML_TAG_PATTERN.sub("", block)))
+        for block in HTML_PRE_PATTERN.findall(content_html)
+    ]
+    prose = HTML_CODE_PATTERN.sub(" ", HTML_PRE_PATTERN.sub(" ", content_html))
+    visible_text = html.unescape(HTML_TAG_PATTERN.sub(" ", prose))
+
+    return {
+        "code_blocks": code_blocks,
+        "links": {normalize_url(url) for url in HTML_HREF_PATTERN.findall(content_html)},
+        "images": {normalize_url(url) for url in HTML_SRC_PATTERN.findall(content_html)},
+        "references": set(HTML_REFERENCE_PATTERN.findall(visible_text)),
+        "headings": [int(level) for level in HTML_HEADING_PATTERN.findall(content_html)],
+    }
+
+
+def check_translation_structure(body: str, content_html: str) -> list[str]:
+    """
+    Diff the structure of a source body against its translated HTML.
+
+    Returns:
+        List of human-readable issues (empty when the structure matches)
+    """
+    source = extract_source_structure(body)
+    translated = extract_translation_structure(content_html)
+    issues = []
+
+    if len(translated["code_blocks"]) != len(source["code_blocks"]):
+        issues.append(f"code blocks: expected {len(source['code_blocks'])}, found {len(translated['code_blocks'])}")
+    else:
+        shrunk = sum(
+            1 for original, translated_code in zip(source["code_blocks"], translated["code_blocks"])
+            if original and len(translated_code) < len(original) * MIN_CODE_BLOCK_RATIO
+        )
+        if shrunk:
+            issues.append(f"code blocks: {shrunk} summarized or truncated")
+
+    for key, label in (("links", "links"), ("images", "image paths"), ("references", "references")):
+        missing = sorted(source[key] - translated[key])
+        if missing:
+            shown = ", ".join(missing[:3]) + (", ..." if len(missing) > 3 else "")
+            issues.append(f"{label}: {len(missing)} missing ({shown})")
+
+    if translated["headings"] != source["headings"]:
+        issues.append(f"headings: expected levels {source['headings']}, found {translated['headings']}")
+
+    return issues
+
+
+def check_cached_translation(
+    lang: str,
+    slug: str,
+    body: str,
+    content_hash: str,
+) -> tuple[str, str, list[str], bool]:
+    """
+    Structural check of one cached translation; runs in a worker process.
+
+    Returns:
+        Tuple of (lang, slug, issues, accepted). accepted means the same issues
+        were recorded when the translation was generated, after it had used up
+        its retries, so retranslating would most likely spend credits for nothing.
+    """
+    cached = get_cached_translation(lang, slug)
+    if cached is None or cached.get("source_hash") != content_hash:
+        # Missing or stale translations are requeued by should_translate anyway
+        return lang, slug, [], False
+    issues = check_translation_structure(body, cached.get("content_html", ""))
+    return lang, slug, issues, bool(issues) and issues == cached.get("structure_issues")
+
+
+def check_cached_translations(
+    candidates: list[tuple[str, str, str, str]],
+    jobs: int,
+    executor: Optional[ProcessPoolExecutor] = None,
+) -> dict[tuple[str, str], tuple[list[str], bool]]:
+    """
+    Run the structural check over cached translations in a process pool.
+
+    Args:
+        candidates: (lang, slug, body, content_hash) for each translation to check
+        jobs: Number of worker processes
+        executor: Pool to reuse across calls (a new one is created otherwise)
+
+    Returns:
+        Dict mapping (lang, slug) to (issues, accepted), for failing translations only
+    """
+    failures = {}
+    if not candidates:
+        return failures
+
+    chunksize = max(1, len(candidates) // (max(1, jobs) * 4))
+    with contextlib.nullcontext(executor) if executor else ProcessPoolExecutor(max_workers=max(1, jobs)) as pool:
+        results = pool.map(check_cached_translation, *zip(*candidates), chunksize=chunksize)
+        for lang, slug, issues, accepted in results:
+            if issues:
+                failures[(lang, slug)] = (issues, accepted)
+    return failures
+
+
+def parse_translation_response(response_text: str, output_format: str = "html") -> dict:
     """Parse model JSON, tolerating fenced JSON despite the prompt."""
     text = response_text.strip()
     fenced = re.match(r"^```(?:json)?\s*(.*?)\s*```$", text, flags=re.DOTALL | re.IGNORECASE)
@@ -386,10 +1031,8 @@ def parse_translation_response(body: str, response_text: str) -> dict:
         if start != -1 and end != -1 and end > start:
             text = text[start:end + 1]
 
-    parsed = TranslationOutput.model_validate_json(text)
-    result = parsed.model_dump()
-    validate_translation_output(body, result)
-    return result
+    parsed = OUTPUT_FORMATS[output_format]["model"].model_validate_json(text)
+    return parsed.model_dump()
 
 
 class OpenRouterAPIError(Exception):
@@ -400,6 +1043,16 @@ class OpenRouterAPIError(Exception):
         self.status_code = status_code
 
 
+def add_usage(totals: dict, usage: Optional[dict]) -> None:
+    """Add an OpenAI-style usage block (as returned by OpenRouter) to running totals."""
+    if not usage:
+        return
+    totals["prompt_tokens"] += usage.get("prompt_tokens") or 0
+    totals["completion_tokens"] += usage.get("completion_tokens") or 0
+    details = usage.get("prompt_tokens_details") or {}
+    totals["cached_tokens"] += details.get("cached_tokens") or 0
+
+
 async def translate_with_openrouter_async(
     client: httpx.AsyncClient,
     title: str,
@@ -410,25 +1063,48 @@ async def translate_with_openrouter_async(
     max_retries: int = MAX_RETRIES,
     initial_delay: int = INITIAL_RETRY_DELAY,
     verbose: bool = False,
+    prefix: Optional[list[dict]] = None,
+    trace: Optional[TaskTrace] = None,
+    placeholders: Optional[dict[str, str]] = None,
+    output_format: str = "html",
 ) -> dict:
-    """Translate content using OpenRouter chat completions."""
+    """
+    Translate content using OpenRouter chat completions.
+
+    Pass the post's shared prefix (build_translation_prefix) so every language
+    sends byte-identical leading messages. When the prefix was built from a
+    masked body (mask_source), pass its `placeholders` so code and URLs are
+    restored into the response; without a prefix the body is masked here.
+
+    With output_format "markdown" the model returns markdown, which is rendered
+    to content_html locally (markdown_render). Stage timings, retry causes and
+    API token usage are recorded on `trace`; the returned dict also carries
+    "usage": prompt, cached prompt and completion tokens summed over all attempts.
+    """
     lang_info = SUPPORTED_LANGUAGES[lang_code]
+    if trace is None:
+        trace = TaskTrace("", lang_code)
+    if prefix is None:
+        masked_body, placeholders = mask_source(body)
+        prefix = build_translation_prefix(title, excerpt, masked_body, output_format)
     messages = build_translation_messages(
-        title=title,
-        excerpt=excerpt,
-        body=body,
+        prefix=prefix,
         target_language=lang_info["name"],
         target_native=lang_info["native"],
+        output_format=output_format,
     )
     payload = {
         "model": model,
         "messages": messages,
         "max_tokens": 50000,
         "temperature": 0,
-        "response_format": TRANSLATION_RESPONSE_FORMAT,
+        "response_format": OUTPUT_FORMATS[output_format]["response_format"],
         "provider": {
             "require_parameters": True,
         },
+        "usage": {
+            "include": True,
+        },
     }
     
     retry_delay = initial_delay
@@ -436,7 +1112,8 @@ async def translate_with_openrouter_async(
     
     for attempt in range(max_retries):
         try:
-            response = await client.post(OPENROUTER_API_URL, json=payload)
+            with trace.span("request"):
+                response = await client.post(OPENROUTER_API_URL, json=payload)
             if response.status_code >= 400:
                 try:
                     error_data = response.json()
@@ -445,7 +1122,9 @@ async def translate_with_openrouter_async(
                     error_message = response.text
                 raise OpenRouterAPIError(response.status_code, error_message)
 
-            data = response.json()
+            with trace.span("parse"):
+                data = response.json()
+            add_usage(trace.usage, data.get("usage"))
             choice = data["choices"][0]
             finish_reason = choice.get("finish_reason")
             if finish_reason in {"length", "max_tokens"}:
@@ -455,28 +1134,46 @@ async def translate_with_openrouter_async(
             if content is None:
                 raise ValueError("Model returned empty content")
             if isinstance(content, dict):
-                parsed = TranslationOutput.model_validate(content)
-                result = parsed.model_dump()
-                validate_translation_output(body, result)
-                return result
-            if isinstance(content, list):
-                content = "\n".join(
-                    part.get("text", "") if isinstance(part, dict) else str(part)
-                    for part in content
-                )
+                with trace.span("parse"):
+                    result = OUTPUT_FORMATS[output_format]["model"].model_validate(content).model_dump()
+            else:
+                if isinstance(content, list):
+                    content = "\n".join(
+                        part.get("text", "") if isinstance(part, dict) else str(part)
+                        for part in content
+                    )
 
-            try:
-                result = parse_translation_response(body, content)
-            except Exception as json_error:
-                # Log the raw response snippet for debugging
-                response_snippet = content[:500] if len(content) > 500 else content
-                raise ValueError(f"Failed to parse translation JSON: {json_error}. Response snippet: {response_snippet}")
-            
+                try:
+                    with trace.span("parse"):
+                        result = parse_translation_response(content, output_format)
+                except Exception as json_error:
+                    # Log the raw response snippet for debugging
+                    response_snippet = content[:500] if len(content) > 500 else content
+                    raise ValueError(f"Failed to parse translation JSON: {json_error}. Response snippet: {response_snippet}")
+
+            with trace.span("validate"):
+                if output_format == "markdown":
+                    markdown = result.pop("content_markdown")
+                    if placeholders:
+                        markdown = restore_placeholders(markdown, placeholders, markdown=True)
+                    result["content_html"] = render_markdown(markdown)
+                elif placeholders:
+                    result["content_html"] = restore_placeholders(result["content_html"], placeholders)
+                validate_translation_output(body, result)
+                issues = check_translation_structure(body, result["content_html"])
+
+            # Structural defects get the remaining attempts; the last attempt is kept with its
+            # issues recorded, so the cached-translation check does not requeue it forever
+            if issues and attempt < max_retries - 1:
+                raise ValueError(f"Translation structure mismatch: {'; '.join(issues)}")
+            result["structure_issues"] = issues
+            result["usage"] = dict(trace.usage)
             return result
             
         except httpx.TimeoutException:
             last_exception = TimeoutError("API request timed out")
             if attempt < max_retries - 1:
+                trace.retry("timeout")
                 if verbose:
                     print(f"    Request timed out. Retrying in {retry_delay}s...")
                 await asyncio.sleep(retry_delay)
@@ -487,6 +1184,7 @@ async def translate_with_openrouter_async(
         except OpenRouterAPIError as e:
             last_exception = e
             if attempt < max_retries - 1 and e.status_code in {408, 429, 500, 502, 503, 504}:
+                trace.retry(f"http_{e.status_code}")
                 if verbose:
                     print(f"    API error (status {e.status_code}). Retrying in {retry_delay}s...")
                 await asyncio.sleep(retry_delay)
@@ -497,6 +1195,7 @@ async def translate_with_openrouter_async(
         except httpx.HTTPError as e:
             last_exception = e
             if attempt < max_retries - 1:
+                trace.retry("network")
                 if verbose:
                     print(f"    Network error. Retrying in {retry_delay}s...")
                 await asyncio.sleep(retry_delay)
@@ -510,15 +1209,32 @@ async def translate_with_openrouter_async(
             error_str = str(e)
             if "max_tokens" in error_str or "truncated" in error_str:
                 if attempt < max_retries - 1:
+                    trace.retry("truncated")
                     if verbose:
                         print(f"    Response truncated. Retrying in {retry_delay}s...")
                     await asyncio.sleep(retry_delay)
                     retry_delay = min(retry_delay * 2, MAX_RETRY_DELAY)
                 else:
                     raise
+            elif "placeholder mismatch" in error_str:
+                if attempt < max_retries - 1:
+                    trace.retry("placeholders")
+                    if verbose:
+                        print(f"    {error_str[:120]}. Retrying in {retry_delay}s...")
+                    await asyncio.sleep(retry_delay)
+                    retry_delay = min(retry_delay * 2, MAX_RETRY_DELAY)
+                else:
+                    raise
+            elif "structure mismatch" in error_str:
+                trace.retry("structure")
+                if verbose:
+                    print(f"    {error_str[:120]}. Retrying in {retry_delay}s...")
+                await asyncio.sleep(retry_delay)
+                retry_delay = min(retry_delay * 2, MAX_RETRY_DELAY)
             elif "Failed to parse translation JSON" in error_str:
                 # JSON parsing error - retry as it might be a transient issue
                 if attempt < max_retries - 1:
+                    trace.retry("json")
                     if verbose:
                         print(f"    JSON parsing error. Retrying in {retry_delay}s...")
                     await asyncio.sleep(retry_delay)
@@ -540,12 +1256,10 @@ def save_translation(
     translation: dict,
     source_hash: str,
     model: str,
+    shared_blocks: bool = False,
+    storage: Optional[StorageStats] = None,
 ) -> Path:
     """Save translation to JSON file."""
-    # Ensure directory exists
-    lang_dir = TRANSLATIONS_DIR / lang
-    lang_dir.mkdir(parents=True, exist_ok=True)
-    
     # Build output data
     output_data = {
         "title": translation["title"],
@@ -554,16 +1268,64 @@ def save_translation(
         "source_hash": source_hash,
         "model": model,
         "generated_at": datetime.now(timezone.utc).isoformat(),
+        "structure_issues": translation.get("structure_issues", []),
     }
+    return store_translation(lang, slug, output_data, shared_blocks, storage)
+
+
+def store_translation(
+    lang: str,
+    slug: str,
+    output_data: dict,
+    shared_blocks: bool = False,
+    storage: Optional[StorageStats] = None,
+) -> Path:
+    """
+    Minify content_html, optionally move shared blocks to the post's sidecar, and write the file.
+
+    The sidecar is updated after the language file is written, and blocks that no
+    language references any more are dropped from it.
+    """
+    # Ensure directory exists
+    lang_dir = TRANSLATIONS_DIR / lang
+    lang_dir.mkdir(parents=True, exist_ok=True)
+
+    raw_html = output_data["content_html"]
+    content_html = minify_html(raw_html)
+    blocks = {}
+    if shared_blocks:
+        content_html, blocks = extract_shared_blocks(content_html)
+    output_data = {key: value for key, value in output_data.items() if key != "shared"}
+    output_data["content_html"] = content_html
+    if blocks:
+        output_data["shared"] = True
     
     # Write JSON file
     output_path = lang_dir / f"{slug}.json"
     with open(output_path, "w", encoding="utf-8") as f:
         json.dump(output_data, f, indent=2, ensure_ascii=False)
-    
+    update_shared_blocks(TRANSLATIONS_DIR, slug, blocks)
+
+    if storage is not None:
+        storage.add(
+            len(raw_html.encode("utf-8")),
+            len(content_html.encode("utf-8")),
+            sum(len(block.encode("utf-8")) for block in blocks.values()),
+        )
     return output_path
 
 
+def repack_translations(slugs: set[str], languages: list[str], shared_blocks: bool) -> StorageStats:
+    """Re-store cached translations through the storage stage, keeping every other field."""
+    storage = StorageStats()
+    for lang in languages:
+        for slug in sorted(slugs):
+            translation = get_cached_translation(lang, slug)
+            if translation is not None:
+                store_translation(lang, slug, translation, shared_blocks, storage)
+    return storage
+
+
 def get_posts_to_translate(specific_post: Optional[str] = None) -> list[Path]:
     """Get list of post files to translate."""
     if specific_post:
@@ -582,8 +1344,335 @@ def get_posts_to_translate(specific_post: Optional[str] = None) -> list[Path]:
     return posts
 
 
+def shard_post_languages(
+    posts: list[Path],
+    languages: list[str],
+    shard: Optional[tuple[int, int]],
+    by_post: bool = False,
+) -> dict[str, list[str]]:
+    """
+    Languages to plan per post file name; with a shard, only the shard's units.
+
+    Units are (post, language) pairs costed by source size times the language's
+    input + output token ratio, so every runner derives the same split from the
+    checkout. With `by_post`, whole posts are the units (shared-block sidecars
+    are per post and must be written by one shard).
+    """
+    if shard is None:
+        return {post_path.name: list(languages) for post_path in posts}
+
+    sizes = {post_path.name: post_path.stat().st_size for post_path in posts}
+
+    def cost(name: str, lang: str) -> float:
+        return sizes[name] * (1 + OUTPUT_TOKEN_RATIOS.get(lang, DEFAULT_OUTPUT_TOKEN_RATIO))
+
+    if by_post:
+        owned = shard_units({name: sum(cost(name, lang) for lang in languages) for name in sizes}, shard)
+        return {name: list(languages) for name in sizes if name in owned}
+
+    owned = shard_units({(name, lang): cost(name, lang) for name in sizes for lang in languages}, shard)
+    post_languages = {}
+    for name in sizes:
+        shard_languages = [lang for lang in languages if (name, lang) in owned]
+        if shard_languages:
+            post_languages[name] = shard_languages
+    return post_languages
+
+
+def load_post_source(post_path: Path, verbose: bool = False) -> tuple[Optional[dict], str]:
+    """
+    Read and parse one post for planning.
+
+    Returns:
+        Tuple of (post dict or None, status): "ok", "parse_error" or "not_ready"
+    """
+    # Read and parse post content
+    try:
+        with open(post_path, "r", encoding="utf-8") as f:
+            raw_content = f.read()
+        front_matter, body = parse_front_matter(raw_content)
+    except Exception as e:
+        if verbose:
+            print(f"! Error parsing {post_path.name}: {e}")
+        return None, "parse_error"
+
+    # Skip posts that aren't ready
+    if not front_matter.get("ready", True):
+        if verbose:
+            print(f"- Skipping {post_path.name} (not ready)")
+        return None, "not_ready"
+
+    return {
+        "slug": get_post_slug(post_path.name),
+        "title": front_matter.get("title", ""),
+        "excerpt": front_matter.get("excerpt", ""),
+        "body": body,
+        "content_hash": calculate_content_hash(raw_content),
+        "date": post_path.name[:10],
+    }, "ok"
+
+
+def load_post_sources(posts: list[Path], verbose: bool = False) -> tuple[list[dict], int, int]:
+    """
+    Read and parse posts for planning.
+
+    Returns:
+        Tuple of (parsed posts, parse error count, not-ready count)
+    """
+    parsed_posts = []
+    parse_errors = 0
+    skipped_not_ready = 0
+    for post_path in posts:
+        post, status = load_post_source(post_path, verbose)
+        if status == "parse_error":
+            parse_errors += 1
+        elif status == "not_ready":
+            skipped_not_ready += 1
+        else:
+            parsed_posts.append(post)
+
+    return parsed_posts, parse_errors, skipped_not_ready
+
+
+class TranslationPlanner:
+    """
+    Streams translation tasks post by post for a run.
+
+    Posts are ordered by their best task priority before any file is read
+    (views come from the analytics data, dates from filenames), then read,
+    checked and planned one at a time off the event loop, so requests start
+    while later posts are still being planned. The tasks of a post share one
+    post dict (body, prompt prefix, placeholders) instead of copies, and token
+    and cost budgets are applied as tasks stream by. Only posts in flight stay
+    in memory.
+    """
+
+    def __init__(
+        self,
+        args: argparse.Namespace,
+        posts: list[Path],
+        target_languages: list[str],
+        token_cache: TokenCountCache,
+        post_views: dict[str, int],
+    ):
+        self.args = args
+        self.target_languages = target_languages
+        self.token_cache = token_cache
+        self.post_views = post_views
+        self.post_languages = shard_post_languages(posts, target_languages, args.shard, by_post=args.shared_blocks)
+        self.posts = sorted((post for post in posts if post.name in self.post_languages), key=self.post_priority)
+        self.stats = {
+            "total_posts": len(self.posts),
+            "total_possible": 0,
+            "to_translate": 0,
+            "cached": 0,
+            "skipped_not_ready": 0,
+            "parse_errors": 0,
+            "structure_failures": 0,
+            "deferred": 0,
+            "by_language": {lang: {"cached": 0, "to_translate": 0} for lang in target_languages},
+        }
+        self.planned = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.cost = 0.0
+
+        output = OUTPUT_FORMATS[args.output_format]
+        self.output_share = output["output_share"]
+        self.system_tokens = token_cache.count(output["system"])
+        self.instruction_tokens = {
+            lang: token_cache.count(build_translation_messages(
+                [], SUPPORTED_LANGUAGES[lang]["name"], SUPPORTED_LANGUAGES[lang]["native"], args.output_format
+            )[0]["content"])
+            for lang in target_languages
+        }
+
+    def post_priority(self, post_path: Path) -> tuple:
+        """Priority of a post's most important task, known without reading the file."""
+        views = self.post_views.get(get_post_slug(post_path.name), 0)
+        date = post_path.name[:10]
+        return min(
+            task_priority(views, lang, date, self.args.lang_weights) for lang in self.post_languages[post_path.name]
+        )
+
+    async def plan(self) -> AsyncIterator[list[dict]]:
+        """Yield the tasks of each post that needs work, in priority order."""
+        # One process pool serves the structural checks of every post
+        executor = None
+        if not (self.args.force or self.args.skip_structure_check):
+            executor = ProcessPoolExecutor(max_workers=max(1, self.args.jobs))
+        try:
+            for post_path in self.posts:
+                tasks = await asyncio.to_thread(self.plan_post, post_path, executor)
+                if tasks:
+                    yield tasks
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+    def plan_post(self, post_path: Path, executor: Optional[ProcessPoolExecutor] = None) -> list[dict]:
+        """Read one post and plan its translations (runs in a worker thread)."""
+        args = self.args
+        post, status = load_post_source(post_path, args.verbose)
+        if post is None:
+            self.stats["parse_errors" if status == "parse_error" else "skipped_not_ready"] += 1
+            return []
+        slug = post["slug"]
+        languages = self.post_languages[post_path.name]
+
+        # Structural check of cached translations (local, in the process pool)
+        structure_failures = {}
+        if not (args.force or args.skip_structure_check):
+            structure_failures = check_cached_translations(
+                [(lang, slug, post["body"], post["content_hash"]) for lang in languages],
+                jobs=args.jobs,
+                executor=executor,
+            )
+
+        tasks = []
+        source_tokens = 0
+        for lang in languages:
+            self.stats["total_possible"] += 1
+
+            # Accepted failures already used their retries when they were generated
+            issues, accepted = structure_failures.get((lang, slug), ([], False))
+
+            # Check if translation is needed
+            needs_translation, reason = should_translate(
+                lang=lang,
+                slug=slug,
+                content_hash=post["content_hash"],
+                force=args.force,
+                structure_issues=None if accepted else issues,
+            )
+
+            if not needs_translation:
+                self.stats["cached"] += 1
+                self.stats["by_language"][lang]["cached"] += 1
+                continue
+
+            if args.verbose:
+                print(f"+ {slug} ({lang}): {reason}")
+
+            self.stats["to_translate"] += 1
+            self.stats["by_language"][lang]["to_translate"] += 1
+            if issues and not accepted:
+                self.stats["structure_failures"] += 1
+
+            # Shared prompt prefix, masked, built and counted once per post
+            if "prefix" not in post:
+                masked_body, post["placeholders"] = (post["body"], {}) if args.no_mask else mask_source(post["body"])
+                post["prefix"] = build_translation_prefix(post["title"], post["excerpt"], masked_body, args.output_format)
+                source_tokens = self.token_cache.count(post["prefix"][1]["content"])
+
+            views = self.post_views.get(slug, 0)
+            task = {
+                "post": post,
+                "slug": slug,
+                "lang": lang,
+                "tokens": self.system_tokens + source_tokens + self.instruction_tokens[lang],
+                "output_tokens": int(
+                    source_tokens * OUTPUT_TOKEN_RATIOS.get(lang, DEFAULT_OUTPUT_TOKEN_RATIO) * self.output_share
+                ),
+                "views": views,
+                "priority": task_priority(views, lang, post["date"], args.lang_weights),
+            }
+            if self.admit(task):
+                tasks.append(task)
+
+        # Priority queue order: most-viewed (weighted by language) first, so interrupted
+        # or budget-limited runs still deliver the highest-impact translations
+        tasks.sort(key=lambda task: task["priority"])
+        return tasks
+
+    def admit(self, task: dict) -> bool:
+        """
+        Spend guard: take the task if it fits the token and cost budgets.
+
+        Tasks arrive in priority order; one that does not fit is deferred and
+        smaller, lower-priority tasks may still use the remaining budget.
+        """
+        args = self.args
+        tokens = task["tokens"] + task["output_tokens"]
+        cost = estimate_task_cost(task, args.input_price, args.output_price)
+        if (args.budget is not None and self.input_tokens + self.output_tokens + tokens > args.budget) or (
+            args.max_cost is not None and self.cost + cost > args.max_cost
+        ):
+            self.stats["deferred"] += 1
+            return False
+        self.planned += 1
+        self.input_tokens += task["tokens"]
+        self.output_tokens += task["output_tokens"]
+        self.cost += cost
+        return True
+
+    def estimate_line(self) -> str:
+        line = (
+            f"Estimated tokens ({self.token_cache.estimator.name}): {self.input_tokens:,} input + "
+            f"{self.output_tokens:,} output (~{(self.input_tokens + self.output_tokens)/1000:.1f}k)"
+        )
+        if self.args.input_price is not None and self.args.output_price is not None:
+            line += f", ~${self.cost:.2f}"
+        return line
+
+    def budget_line(self) -> str:
+        if not self.stats["deferred"]:
+            return ""
+        return f"Deferred by budget: {self.stats['deferred']} (lowest views first)"
+
+
+class BackgroundWriter:
+    """
+    Run blocking file writes on a dedicated thread so the event loop only waits on the network.
+
+    submit() returns once the write has finished, so callers still see its result
+    or exception. At most `max_pending` writes are queued at a time; further
+    submitters wait for a slot, which bounds how much content_html is buffered.
+    """
+
+    def __init__(self, max_pending: int = WRITER_QUEUE_SIZE):
+        self._jobs = queue.Queue()
+        self._slots = asyncio.Semaphore(max_pending)
+        self._thread = threading.Thread(target=self._run, name="translation-writer", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                return
+            func, args, kwargs, future, loop = job
+            try:
+                result = func(*args, **kwargs)
+            except BaseException as e:
+                loop.call_soon_threadsafe(self._resolve, future, None, e)
+            else:
+                loop.call_soon_threadsafe(self._resolve, future, result, None)
+
+    @staticmethod
+    def _resolve(future: asyncio.Future, result, error: Optional[BaseException]):
+        if future.done():
+            return
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    async def submit(self, func, *args, **kwargs):
+        """Run func(*args, **kwargs) on the writer thread and await its result."""
+        async with self._slots:
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            self._jobs.put((func, args, kwargs, future, loop))
+            return await future
+
+    async def aclose(self):
+        """Finish queued writes and stop the thread."""
+        self._jobs.put(None)
+        await asyncio.to_thread(self._thread.join)
+
+
 async def translate_task(
-    semaphore: asyncio.Semaphore,
     client: httpx.AsyncClient,
     slug: str,
     title: str,
@@ -596,88 +1685,146 @@ async def translate_task(
     token_counter: dict,
     max_retries: int = MAX_RETRIES,
     retry_delay: int = INITIAL_RETRY_DELAY,
+    prefix: Optional[list[dict]] = None,
+    warmup: Optional[asyncio.Event] = None,
+    leads_warmup: bool = False,
+    trace: Optional[TaskTrace] = None,
+    writer: Optional[BackgroundWriter] = None,
+    token_count: Optional[int] = None,
+    router: Optional[ModelRouter] = None,
+    placeholders: Optional[dict[str, str]] = None,
+    output_format: str = "html",
+    shared_blocks: bool = False,
+    storage: Optional[StorageStats] = None,
 ) -> dict:
-    """Single translation task that respects concurrency limits."""
+    """
+    Single translation task, run by one of the run's fixed pool of workers.
+
+    Stage timings, retries, token usage and the final status are recorded on `trace`.
+    Saves and error logs go through `writer` (or asyncio.to_thread), off the event loop.
+
+    Tasks for the same post share `prefix`, its `placeholders` and `warmup`. The leading task sets
+    `warmup` once its request has had PREFIX_WARMUP_SECONDS to prefill (or has
+    finished); the other languages wait for it, so they hit a warm prompt cache.
+
+    With a `router`, `model` is ignored: the router picks, hedges and falls back
+    across its models, and the translation records the model that answered.
+    """
     lang_info = SUPPORTED_LANGUAGES[lang]
     
     # Calculate tokens for this translation
-    content = f"{title}\n\n{excerpt}\n\n{body}"
-    token_count = estimate_tokens(content)
+    if token_count is None:
+        token_count = estimate_tokens(f"{title}\n\n{excerpt}\n\n{body}")
+    if trace is None:
+        trace = TaskTrace(slug, lang)
+    run_io = writer.submit if writer is not None else asyncio.to_thread
+
+    def done(result: dict) -> dict:
+        trace.finish(result["status"], result.get("error", ""))
+        return result
+
+    async def log_error(error: Exception, response_snippet: str = ""):
+        # The traceback has to be captured here, while the exception is being handled
+        await run_io(log_error_to_file, slug, lang, error, response_snippet, traceback.format_exc())
+
+    if warmup is not None and not leads_warmup:
+        await warmup.wait()
     
-    async with semaphore:
-        try:
-            pbar.set_description(f"Translating {slug[:20]}... ({lang})")
-            
-            translation = await translate_with_openrouter_async(
-                client=client,
-                title=title,
-                excerpt=excerpt,
-                body=body,
-                lang_code=lang,
-                model=model,
-                max_retries=max_retries,
-                initial_delay=retry_delay,
-                verbose=False,
-            )
-            
-            # Save translation
-            save_translation(
+    trace.add_span("queue_wait", time.monotonic() - trace.created)
+    warmup_timer = None
+    if leads_warmup:
+        warmup_timer = asyncio.get_running_loop().call_later(PREFIX_WARMUP_SECONDS, warmup.set)
+    try:
+        pbar.set_description(f"Translating {slug[:20]}... ({lang})")
+        
+        request = functools.partial(
+            translate_with_openrouter_async,
+            client=client,
+            title=title,
+            excerpt=excerpt,
+            body=body,
+            lang_code=lang,
+            max_retries=max_retries,
+            initial_delay=retry_delay,
+            verbose=False,
+            prefix=prefix,
+            trace=trace,
+            placeholders=placeholders,
+            output_format=output_format,
+        )
+        if router is None:
+            translation = await request(model=model)
+        else:
+            model, translation = await router.run(lambda candidate: request(model=candidate), on_switch=trace.retry)
+        
+        # Save translation
+        with trace.span("save"):
+            await run_io(
+                save_translation,
                 lang=lang,
                 slug=slug,
                 translation=translation,
                 source_hash=content_hash,
                 model=model,
+                shared_blocks=shared_blocks,
+                storage=storage,
             )
-            
-            # Update token counter (thread-safe)
-            with token_counter['lock']:
-                token_counter['processed'] += token_count
-                tokens_k = token_counter['processed'] / 1000
-            
-            pbar.update(1)
-            pbar.set_postfix_str(f"✓ {slug[:15]} ({lang}) | {tokens_k:.1f}k tokens")
-            
-            return {"status": "success", "lang": lang, "slug": slug, "tokens": token_count}
-            
-        except TimeoutError as e:
-            error_msg = f"Timeout: {str(e)[:60]}"
-            log_error_to_file(slug, lang, e)
-            pbar.update(1)
-            pbar.write(f"⏱ Timeout: {slug} ({lang})")
-            return {"status": "failed", "lang": lang, "slug": slug, "error": error_msg}
-            
-        except OpenRouterAPIError as e:
-            status_code = getattr(e, "status_code", "unknown")
-            error_msg = f"API error ({status_code}): {str(e)[:60]}"
-            log_error_to_file(slug, lang, e)
-            pbar.update(1)
-            if status_code == 429:
-                pbar.write(f"⚠ Rate limited: {slug} ({lang})")
-            else:
-                pbar.write(f"✗ API error ({status_code}): {slug} ({lang})")
-            return {"status": "failed", "lang": lang, "slug": slug, "error": error_msg}
+        
+        # Update token counter (thread-safe)
+        usage = translation.get("usage", {})
+        with token_counter['lock']:
+            token_counter['processed'] += token_count
+            tokens_k = token_counter['processed'] / 1000
+        
+        pbar.update(1)
+        pbar.set_postfix_str(f"✓ {slug[:15]} ({lang}) | {tokens_k:.1f}k tokens")
+        
+        return done({"status": "success", "lang": lang, "slug": slug, "tokens": token_count, "usage": usage})
+        
+    except TimeoutError as e:
+        error_msg = f"Timeout: {str(e)[:60]}"
+        await log_error(e)
+        pbar.update(1)
+        pbar.write(f"⏱ Timeout: {slug} ({lang})")
+        return done({"status": "failed", "lang": lang, "slug": slug, "error": error_msg})
+        
+    except OpenRouterAPIError as e:
+        status_code = getattr(e, "status_code", "unknown")
+        error_msg = f"API error ({status_code}): {str(e)[:60]}"
+        await log_error(e)
+        pbar.update(1)
+        if status_code == 429:
+            pbar.write(f"⚠ Rate limited: {slug} ({lang})")
+        else:
+            pbar.write(f"✗ API error ({status_code}): {slug} ({lang})")
+        return done({"status": "failed", "lang": lang, "slug": slug, "error": error_msg})
+
+    except httpx.HTTPError as e:
+        error_msg = f"Network error: {str(e)[:60]}"
+        await log_error(e)
+        pbar.update(1)
+        pbar.write(f"✗ Network error: {slug} ({lang})")
+        return done({"status": "failed", "lang": lang, "slug": slug, "error": error_msg})
+        
+    except Exception as e:
+        error_msg = str(e)[:60]
+        response_snippet = getattr(e, 'response_snippet', '')
+        await log_error(e, response_snippet)
+        pbar.update(1)
+        pbar.write(f"✗ Error: {slug} ({lang}) - {type(e).__name__}")
+        return done({"status": "failed", "lang": lang, "slug": slug, "error": error_msg})
 
-        except httpx.HTTPError as e:
-            error_msg = f"Network error: {str(e)[:60]}"
-            log_error_to_file(slug, lang, e)
-            pbar.update(1)
-            pbar.write(f"✗ Network error: {slug} ({lang})")
-            return {"status": "failed", "lang": lang, "slug": slug, "error": error_msg}
-            
-        except Exception as e:
-            error_msg = str(e)[:60]
-            response_snippet = getattr(e, 'response_snippet', '')
-            log_error_to_file(slug, lang, e, response_snippet)
-            pbar.update(1)
-            pbar.write(f"✗ Error: {slug} ({lang}) - {type(e).__name__}")
-            return {"status": "failed", "lang": lang, "slug": slug, "error": error_msg}
+    finally:
+        if leads_warmup:
+            warmup_timer.cancel()
+            warmup.set()
 
 
 async def run_translations_async(args: argparse.Namespace):
     """Run translations asynchronously with concurrency control."""
     # Check for API key
     api_key = os.environ.get("OPENROUTER_API_KEY")
-    if not api_key and not args.dry_run:
+    if not api_key and not args.dry_run and not args.check_structure and not args.repack:
         print("Error: OPENROUTER_API_KEY environment variable not set")
         print("Set it with: export OPENROUTER_API_KEY='your-api-key'")
         sys.exit(1)
@@ -690,108 +1837,105 @@ async def run_translations_async(args: argparse.Namespace):
     
     # Get posts to translate
     posts = get_posts_to_translate(args.post)
+    changed_only = False
+    if args.changed_since and not args.post:
+        since = resolve_since(args.changed_since, "translate_posts")
+        changed = changed_posts(POSTS_DIR, since) if since else None
+        if changed is None:
+            print(f"Note: no git diff against '{args.changed_since}', scanning all {len(posts)} posts")
+        else:
+            posts = changed
+            changed_only = True
+
+    # A complete, successful run over every post becomes the base for --changed-since last
+    record_ref = not (args.lang or args.post or args.dry_run or args.shard)
     
-    # Silently configure (no output before dashboard)
-    
-    # Collect all translation tasks
-    tasks_to_run = []
-    stats = {
-        "total_posts": len(posts),
-        "total_possible": 0,
-        "to_translate": 0,
-        "cached": 0,
-        "skipped_not_ready": 0,
-        "parse_errors": 0,
-        "by_language": {lang: {"cached": 0, "to_translate": 0} for lang in target_languages},
-    }
-    
-    # First pass: identify what needs translation (silent analysis)
-    for post_path in posts:
-            
-            slug = get_post_slug(post_path.name)
-            
-            # Read and parse post content
-            try:
-                with open(post_path, "r", encoding="utf-8") as f:
-                    raw_content = f.read()
-                front_matter, body = parse_front_matter(raw_content)
-            except Exception as e:
-                if args.verbose:
-                    print(f"! Error parsing {post_path.name}: {e}")
-                stats["parse_errors"] += 1
-                continue
-            
-            # Skip posts that aren't ready
-            if not front_matter.get("ready", True):
-                if args.verbose:
-                    print(f"- Skipping {post_path.name} (not ready)")
-                stats["skipped_not_ready"] += 1
-                continue
-            
-            title = front_matter.get("title", "")
-            excerpt = front_matter.get("excerpt", "")
-            content_hash = calculate_content_hash(raw_content)
-            
-            for lang in target_languages:
-                stats["total_possible"] += 1
-                
-                # Check if translation is needed
-                needs_translation, reason = should_translate(
-                    lang=lang,
-                    slug=slug,
-                    content_hash=content_hash,
-                    force=args.force,
-                )
-                
-                if not needs_translation:
-                    stats["cached"] += 1
-                    stats["by_language"][lang]["cached"] += 1
-                    continue
-                
-                stats["to_translate"] += 1
-                stats["by_language"][lang]["to_translate"] += 1
-                
-                # Calculate token count for this task
-                content = f"{title}\n\n{excerpt}\n\n{body}"
-                tokens = estimate_tokens(content)
-                
-                if not args.dry_run:
-                    # Add to tasks list
-                    tasks_to_run.append({
-                        "slug": slug,
-                        "title": title,
-                        "excerpt": excerpt,
-                        "body": body,
-                        "lang": lang,
-                        "content_hash": content_hash,
-                        "tokens": tokens,
-                    })
-                else:
-                    # Track tokens even in dry-run for estimation
-                    tasks_to_run.append({"tokens": tokens})
-    
-    # Skip cache analysis output (will show in dashboard)
-    
-    if args.dry_run:
-        total_tokens = sum(task["tokens"] for task in tasks_to_run)
-        print(f"\n🔍 Dry run - would translate {stats['to_translate']} posts (cached: {stats['cached']})")
-        print(f"   Estimated tokens: {total_tokens:,} (~{total_tokens/1000:.1f}k)")
+    if args.repack:
+        slugs = {get_post_slug(post_path.name) for post_path in posts}
+        storage = await asyncio.to_thread(repack_translations, slugs, target_languages, args.shared_blocks)
+        print(storage.summary_line() or "No cached translations to repack")
         return
-    
-    if not tasks_to_run:
-        print("\n✓ All translations are up to date!")
+
+    if args.check_structure:
+        # Report-only mode reads every post up front (blocking reads run off the event loop)
+        parsed_posts, _, _ = await asyncio.to_thread(load_post_sources, posts, args.verbose)
+        structure_failures = await asyncio.to_thread(
+            check_cached_translations,
+            [
+                (lang, post["slug"], post["body"], post["content_hash"])
+                for post in parsed_posts
+                for lang in target_languages
+            ],
+            jobs=args.jobs,
+        )
+        for (lang, slug), (issues, accepted) in sorted(structure_failures.items()):
+            marker = "accepted" if accepted else "requeue"
+            print(f"✗ [{lang}] {slug} ({marker}): {'; '.join(issues)}")
+        checked = len(parsed_posts) * len(target_languages)
+        print(f"\nStructure check: {len(structure_failures)} of {checked} translations failed")
+        if structure_failures:
+            sys.exit(1)
         return
-    
-    # Calculate total tokens
-    total_tokens = sum(task["tokens"] for task in tasks_to_run)
-    
-    # Show summary
-    print(f"\nTranslating {stats['to_translate']} posts to {len(target_languages)} languages")
-    print(f"Cached: {stats['cached']} | New: {stats['to_translate']} | Total: {stats['total_possible']}")
-    print(f"Estimated tokens: {total_tokens:,} (~{total_tokens/1000:.1f}k)")
-    print(f"Model: {args.model}")
 
+    # Token estimates are cached by content hash, so unchanged posts are not re-tokenized
+    try:
+        estimator = load_estimator(args.tokenizer)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    token_cache = TokenCountCache(estimator, TOKEN_CACHE_FILE)
+    planner = TranslationPlanner(args, posts, target_languages, token_cache, load_post_views())
+    prune_token_cache = not (args.post or args.lang or changed_only or args.shard)
+
+    if args.dry_run:
+        # Only the head of the queue is kept, not the whole plan
+        queue_head = []
+        async for tasks in planner.plan():
+            queue_head = heapq.nsmallest(5, queue_head + tasks, key=lambda task: task["priority"])
+        await asyncio.to_thread(token_cache.save, prune_unused=prune_token_cache)
+
+        stats = planner.stats
+        print(f"\n🔍 Dry run - would translate {planner.planned} posts (cached: {stats['cached']})")
+        if args.shard:
+            print(f"   Shard {args.shard[0]}/{args.shard[1]}: {stats['total_possible']} of {len(posts) * len(target_languages)} tasks")
+        if stats["structure_failures"]:
+            print(f"   Including {stats['structure_failures']} cached translation(s) that failed the structure check")
+        print(f"   {planner.estimate_line()}")
+        if planner.budget_line():
+            print(f"   {planner.budget_line()}")
+        if queue_head:
+            print("   Queue (highest priority first):")
+            for task in queue_head:
+                print(f"     {task['slug']} ({task['lang']}): {task['views']:,} views, weight {args.lang_weights.get(task['lang'], 1.0):g}")
+            if planner.planned > 5:
+                print(f"     ... and {planner.planned - 5} more")
+        return
+
+    print(f"\nPlanning {len(posts)} posts for {len(target_languages)} languages")
+    if args.shard:
+        print(f"Shard {args.shard[0]}/{args.shard[1]}: {len(planner.posts)} posts")
+    print(f"Model: {' → '.join(args.models)}")
+
+    model_stats = ModelStats(MODEL_STATS_FILE)
+    router = ModelRouter(args.models, model_stats, hedge=not args.no_hedge)
+    if len(args.models) > 1 and not args.no_hedge:
+        print(f"Hedge after: {model_stats.deadline(args.models[0]):.0f}s (p95 of {args.models[0]})")
+
+    metrics = RunMetrics(args.model)
+    metrics.connections.on_request_sent = mark_request_sent
+    storage = StorageStats()
+
+    # One pooled connection per concurrency slot and model: while every worker waits on a
+    # slow response, hedges and fallbacks to the other models still get a connection at
+    # once. Only one connection per slot is kept alive; with HTTP/2 requests multiplex
     client = httpx.AsyncClient(
+        http2=args.http2,
+        limits=httpx.Limits(
+            max_connections=args.concurrency * len(args.models),
+            max_keepalive_connections=args.concurrency,
+            keepalive_expiry=KEEPALIVE_EXPIRY,
+        ),
+        event_hooks=metrics.connections.event_hooks(),
         headers={
             "Authorization": f"Bearer {api_key}",
             "Content-Type": "application/json",
@@ -805,79 +1949,168 @@ async def run_translations_async(args: argparse.Namespace):
             write=WRITE_TIMEOUT,    # 60s write timeout
         ),
     )
-    
-    # Create semaphore for concurrency control
-    semaphore = asyncio.Semaphore(args.concurrency)
-    
+
     # Create shared token counter with lock
     token_counter = {'processed': 0, 'lock': threading.Lock()}
-    
+    writer = BackgroundWriter()
+
+    # Planned tasks wait here for a worker; the highest priority is taken first, and
+    # planning pauses while PLAN_QUEUE_SIZE tasks are already waiting
+    plan_queue: asyncio.PriorityQueue = asyncio.PriorityQueue(maxsize=PLAN_QUEUE_SIZE)
+    sequence = itertools.count()
+    results = []
+
     # Record start time
     start_time = datetime.now()
-    
+
+    async def enqueue(task: dict, warmup: asyncio.Event, leads_warmup: bool):
+        await plan_queue.put((task["priority"], next(sequence), task, warmup, leads_warmup))
+
+    async def release_followers(tasks: list[dict], warmup: asyncio.Event):
+        # The other languages of a post queue up once its first request has warmed the prompt cache
+        await warmup.wait()
+        for task in tasks:
+            await enqueue(task, warmup, False)
+
+    async def produce(pbar: tqdm):
+        releases = []
+        try:
+            async for tasks in planner.plan():
+                pbar.total += len(tasks)
+                pbar.refresh()
+                for task in tasks:
+                    task["trace"] = metrics.trace(task["slug"], task["lang"])
+                warmup = asyncio.Event()
+                await enqueue(tasks[0], warmup, True)
+                if len(tasks) > 1:
+                    releases.append(asyncio.create_task(release_followers(tasks[1:], warmup)))
+            await asyncio.gather(*releases)
+        finally:
+            # One sentinel per worker, ordered after every real task
+            for _ in range(args.concurrency):
+                await plan_queue.put(((float("inf"),), next(sequence), None, None, False))
+
+    async def work(pbar: tqdm):
+        while True:
+            _, _, task, warmup, leads_warmup = await plan_queue.get()
+            if task is None:
+                return
+            post = task["post"]
+            results.append(await translate_task(
+                client=client,
+                slug=task["slug"],
+                title=post["title"],
+                excerpt=post["excerpt"],
+                body=post["body"],
+                lang=task["lang"],
+                content_hash=post["content_hash"],
+                model=args.model,
+                pbar=pbar,
+                token_counter=token_counter,
+                max_retries=args.max_retries,
+                retry_delay=args.retry_delay,
+                prefix=post["prefix"],
+                warmup=warmup,
+                leads_warmup=leads_warmup,
+                trace=task["trace"],
+                writer=writer,
+                token_count=task["tokens"],
+                router=router,
+                placeholders=post["placeholders"],
+                output_format=args.output_format,
+                shared_blocks=args.shared_blocks,
+                storage=storage,
+            ))
+
     try:
-        # Create progress bar
-        with tqdm(total=len(tasks_to_run), desc="Translating", unit="translation", ncols=120) as pbar:
-            # Create async tasks
-            async_tasks = [
-                translate_task(
-                    semaphore=semaphore,
-                    client=client,
-                    slug=task["slug"],
-                    title=task["title"],
-                    excerpt=task["excerpt"],
-                    body=task["body"],
-                    lang=task["lang"],
-                    content_hash=task["content_hash"],
-                    model=args.model,
-                    pbar=pbar,
-                    token_counter=token_counter,
-                    max_retries=args.max_retries,
-                    retry_delay=args.retry_delay,
-                )
-                for task in tasks_to_run
-            ]
-
-            # Run all tasks concurrently
-            results = await asyncio.gather(*async_tasks, return_exceptions=True)
+        # Create progress bar; its total grows as posts are planned
+        with tqdm(total=0, desc="Translating", unit="translation", ncols=120) as pbar:
+            await asyncio.gather(produce(pbar), *(work(pbar) for _ in range(args.concurrency)))
     finally:
         await client.aclose()
-    
+
+    await writer.submit(token_cache.save, prune_unused=prune_token_cache)
+    stats = planner.stats
+
+    if not planner.planned:
+        await writer.aclose()
+        if stats["deferred"]:
+            print(f"\n⚠ Budget too small for any of the {stats['deferred']} pending translation(s)")
+        else:
+            print("\n✓ All translations are up to date!")
+            if record_ref:
+                await asyncio.to_thread(record_build_ref, "translate_posts")
+        return
+
     # Calculate time taken
     end_time = datetime.now()
     duration = (end_time - start_time).total_seconds()
-    
+
     # Collect failed tasks and count tokens
     failed_tasks = []
     successful = 0
     tokens_processed = 0
-    
+
     for result in results:
-        if isinstance(result, Exception):
-            failed_tasks.append({"error": str(result)})
-        elif result.get("status") == "failed":
+        if result.get("status") == "failed":
             failed_tasks.append(result)
         elif result.get("status") == "success":
             successful += 1
             tokens_processed += result.get("tokens", 0)
-    
+
     failed = len(failed_tasks)
-    
+
     # Print final summary
     print(f"\n{'='*60}")
     print(f"Summary:")
     print(f"  Total posts: {stats['total_posts']}")
     print(f"  Cached: {stats['cached']} ({stats['cached']/stats['total_possible']*100:.1f}%)")
+    if stats["structure_failures"]:
+        print(f"  Requeued by structure check: {stats['structure_failures']}")
+    print(f"  {planner.estimate_line()}")
+    if planner.budget_line():
+        print(f"  {planner.budget_line()}")
     print(f"  Newly translated: {successful}")
     if failed > 0:
         print(f"  Failed: {failed}")
     print(f"  Tokens processed: {tokens_processed:,} (~{tokens_processed/1000:.1f}k)")
+    usage = metrics.token_totals()
+    if usage["prompt_tokens"] > 0:
+        print(
+            f"  Prompt tokens (API): {usage['prompt_tokens']:,} | cached: {usage['cached_tokens']:,} "
+            f"({usage['cached_tokens']/usage['prompt_tokens']*100:.1f}%) | completion: {usage['completion_tokens']:,}"
+        )
+    connection_line = metrics.connections.summary_line()
+    if connection_line:
+        print(connection_line)
+    storage_line = storage.summary_line()
+    if storage_line:
+        print(storage_line)
     print(f"  Time taken: {duration:.1f}s")
     if successful > 0:
         print(f"  Avg per translation: {duration/successful:.1f}s")
         print(f"  Throughput: {tokens_processed/duration:.0f} tokens/sec")
+    model_lines = model_stats.summary_lines()
+    if len(model_lines) > 1 or len(args.models) > 1:
+        print("Models:")
+        for line in model_lines:
+            print(line)
+    stage_lines = metrics.summary_lines()
+    if stage_lines:
+        print("Time by stage:")
+        for line in stage_lines:
+            print(line)
     print(f"{'='*60}")
-    
+
+    if args.metrics:
+        await writer.submit(metrics.write_jsonl, Path(args.metrics))
+        print(f"Metrics appended to {args.metrics}")
+    if args.openmetrics:
+        await writer.submit(metrics.write_openmetrics, Path(args.openmetrics))
+        print(f"OpenMetrics written to {args.openmetrics}")
+    await writer.submit(model_stats.save)
+    await writer.aclose()
+
     # Show failures if any
     if failed > 0:
         print(f"\n⚠ {failed} translation(s) failed:")
@@ -889,12 +2122,19 @@ async def run_translations_async(args: argparse.Namespace):
         sys.exit(1)
     else:
         print("\n✓ All translations completed successfully!")
+        if record_ref and not stats["deferred"]:
+            await asyncio.to_thread(record_build_ref, "translate_posts")
 
 
 def main():
     """Main function to orchestrate translations."""
     args = parse_args()
-    asyncio.run(run_translations_async(args))
+    profiler = start_profiling(args.profile)
+    if profiler is None:
+        asyncio.run(run_translations_async(args))
+    else:
+        # Also times every asyncio task of the run per event-loop step
+        asyncio.run(profiler.run_with_task_timing(run_translations_async(args)))
 
 
 if __name__ == "__main__":
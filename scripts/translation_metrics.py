@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""
+Structured metrics for translate_posts.py runs.
+
+Each translation task gets a TaskTrace that accumulates time per stage
+(queue wait, request, parse, validate, save), retries by cause and API token
+usage. RunMetrics collects the traces of a run and exports them as:
+
+- JSONL: one "task" record per translation plus one "run" record, appended so
+  the file accumulates history across runs;
+- OpenMetrics text: counters and latency histograms for the latest run.
+
+ConnectionStats counts HTTP requests against newly opened connections, so the
+summary shows how well the client's connection pool is reused.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Iterator, Optional
+
+
+SPAN_NAMES = ("queue_wait", "request", "parse", "validate", "save")
+TOKEN_KINDS = ("prompt_tokens", "cached_tokens", "completion_tokens")
+
+# Histogram buckets in seconds; translation requests range from seconds to many minutes
+LATENCY_BUCKETS = (0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+
+
+class TaskTrace:
+    """Stage timings, retries and token usage for one (post, language) task."""
+
+    def __init__(self, slug: str, lang: str):
+        self.slug = slug
+        self.lang = lang
+        self.created = time.monotonic()
+        self.spans: dict[str, float] = {}
+        self.retries: Counter[str] = Counter()
+        self.usage: dict[str, int] = {kind: 0 for kind in TOKEN_KINDS}
+        self.status = "pending"
+        self.error = ""
+        self.duration = 0.0
+
+    @contextmanager
+    def span(self, name: str) -> Iterator[None]:
+        """Time a stage; repeated stages (one per attempt) accumulate."""
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.add_span(name, time.monotonic() - start)
+
+    def add_span(self, name: str, seconds: float) -> None:
+        self.spans[name] = self.spans.get(name, 0.0) + seconds
+
+    def retry(self, cause: str) -> None:
+        self.retries[cause] += 1
+
+    def finish(self, status: str, error: str = "") -> None:
+        self.status = status
+        self.error = error
+        self.duration = time.monotonic() - self.created
+
+    def to_record(self) -> dict[str, Any]:
+        return {
+            "type": "task",
+            "slug": self.slug,
+            "lang": self.lang,
+            "status": self.status,
+            "error": self.error,
+            "duration": round(self.duration, 3),
+            "spans": {name: round(seconds, 3) for name, seconds in self.spans.items()},
+            "retries": dict(self.retries),
+            "usage": self.usage,
+        }
+
+
+class ConnectionStats:
+    """
+    Connection reuse for the API client, fed by httpx event hooks.
+
+    The request hook attaches an httpcore "trace" extension to every request;
+    its events tell whether the request opened a new connection and how long
+    TCP connect plus TLS handshake took. `on_request_sent`, when set, is called
+    as each request starts going out, after any wait for a pooled connection.
+    """
+
+    def __init__(self):
+        self.on_request_sent: Optional[Callable[[], None]] = None
+        self.requests = 0
+        self.connections = 0
+        self.setup_seconds = 0.0
+        self.http_versions: Counter[str] = Counter()
+
+    def event_hooks(self) -> dict[str, list]:
+        """Hooks for httpx.AsyncClient(event_hooks=...)."""
+        return {"request": [self._on_request], "response": [self._on_response]}
+
+    async def _on_request(self, request: Any) -> None:
+        request.extensions["trace"] = self._request_trace()
+
+    async def _on_response(self, response: Any) -> None:
+        self.http_versions[response.http_version] += 1
+
+    def _request_trace(self):
+        connect_started = None
+
+        async def trace(event: str, info: dict[str, Any]) -> None:
+            nonlocal connect_started
+            if event == "connection.connect_tcp.started":
+                connect_started = time.monotonic()
+            elif event == "connection.connect_tcp.complete":
+                self.connections += 1
+            elif event.endswith(".send_request_headers.started"):
+                self.requests += 1
+                if self.on_request_sent is not None:
+                    self.on_request_sent()
+                if connect_started is not None:
+                    # Connection setup ends when the first request goes out on it
+                    self.setup_seconds += time.monotonic() - connect_started
+                    connect_started = None
+
+        return trace
+
+    @property
+    def reused(self) -> int:
+        return max(0, self.requests - self.connections)
+
+    def to_record(self) -> dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "connections": self.connections,
+            "setup_seconds": round(self.setup_seconds, 3),
+            "http_versions": dict(self.http_versions),
+        }
+
+    def summary_line(self) -> str:
+        if not self.requests:
+            return ""
+        versions = ", ".join(f"{version}: {count}" for version, count in self.http_versions.most_common())
+        return (
+            f"  Connections: {self.connections} opened for {self.requests} requests "
+            f"({self.reused / self.requests * 100:.0f}% reused) | setup {self.setup_seconds:.1f}s"
+            + (f" | {versions}" if versions else "")
+        )
+
+
+class RunMetrics:
+    """Collects task traces for one run and writes JSONL / OpenMetrics exports."""
+
+    def __init__(self, model: str):
+        self.model = model
+        self.started_at = datetime.now(timezone.utc)
+        self.start = time.monotonic()
+        self.traces: list[TaskTrace] = []
+        self.connections = ConnectionStats()
+
+    def trace(self, slug: str, lang: str) -> TaskTrace:
+        trace = TaskTrace(slug, lang)
+        self.traces.append(trace)
+        return trace
+
+    def span_values(self, name: str) -> list[float]:
+        return sorted(trace.spans[name] for trace in self.traces if name in trace.spans)
+
+    def retry_totals(self) -> Counter[str]:
+        totals: Counter[str] = Counter()
+        for trace in self.traces:
+            totals.update(trace.retries)
+        return totals
+
+    def token_totals(self) -> dict[str, int]:
+        return {kind: sum(trace.usage[kind] for trace in self.traces) for kind in TOKEN_KINDS}
+
+    def status_totals(self) -> Counter[str]:
+        return Counter(trace.status for trace in self.traces)
+
+    def run_record(self) -> dict[str, Any]:
+        spans = {}
+        for name in SPAN_NAMES:
+            values = self.span_values(name)
+            if values:
+                spans[name] = {
+                    "total": round(sum(values), 3),
+                    "p50": round(percentile(values, 0.50), 3),
+                    "p95": round(percentile(values, 0.95), 3),
+                    "max": round(values[-1], 3),
+                }
+        return {
+            "type": "run",
+            "started_at": self.started_at.isoformat(timespec="seconds"),
+            "model": self.model,
+            "duration": round(time.monotonic() - self.start, 3),
+            "tasks": dict(self.status_totals()),
+            "retries": dict(self.retry_totals()),
+            "usage": self.token_totals(),
+            "connections": self.connections.to_record(),
+            "spans": spans,
+        }
+
+    def write_jsonl(self, path: Path) -> None:
+        """Append one record per task and a run record to a JSONL file."""
+        run_id = self.started_at.isoformat(timespec="seconds")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            for trace in self.traces:
+                f.write(json.dumps({"run": run_id, **trace.to_record()}, ensure_ascii=False) + "\n")
+            f.write(json.dumps({"run": run_id, **self.run_record()}, ensure_ascii=False) + "\n")
+
+    def write_openmetrics(self, path: Path) -> None:
+        """Write the run as OpenMetrics text (replacing the previous file)."""
+        lines = [
+            "# TYPE translation_tasks counter",
+            "# HELP translation_tasks Translation tasks by final status.",
+        ]
+        for status, count in sorted(self.status_totals().items()):
+            lines.append(f'translation_tasks_total{{status="{status}"}} {count}')
+
+        lines += [
+            "# TYPE translation_retries counter",
+            "# HELP translation_retries Request retries by cause.",
+        ]
+        for cause, count in sorted(self.retry_totals().items()):
+            lines.append(f'translation_retries_total{{cause="{cause}"}} {count}')
+
+        lines += [
+            "# TYPE translation_tokens counter",
+            "# HELP translation_tokens Tokens reported by the API usage field.",
+        ]
+        for kind, count in self.token_totals().items():
+            lines.append(f'translation_tokens_total{{kind="{kind.removesuffix("_tokens")}"}} {count}')
+
+        lines += [
+            "# TYPE translation_http_requests counter",
+            "# HELP translation_http_requests HTTP requests sent to the API.",
+            f"translation_http_requests_total {self.connections.requests}",
+            "# TYPE translation_http_connections counter",
+            "# HELP translation_http_connections New connections opened to the API.",
+            f"translation_http_connections_total {self.connections.connections}",
+            "# TYPE translation_http_connection_setup_seconds counter",
+            "# UNIT translation_http_connection_setup_seconds seconds",
+            "# HELP translation_http_connection_setup_seconds Time spent on TCP connect and TLS handshakes.",
+            f"translation_http_connection_setup_seconds_total {self.connections.setup_seconds:.3f}",
+        ]
+
+        lines += [
+            "# TYPE translation_stage_seconds histogram",
+            "# UNIT translation_stage_seconds seconds",
+            "# HELP translation_stage_seconds Time per task spent in each stage.",
+        ]
+        for name in SPAN_NAMES:
+            values = self.span_values(name)
+            for bound in LATENCY_BUCKETS:
+                count = sum(1 for value in values if value <= bound)
+                lines.append(f'translation_stage_seconds_bucket{{stage="{name}",le="{bound}"}} {count}')
+            lines.append(f'translation_stage_seconds_bucket{{stage="{name}",le="+Inf"}} {len(values)}')
+            lines.append(f'translation_stage_seconds_sum{{stage="{name}"}} {sum(values):.3f}')
+            lines.append(f'translation_stage_seconds_count{{stage="{name}"}} {len(values)}')
+
+        lines += [
+            "# TYPE translation_run_duration_seconds gauge",
+            "# UNIT translation_run_duration_seconds seconds",
+            f"translation_run_duration_seconds {time.monotonic() - self.start:.3f}",
+            "# EOF",
+        ]
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + ".tmp")
+        tmp_path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+        os.replace(tmp_path, path)
+
+    def summary_lines(self) -> list[str]:
+        """Per-stage time breakdown and retry causes for the printed run summary."""
+        lines = []
+        for name in SPAN_NAMES:
+            values = self.span_values(name)
+            if values:
+                lines.append(
+                    f"  {name:<11} total {sum(values):8.1f}s | "
+                    f"p50 {percentile(values, 0.50):6.1f}s | p95 {percentile(values, 0.95):6.1f}s"
+                )
+        retries = self.retry_totals()
+        if retries:
+            causes = ", ".join(f"{cause}: {count}" for cause, count in retries.most_common())
+            lines.append(f"  Retries: {causes}")
+        return lines
+
+
+def percentile(sorted_values: list[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values) + 0.5) - 1))
+    return sorted_values[index]
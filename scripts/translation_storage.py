@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Storage stage for translation artifacts under assets/translations/.
+
+translate_posts.py passes every `content_html` through here before writing it:
+
+- minify_html() collapses whitespace outside <pre>/<script>/<style>/<textarea>,
+  drops whitespace around block-level tags and writes quotes and dashes as
+  characters instead of entities. Rendering is unchanged.
+- With shared blocks, code blocks and inline SVG figures are moved out of the
+  language files into one sidecar per post (assets/translations/shared/<slug>.json),
+  keyed by a hash of the block. The languages of a post carry identical code, so
+  the sidecar stores it once and each language file keeps a `<!--shared:KEY-->`
+  marker and `"shared": true`.
+
+Readers resolve markers with resolve_shared_blocks() (Python) or the i18n.js
+loader (browser).
+"""
+
+from __future__ import annotations
+
+import hashlib
+import html
+import json
+import os
+import re
+import threading
+from pathlib import Path
+from typing import Optional
+
+
+SHARED_DIR_NAME = "shared"
+
+# Blocks smaller than this stay inline; the marker and the extra lookup cost more
+MIN_SHARED_BLOCK_BYTES = 120
+
+PROTECTED_PATTERN = re.compile(r"<(pre|script|style|textarea)\b.*?</\1\s*>", re.DOTALL | re.IGNORECASE)
+SHAREABLE_PATTERN = re.compile(r"<(pre|svg)\b.*?</\1\s*>", re.DOTALL | re.IGNORECASE)
+SHARED_MARKER_PATTERN = re.compile(r"<!--shared:([0-9a-f]+)-->")
+TAG_SPLIT_PATTERN = re.compile(r"(<!--.*?-->|<[^>]*>)", re.DOTALL)
+TAG_NAME_PATTERN = re.compile(r"<\s*/?\s*([a-zA-Z][\w-]*)")
+HTML_WHITESPACE_PATTERN = re.compile(r"[ \t\r\n\f]+")
+
+BLOCK_TAGS = {
+    "address", "article", "aside", "blockquote", "br", "caption", "dd", "details", "div", "dl", "dt",
+    "figcaption", "figure", "footer", "h1", "h2", "h3", "h4", "h5", "h6", "header", "hr", "li", "main",
+    "nav", "ol", "p", "pre", "section", "summary", "table", "tbody", "td", "tfoot", "th", "thead", "tr", "ul",
+}
+
+# Entities that are plain characters in UTF-8 text; &amp; &lt; &gt; and &nbsp; stay escaped
+TEXT_ENTITIES = {"&quot;": '"', "&#34;": '"', "&apos;": "'", "&#39;": "'", "&mdash;": "—", "&ndash;": "–", "&hellip;": "…"}
+TEXT_ENTITY_PATTERN = re.compile("|".join(re.escape(entity) for entity in TEXT_ENTITIES))
+
+
+def is_block_tag(token: str) -> bool:
+    match = TAG_NAME_PATTERN.match(token)
+    return bool(match) and match.group(1).lower() in BLOCK_TAGS
+
+
+def minify_fragment(fragment: str) -> list[str]:
+    """Minify HTML without protected blocks; returns tokens (tags and text runs)."""
+    tokens = [token for token in TAG_SPLIT_PATTERN.split(fragment) if token]
+    for index, token in enumerate(tokens):
+        if token.startswith("<"):
+            continue
+        text = TEXT_ENTITY_PATTERN.sub(lambda match: TEXT_ENTITIES[match.group(0)], token)
+        tokens[index] = HTML_WHITESPACE_PATTERN.sub(" ", text)
+    return tokens
+
+
+def minify_html(content_html: str) -> str:
+    """
+    Normalize and minify translated HTML without changing how it renders.
+
+    Whitespace inside <pre>, <script>, <style> and <textarea> is kept as is;
+    elsewhere runs collapse to one space, and whitespace next to block-level
+    tags (where the browser ignores it) is removed.
+    """
+    tokens: list[str] = []
+    position = 0
+    for match in PROTECTED_PATTERN.finditer(content_html):
+        tokens.extend(minify_fragment(content_html[position:match.start()]))
+        tokens.append(match.group(0))
+        position = match.end()
+    tokens.extend(minify_fragment(content_html[position:]))
+
+    # Whitespace at a block boundary does not render
+    for index, token in enumerate(tokens):
+        if token.startswith("<"):
+            continue
+        if index == 0 or is_block_tag(tokens[index - 1]):
+            token = token.lstrip(" ")
+        if index == len(tokens) - 1 or is_block_tag(tokens[index + 1]):
+            token = token.rstrip(" ")
+        tokens[index] = token
+    return "".join(tokens)
+
+
+def shared_block_key(block: str) -> str:
+    return hashlib.sha256(block.encode("utf-8")).hexdigest()[:12]
+
+
+def extract_shared_blocks(content_html: str) -> tuple[str, dict[str, str]]:
+    """
+    Replace code blocks and inline SVG figures with `<!--shared:KEY-->` markers.
+
+    Returns:
+        Tuple of (HTML with markers, KEY -> block HTML)
+    """
+    blocks: dict[str, str] = {}
+
+    def replace(match: re.Match) -> str:
+        block = match.group(0)
+        if len(block.encode("utf-8")) < MIN_SHARED_BLOCK_BYTES:
+            return block
+        key = shared_block_key(block)
+        blocks[key] = block
+        return f"<!--shared:{key}-->"
+
+    return SHAREABLE_PATTERN.sub(replace, content_html), blocks
+
+
+def shared_blocks_path(translations_dir: Path, slug: str) -> Path:
+    return translations_dir / SHARED_DIR_NAME / f"{slug}.json"
+
+
+def load_shared_blocks(translations_dir: Path, slug: str) -> dict[str, str]:
+    try:
+        data = json.loads(shared_blocks_path(translations_dir, slug).read_text(encoding="utf-8"))
+    except (OSError, json.JSONDecodeError):
+        return {}
+    blocks = data.get("blocks") if isinstance(data, dict) else None
+    return blocks if isinstance(blocks, dict) else {}
+
+
+def resolve_shared_blocks(translation: dict, translations_dir: Path, slug: str) -> dict:
+    """Return `translation` with shared-block markers replaced by the sidecar's blocks."""
+    if not translation.get("shared"):
+        return translation
+    blocks = load_shared_blocks(translations_dir, slug)
+    content_html = SHARED_MARKER_PATTERN.sub(
+        lambda match: blocks.get(match.group(1), match.group(0)), translation.get("content_html", "")
+    )
+    return {**translation, "content_html": content_html}
+
+
+def update_shared_blocks(translations_dir: Path, slug: str, new_blocks: dict[str, str]) -> None:
+    """
+    Merge `new_blocks` into the post's sidecar and drop blocks no language references.
+
+    Called after the language file is written, so its markers are already on disk.
+    """
+    path = shared_blocks_path(translations_dir, slug)
+    blocks = load_shared_blocks(translations_dir, slug)
+    if not blocks and not new_blocks:
+        return
+    blocks.update(new_blocks)
+
+    referenced = set()
+    for lang_dir in translations_dir.iterdir():
+        if lang_dir.name == SHARED_DIR_NAME or not lang_dir.is_dir():
+            continue
+        try:
+            referenced.update(SHARED_MARKER_PATTERN.findall((lang_dir / f"{slug}.json").read_text(encoding="utf-8")))
+        except OSError:
+            continue
+    blocks = {key: block for key, block in sorted(blocks.items()) if key in referenced}
+
+    if not blocks:
+        path.unlink(missing_ok=True)
+        return
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + ".tmp")
+    tmp_path.write_text(json.dumps({"blocks": blocks}, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+    os.replace(tmp_path, path)
+
+
+class StorageStats:
+    """Bytes of content_html before and after the storage stage, for the run summary."""
+
+    def __init__(self):
+        self.files = 0
+        self.raw_bytes = 0
+        self.stored_bytes = 0
+        self.shared_bytes = 0
+        self._lock = threading.Lock()
+
+    def add(self, raw_bytes: int, stored_bytes: int, shared_bytes: int = 0) -> None:
+        with self._lock:
+            self.files += 1
+            self.raw_bytes += raw_bytes
+            self.stored_bytes += stored_bytes
+            self.shared_bytes += shared_bytes
+
+    def summary_line(self) -> Optional[str]:
+        if not self.files:
+            return None
+        saved = self.raw_bytes - self.stored_bytes
+        line = (
+            f"  Stored HTML: {self.raw_bytes/1024:,.0f} KB → {self.stored_bytes/1024:,.0f} KB "
+            f"({saved/max(1, self.raw_bytes)*100:.1f}% smaller, {self.files} files)"
+        )
+        if self.shared_bytes:
+            line += f", {self.shared_bytes/1024:,.0f} KB moved to shared blocks"
+        return line
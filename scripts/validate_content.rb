@@ -25,6 +25,7 @@ class ValidationRunner
     validate_loops
     validate_about_data
     validate_view_count_data
+    validate_view_count_meta
     validate_top_level_page_asset_guard
 
     if @errors.empty?
@@ -138,8 +139,6 @@ class ValidationRunner
       return
     end
 
-    add_error("#{relative_path(path)}: missing required key last_updated") unless present?(data["last_updated"])
-
     view_counts = data["view_counts"]
     unless view_counts.is_a?(Array)
       add_error("#{relative_path(path)}: view_counts must be an array")
@@ -167,6 +166,22 @@ class ValidationRunner
     add_error(e.message)
   end
 
+  def validate_view_count_meta
+    path = DATA_DIR.join("view_count_meta.json")
+    data = JSON.parse(path.read)
+
+    unless data.is_a?(Hash)
+      add_error("#{relative_path(path)}: expected a JSON object")
+      return
+    end
+
+    add_error("#{relative_path(path)}: missing required key last_updated") unless present?(data["last_updated"])
+  rescue JSON::ParserError => e
+    add_error("#{relative_path(path)}: invalid JSON (#{e.message})")
+  rescue StandardError => e
+    add_error(e.message)
+  end
+
   def validate_top_level_page_asset_guard
     TOP_LEVEL_PAGES.each do |relative|
       path = ROOT.join(relative)